@@ -3,8 +3,6 @@ V* Distribution - Interactive Dashboard with Dash
 """
 
 import numpy as np
-import plotly.graph_objects as go
-from dash import Dash, dcc, html, callback, Output, Input
 from scipy.stats import norm
 from scipy.optimize import brentq
 from scipy.special import log_ndtr
@@ -303,28 +301,42 @@ def find_critical_boundary(z_range=None):
     return sigma_critical[mask], k_th_critical[mask]
 
 
-# Pre-compute static data
+# Static data
 SIGMA_CRIT = np.sqrt(2 * np.pi)
 SIGMA_TH = np.sqrt(np.pi / 2)
 SIGMA_RANGE = np.linspace(0.3, 4.0, 80)
 K_TH_RANGE = np.linspace(-3.0, 5.0, 100)
 SIGMA, K_TH = np.meshgrid(SIGMA_RANGE, K_TH_RANGE)
-BETA_EFF = calc_beta_eff(SIGMA, K_TH)
-SIG_CRIT_BOUNDARY, K_CRIT_BOUNDARY = find_critical_boundary()
-
-# Pre-compute alpha contours (they don't depend on n, N, w0)
 SIGMA_FINE = np.linspace(0.3, 4.0, 500)
 ALPHA_VALUES = [1, 1.5, 2, 3, 5, 7, 10, 15, 20, 30, 50]
 ALPHA_COLORS = ['#00008B', '#0000CD', '#4169E1', '#228B22', '#9ACD32', '#FFD700', '#FFA500', '#FF4500', '#FF0000', '#DC143C', '#800000']
-ALPHA_CONTOURS = {}
-for alpha_target in ALPHA_VALUES:
-    sig_a, k_a = find_alpha_contour(SIGMA_FINE, alpha_target)
-    if len(sig_a) > 2:
-        ALPHA_CONTOURS[alpha_target] = (sig_a, k_a)
+
+# Figure data that doesn't depend on n, N, w0; computed on first use so that
+# importing the module for the model functions stays cheap
+BETA_EFF = None
+SIG_CRIT_BOUNDARY, K_CRIT_BOUNDARY = None, None
+ALPHA_CONTOURS = None
+
+
+def precompute_figure_data():
+    """Fill BETA_EFF, the critical boundary and the alpha contours (once)."""
+    global BETA_EFF, SIG_CRIT_BOUNDARY, K_CRIT_BOUNDARY, ALPHA_CONTOURS
+    if ALPHA_CONTOURS is not None:
+        return
+    BETA_EFF = calc_beta_eff(SIGMA, K_TH)
+    SIG_CRIT_BOUNDARY, K_CRIT_BOUNDARY = find_critical_boundary()
+    contours = {}
+    for alpha_target in ALPHA_VALUES:
+        sig_a, k_a = find_alpha_contour(SIGMA_FINE, alpha_target)
+        if len(sig_a) > 2:
+            contours[alpha_target] = (sig_a, k_a)
+    ALPHA_CONTOURS = contours
 
 
 def create_figure(n, N, w0):
     """Create the 3D figure with current parameters."""
+    import plotly.graph_objects as go
+    precompute_figure_data()
 
     # Calculate wealth surface with asymmetric log scale
     W = expected_wealth(SIGMA, K_TH, n, N, w0)
@@ -445,53 +457,70 @@ def create_figure(n, N, w0):
     return fig
 
 
-# Create Dash app
-app = Dash(__name__)
-
 W0_VALUES = [0.01, 0.1, 1, 10, 100, 1000, 10000, 100000, 1000000, 10000000]
 
-app.layout = html.Div([
-    html.H1("V* Distribution: Interactive Wealth Surface",
-            style={'textAlign': 'center', 'marginBottom': '10px'}),
 
-    html.Div([
-        html.Div([
-            html.Label("Steps (n):"),
-            dcc.Slider(id='n-slider', min=1, max=50, step=1, value=5,
-                      marks={i: str(i) for i in [1, 10, 20, 30, 40, 50]},
-                      tooltip={"placement": "bottom", "always_visible": True})
-        ], style={'flex': '1', 'padding': '0 20px'}),
+def create_app():
+    """Build the Dash app (dash is imported here, not at module import)."""
+    from dash import Dash, dcc, html, Output, Input
 
-        html.Div([
-            html.Label("Participants (N):"),
-            dcc.Slider(id='N-slider', min=1, max=8, step=1, value=3,
-                      marks={i: f'10^{i}' for i in range(1, 9)},
-                      tooltip={"placement": "bottom", "always_visible": True})
-        ], style={'flex': '1', 'padding': '0 20px'}),
+    app = Dash(__name__)
+    app.layout = html.Div([
+        html.H1("V* Distribution: Interactive Wealth Surface",
+                style={'textAlign': 'center', 'marginBottom': '10px'}),
 
         html.Div([
-            html.Label("Initial Wealth (w₀):"),
-            dcc.Slider(id='w0-slider', min=0, max=9, step=1, value=2,
-                      marks={0: '$0.01', 2: '$1', 4: '$100', 6: '$10K', 8: '$1M'},
-                      tooltip={"placement": "bottom", "always_visible": True})
-        ], style={'flex': '1', 'padding': '0 20px'}),
-    ], style={'display': 'flex', 'marginBottom': '20px', 'padding': '20px',
-              'backgroundColor': '#f5f5f5', 'borderRadius': '8px'}),
-
-    dcc.Graph(id='wealth-plot', style={'height': '75vh'})
-], style={'padding': '20px', 'fontFamily': 'Arial, sans-serif'})
-
-
-@callback(
-    Output('wealth-plot', 'figure'),
-    Input('n-slider', 'value'),
-    Input('N-slider', 'value'),
-    Input('w0-slider', 'value')
-)
-def update_figure(n, N_exp, w0_idx):
-    N = 10 ** N_exp
-    w0 = W0_VALUES[w0_idx]
-    return create_figure(n, N, w0)
+            html.Div([
+                html.Label("Steps (n):"),
+                dcc.Slider(id='n-slider', min=1, max=50, step=1, value=5,
+                          marks={i: str(i) for i in [1, 10, 20, 30, 40, 50]},
+                          tooltip={"placement": "bottom", "always_visible": True})
+            ], style={'flex': '1', 'padding': '0 20px'}),
+
+            html.Div([
+                html.Label("Participants (N):"),
+                dcc.Slider(id='N-slider', min=1, max=8, step=1, value=3,
+                          marks={i: f'10^{i}' for i in range(1, 9)},
+                          tooltip={"placement": "bottom", "always_visible": True})
+            ], style={'flex': '1', 'padding': '0 20px'}),
+
+            html.Div([
+                html.Label("Initial Wealth (w₀):"),
+                dcc.Slider(id='w0-slider', min=0, max=9, step=1, value=2,
+                          marks={0: '$0.01', 2: '$1', 4: '$100', 6: '$10K', 8: '$1M'},
+                          tooltip={"placement": "bottom", "always_visible": True})
+            ], style={'flex': '1', 'padding': '0 20px'}),
+        ], style={'display': 'flex', 'marginBottom': '20px', 'padding': '20px',
+                  'backgroundColor': '#f5f5f5', 'borderRadius': '8px'}),
+
+        dcc.Graph(id='wealth-plot', style={'height': '75vh'})
+    ], style={'padding': '20px', 'fontFamily': 'Arial, sans-serif'})
+
+    @app.callback(
+        Output('wealth-plot', 'figure'),
+        Input('n-slider', 'value'),
+        Input('N-slider', 'value'),
+        Input('w0-slider', 'value')
+    )
+    def update_figure(n, N_exp, w0_idx):
+        N = 10 ** N_exp
+        w0 = W0_VALUES[w0_idx]
+        return create_figure(n, N, w0)
+
+    return app
+
+
+_app = None
+
+
+def __getattr__(name):
+    # `create_wealth_plots.app` keeps working (e.g. for WSGI servers) but is built on first access
+    global _app
+    if name == 'app':
+        if _app is None:
+            _app = create_app()
+        return _app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 if __name__ == "__main__":
@@ -500,4 +529,4 @@ if __name__ == "__main__":
     print(f"σ*_th = √(π/2) ≈ {np.sqrt(np.pi/2):.4f}")
     print("\nOpen http://127.0.0.1:8050 in your browser")
 
-    app.run(debug=True)
+    create_app().run(debug=True)
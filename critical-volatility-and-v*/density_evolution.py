@@ -0,0 +1,318 @@
+"""
+Density evolution: the wealth distribution of the ATM / ATV models without sampling.
+
+Every period multiplies a participant's wealth by an i.i.d. factor R, and
+the dropout rule (payoff >= threshold_k * w) only looks at R, so the
+distribution of log wealth can be propagated deterministically: each period
+is a convolution of the current log-wealth masses with the distribution of
+log R, split into those who stay in the game and those who drop out. Zero
+wealth is an absorbing state. The masses live on a uniform log-wealth grid
+with w0 at a grid point; the convolutions use the FFT.
+
+The state has three parts:
+
+    active    masses of participants still taking the high-risk option
+    dropped   masses of those who dropped out (low-risk option, or frozen
+              wealth in the real ATM model)
+    zeros     probability of zero wealth (bankrupt, absorbing)
+
+Kernels are exact: the mass of R in each log-wealth cell comes from the
+normal CDF, so the only approximation is the grid (cell width dx in log
+wealth). Mass that leaves the grid is kept as `below` (positive wealth
+under w_min, counted as living and then left as is) and `above` (wealth
+over the top of the grid, counted in every tail bucket).
+
+A WealthDensity gives what plot_transition reads from 10M samples (bucket
+counts, rank curve, anchor rank, median) as expected values for any n, with
+no sampling noise in the extreme tail. A t = 15 run takes a few ms.
+
+Usage:
+    density = evolve('atv', t=15, sigma=3.0)
+    stats = density.bucket_stats(n=10_000_000)      # expected counts
+    ranks, values = density.rank_curve(n=10_000_000)
+    density.ccdf(1e9)                               # P(W > $1B)
+"""
+
+import numpy as np
+
+from simulation_engine import CRITICAL, SIGMA_LOW, resolve_threshold
+from wealth_stats import LOSS_THRESHOLDS, TAIL_THRESHOLDS, _money_label, log_rank_positions
+
+DEFAULT_DX = 0.01      # grid cell width in log wealth
+DEFAULT_W_MIN = 1e-2   # bottom of the grid, well under the $100 bankruptcy bucket
+# Shocks beyond this many standard deviations have probability under 1e-300
+_Z_MAX = 38.0
+# Masses under this fraction of the convolved mass are FFT rounding noise
+_FFT_FLOOR = 1e-15
+
+
+class WealthDensity:
+    """
+    The wealth distribution after some periods, per participant: masses of
+    the cells centered at wealth[j] (log-spaced by dx), an atom of mass
+    at_w0 at exactly w0 (real ATM participants who dropped out in the first
+    period), plus zeros, below and above. All masses together sum to 1 (up
+    to rounding).
+    """
+
+    def __init__(self, log_wealth, active, dropped, zeros, below, above, w0, at_w0=0.0):
+        self.log_wealth = log_wealth
+        self.active = active
+        self.dropped = dropped
+        self.zeros = zeros
+        self.below = below
+        self.above = above
+        self.w0 = w0
+        self.at_w0 = at_w0
+
+    @property
+    def dx(self) -> float:
+        return float(self.log_wealth[1] - self.log_wealth[0])
+
+    @property
+    def wealth(self) -> np.ndarray:
+        """Wealth at the cell centers."""
+        return np.exp(self.log_wealth)
+
+    @property
+    def mass(self) -> np.ndarray:
+        """Probability of each cell, in the game or not (the atom at w0 left out)."""
+        return self.active + self.dropped
+
+    @property
+    def living(self) -> float:
+        """P(W > 0)."""
+        return float(self.mass.sum()) + self.at_w0 + self.below + self.above
+
+    def density(self) -> np.ndarray:
+        """Probability density per unit of log wealth (the atom at w0 left out)."""
+        return self.mass / self.dx
+
+    # -- tail probabilities and order statistics ------------------------------
+
+    def _breakpoints(self):
+        """
+        (log wealth, P(W > w)) at the cell edges, with the mass of each cell
+        spread evenly in log wealth between them, and a jump at w0 for the atom.
+        """
+        dx = self.dx
+        x = np.append(self.log_wealth - dx / 2, self.log_wealth[-1] + dx / 2)
+        tail = np.empty(len(x))
+        tail[-1] = self.above
+        tail[:-1] = self.above + np.cumsum(self.mass[::-1])[::-1]
+        if self.at_w0:
+            cell = int(round((np.log(self.w0) - self.log_wealth[0]) / dx))
+            tail[:cell + 1] += self.at_w0
+            # P(W > w0) excludes the atom, P(W > w) for w just under w0 includes it
+            after = tail[cell + 1] + self.mass[cell] / 2
+            log_w0 = np.log(self.w0)
+            x = np.insert(x, cell + 1, [np.nextafter(log_w0, -np.inf), log_w0])
+            tail = np.insert(tail, cell + 1, [after + self.at_w0, after])
+        return x, tail
+
+    def ccdf(self, w):
+        """P(W > w); w may be an array."""
+        w = np.asarray(w, dtype=float)
+        x, tail = self._breakpoints()
+        log_w = np.log(np.maximum(w, np.finfo(float).tiny))
+        result = np.interp(log_w, x, tail)
+        result = np.where(log_w < x[0], tail[0] + self.below, result)
+        result = np.where(w <= 0, self.living, result)
+        return result if result.ndim else float(result)
+
+    def wealth_at_ranks(self, positions, n) -> np.ndarray:
+        """
+        Expected order statistics of n participants, like wealth_stats.wealth_at_ranks:
+        position p (0-based from the richest) is the wealth with (p + 1/2) / n
+        of the population above it. nan beyond the top of the grid, w_min
+        for ranks in `below`, 0 among the bankrupt.
+        """
+        target = (np.asarray(positions, dtype=float) + 0.5) / n
+        x, tail = self._breakpoints()
+        values = np.exp(np.interp(target, tail[::-1], x[::-1]))
+        values[target <= self.above] = np.nan
+        values[target > tail[0]] = np.exp(x[0])
+        values[target > tail[0] + self.below] = 0.0
+        return values
+
+    def rank_curve(self, n, num=1000):
+        """(ranks, values) at about num log-spaced ranks of the expected survivors, as wealth_stats.rank_curve."""
+        positions = log_rank_positions(int(round(n * self.living)), num)
+        return positions + 1, self.wealth_at_ranks(positions, n)
+
+    def top_k(self, k, n) -> np.ndarray:
+        """Expected k largest of n participants, descending."""
+        return self.wealth_at_ranks(np.arange(k), n)
+
+    def median(self) -> float:
+        """Median wealth of the living (w > 0)."""
+        living = self.living
+        return float(self.wealth_at_ranks([living / 2 - 0.5], 1)[0]) if living > 0 else 0.0
+
+    def mean(self) -> float:
+        """Mean wealth of the living on the grid (`above` left out)."""
+        on_grid = float(self.mass.sum()) + self.at_w0 + self.below
+        total = float(self.mass @ self.wealth) + self.at_w0 * self.w0
+        return total / on_grid if on_grid > 0 else 0.0
+
+    def bucket_stats(self, n=1) -> dict:
+        """
+        Expected counts among n participants under wealth_stats.BucketStats'
+        keys (n=1: probabilities); max_wealth is the expected largest.
+        """
+        # P(W >= threshold) for the loss buckets: no atom sits on them, so >= and > agree
+        loss = self.ccdf(np.array(LOSS_THRESHOLDS, dtype=float))
+        tail = self.ccdf(np.array(TAIL_THRESHOLDS, dtype=float))
+        middle = LOSS_THRESHOLDS[1]
+        stats = {
+            'count_full_bankruptcies': n * float(self.zeros + self.living - loss[0]),
+            'count_heavy_loss': n * float(loss[0] - loss[1]),
+            f'count_{_money_label(middle)}_to_{_money_label(TAIL_THRESHOLDS[0])}': n * float(loss[1] - tail[0]),
+        }
+        for threshold, p in zip(TAIL_THRESHOLDS, tail):
+            stats[f'count_{_money_label(threshold)}'] = n * float(p)
+        stats.update({
+            'total_survivors': n * self.living,
+            'mean_wealth': self.mean(),
+            'max_wealth': float(self.wealth_at_ranks([0], n)[0]),
+        })
+        return stats
+
+
+# ---------------------------------------------------------------------------
+# Kernels
+# ---------------------------------------------------------------------------
+
+def _factor_cdfs(model, sigma):
+    """
+    CDFs of the high-risk and low-risk wealth factors R >= 0 (w' = R w);
+    the low-risk one is None for real_atm, whose dropouts keep their wealth.
+    """
+    from scipy.special import ndtr
+
+    if model == 'real_atm':
+        shift = 1 - sigma / CRITICAL  # R = max(1 - σ/√(2π) + max(σZ, 0), 0)
+        high = lambda r: np.where(r >= shift, ndtr((r - shift) / sigma), 0.0)
+        return high, sigma * _Z_MAX + max(shift, 0), None, None
+    high = lambda r: ndtr(r / sigma)                 # R = max(σZ, 0)
+    low = lambda r: ndtr((r - 1) / SIGMA_LOW)        # R = max(1 + 0.1Z, 0)
+    return high, sigma * _Z_MAX, low, 1 + SIGMA_LOW * _Z_MAX
+
+
+def _kernel(cdf, r_max, lo, hi, n_cells, dx):
+    """
+    Masses of R in [lo, hi) ∩ (0, ∞) per log-wealth offset m (log R within
+    dx/2 of m dx), for m from -(n_cells - 1), and the mass below that.
+
+    Returns:
+        (masses, m_low, below)
+    """
+    m_low = -(n_cells - 1)
+    m_high = max(int(np.ceil(np.log(r_max) / dx)), 0) + 1
+    edges = np.exp((np.arange(m_low, m_high + 2) - 0.5) * dx)
+    cum = cdf(np.clip(edges, lo, hi))
+    below = float(cum[0] - cdf(np.clip(0.0, lo, hi)))
+    return np.diff(cum), m_low, below
+
+
+class _Convolution:
+    """Linear convolution of grid masses with a fixed kernel, by rfft."""
+
+    def __init__(self, kernel, m_low, below, n_cells):
+        self.n_cells = n_cells
+        self.offset = -m_low
+        self.kernel_below = below
+        self.size = 1 << int(np.ceil(np.log2(n_cells + len(kernel) - 1)))
+        self.spectrum = np.fft.rfft(kernel, self.size)
+
+    def __call__(self, spectrum, total):
+        """(masses on the grid, mass below it, mass above it) for masses with the given rfft."""
+        full = np.fft.irfft(spectrum * self.spectrum, self.size)
+        # FFT rounding noise (~1e-17 per cell, of either sign), which would
+        # otherwise weigh on means through the huge wealth of the top cells
+        full[full < _FFT_FLOOR * total] = 0
+        grid = full[self.offset:self.offset + self.n_cells]
+        below = float(full[:self.offset].sum()) + total * self.kernel_below
+        above = float(full[self.offset + self.n_cells:].sum())
+        return grid, below, above
+
+
+# ---------------------------------------------------------------------------
+# Evolution
+# ---------------------------------------------------------------------------
+
+def evolve(model, t=15, w0=20_000, sigma=2.5, threshold_k=None, dx=DEFAULT_DX, w_min=DEFAULT_W_MIN,
+           w_max=None) -> WealthDensity:
+    """
+    The wealth distribution after t periods of the model (as simulated by
+    simulation_engine), starting from everyone at w0 in the game.
+
+    Args:
+        dx:    cell width in log wealth (error in wealth about ±dx/2 per cell)
+        w_min: bottom of the grid
+        w_max: top of the grid (default: w0 (1 + 6σ)^t, beyond any
+               plausible path)
+    """
+    threshold_k = resolve_threshold(model, threshold_k)
+    log_max = np.log(w0) + t * np.log1p(6 * sigma) if w_max is None else np.log(w_max)
+    start = int(np.ceil((np.log(w0) - np.log(w_min)) / dx))  # cell of w0
+    n_cells = start + int(np.ceil((log_max - np.log(w0)) / dx)) + 1
+    log_wealth = np.log(w0) + (np.arange(n_cells) - start) * dx
+
+    high_cdf, high_max, low_cdf, low_max = _factor_cdfs(model, sigma)
+    # The high-risk factor splits into stay (R >= threshold_k) and drop (R < threshold_k)
+    stay = _Convolution(*_kernel(high_cdf, high_max, max(threshold_k, 0), np.inf, n_cells, dx), n_cells)
+    p_zero = float(high_cdf(0.0))
+    p_stay_zero = p_zero if threshold_k <= 0 else 0.0
+    p_drop = float(high_cdf(threshold_k)) if threshold_k > 0 else 0.0
+    if model == 'atv':
+        drop = _Convolution(*_kernel(high_cdf, high_max, 0.0, threshold_k, n_cells, dx), n_cells)
+    if low_cdf is not None:
+        low = _Convolution(*_kernel(low_cdf, low_max, 0.0, np.inf, n_cells, dx), n_cells)
+        p_low_zero = float(low_cdf(0.0))
+
+    active = np.zeros(n_cells)
+    active[start] = 1.0
+    dropped = np.zeros(n_cells)
+    zeros = below = above = at_w0 = 0.0
+    for period in range(t):
+        total_active = active.sum()
+        total_dropped = dropped.sum()
+        active_spectrum = np.fft.rfft(active, stay.size)
+        new_active, out_below, out_above = stay(active_spectrum, total_active)
+        below += out_below
+        above += out_above
+
+        if model == 'atv':
+            # Everyone in the game takes the high-risk payoff; those under the
+            # threshold drop out with it, and the dropouts take the low-risk one
+            zeros += total_active * p_zero + total_dropped * p_low_zero
+            from_active, active_below, active_above = drop(active_spectrum, total_active)
+            from_dropped, dropped_below, dropped_above = low(np.fft.rfft(dropped, low.size), total_dropped)
+            new_dropped = from_active + from_dropped
+            below += active_below + dropped_below
+            above += active_above + dropped_above
+        elif model == 'atm':
+            # Those under the threshold drop out first and take the low-risk payoff
+            zeros += total_active * p_stay_zero
+            dropping = dropped + active * p_drop
+            new_dropped, dropped_below, dropped_above = low(np.fft.rfft(dropping, low.size), dropping.sum())
+            zeros += dropping.sum() * p_low_zero
+            below += dropped_below
+            above += dropped_above
+        else:
+            # real_atm: dropouts keep the wealth they had, exactly w0 in the first period
+            zeros += total_active * p_stay_zero
+            if period == 0:
+                at_w0 = total_active * p_drop
+                new_dropped = dropped
+            else:
+                new_dropped = dropped + active * p_drop
+        active, dropped = new_active, new_dropped
+
+    return WealthDensity(log_wealth, active, dropped, zeros, below, above, w0, at_w0)
+
+
+def evolve_sweep(model, sigmas, t=15, w0=20_000, threshold_k=None, dx=DEFAULT_DX, w_min=DEFAULT_W_MIN) -> list:
+    """evolve() for each sigma (each on its own grid)."""
+    return [evolve(model, t, w0, sigma, threshold_k, dx, w_min) for sigma in sigmas]
@@ -4,12 +4,20 @@ Demonstrates the phase transition at σ* = √(2π) ≈ 2.507
 """
 
 import numpy as np
-import matplotlib.pyplot as plt
 import csv
-from scipy.stats import norm
 
+import density_evolution
+import simulation_engine
+from simulation_cache import SimulationCache, cached
+from sketches import DDSketch, TopK, sketch_rank_curve
+from tail_estimation import DEFAULT_TAIL, print_tail_fits, tail_fit_rows
+from wealth_stats import BucketStats, rank_curve, top_k, wealth_at_ranks
 
-def simulate_real_atm_model(n=10_000_000, t=15, w0=20_000, sigma=2.5, threshold_k=0.1):
+# matplotlib and scipy.stats are imported where they are used: they take
+# about two seconds to import, and the simulation functions need neither.
+
+
+def simulate_real_atm_model(n=10_000_000, t=15, w0=20_000, sigma=2.5, threshold_k=0.1, seed=None, workers=None):
     """
     Real ATM option model: pay fair price, receive payoff.
 
@@ -25,10 +33,17 @@ def simulate_real_atm_model(n=10_000_000, t=15, w0=20_000, sigma=2.5, threshold_
         w0: Initial wealth
         sigma: Volatility parameter
         threshold_k: Dropout threshold (as fraction of wealth)
+        seed: Seed (None: leave the global numpy random state as it is)
+        workers: Run in chunks on this many processes with SeedSequence
+                 streams (simulation_engine); bit-identical for any count
 
     Returns:
         Array of final wealth values
     """
+    if workers is not None:
+        return simulation_engine.simulate('real_atm', n, t, w0, sigma, threshold_k, seed=seed, workers=workers)
+    if seed is not None:
+        np.random.seed(seed)
     w = np.full(n, w0, dtype=float)
     in_game = np.ones(n, dtype=bool)
     critical = np.sqrt(2 * np.pi)
@@ -70,6 +85,8 @@ def vstar_theory(sigma, threshold_k):
     Returns:
         dict with beta, p, alpha, and other theoretical values
     """
+    from scipy.stats import norm
+
     critical = np.sqrt(2 * np.pi)
     # Convert threshold to standard deviations: need X >= threshold_k*w where X ~ N(0, sigma*w)
     # Standardizing: Z >= threshold_k/sigma where Z ~ N(0,1)
@@ -98,7 +115,7 @@ def vstar_theory(sigma, threshold_k):
     }
 
 # At the value model - you bet it all, and win or loose
-def simulate_atv_model(n=10_000_000, t=15, w0=20_000, sigma=2.5, threshold_k=1):
+def simulate_atv_model(n=10_000_000, t=15, w0=20_000, sigma=2.5, threshold_k=1, seed=None, workers=None):
     """
     Paper's ATM model: payoff = max(X, 0) where X ~ N(0, σw)
 
@@ -109,10 +126,17 @@ def simulate_atv_model(n=10_000_000, t=15, w0=20_000, sigma=2.5, threshold_k=1):
         sigma: Volatility parameter
         threshold_k: Dropout threshold - stay in game only if payoff >= threshold_k * w
                      (e.g., 1.5 means you need 1.5x returns to justify staying)
+        seed: Seed (None: leave the global numpy random state as it is)
+        workers: Run in chunks on this many processes with SeedSequence
+                 streams (simulation_engine); bit-identical for any count
 
     Returns:
         Array of final wealth values
     """
+    if workers is not None:
+        return simulation_engine.simulate('atv', n, t, w0, sigma, threshold_k, seed=seed, workers=workers)
+    if seed is not None:
+        np.random.seed(seed)
     w = np.full(n, w0, dtype=float)
     in_high_risk = np.ones(n, dtype=bool)
     sigma_low = 0.1  # Low-risk option for dropouts
@@ -139,7 +163,7 @@ def simulate_atv_model(n=10_000_000, t=15, w0=20_000, sigma=2.5, threshold_k=1):
 
 
 # ATM model - you get optionality
-def simulate_atm_model(n=10_000_000, t=15, w0=20_000, sigma=2.5, threshold_k=2.5):
+def simulate_atm_model(n=10_000_000, t=15, w0=20_000, sigma=2.5, threshold_k=2.5, seed=None, workers=None):
     """
     Paper's ATM model: payoff = max(X, 0) where X ~ N(0, σw)
 
@@ -150,10 +174,17 @@ def simulate_atm_model(n=10_000_000, t=15, w0=20_000, sigma=2.5, threshold_k=2.5
         sigma: Volatility parameter
         threshold_k: Dropout threshold - stay in game only if payoff >= threshold_k * w
                      (e.g., 1.5 means you need 1.5x returns to justify staying)
+        seed: Seed (None: leave the global numpy random state as it is)
+        workers: Run in chunks on this many processes with SeedSequence
+                 streams (simulation_engine); bit-identical for any count
 
     Returns:
         Array of final wealth values
     """
+    if workers is not None:
+        return simulation_engine.simulate('atm', n, t, w0, sigma, threshold_k, seed=seed, workers=workers)
+    if seed is not None:
+        np.random.seed(seed)
     w = np.full(n, w0, dtype=float)
     in_high_risk = np.ones(n, dtype=bool)
     sigma_low = 0.1  # Low-risk option for dropouts
@@ -179,8 +210,93 @@ def simulate_atm_model(n=10_000_000, t=15, w0=20_000, sigma=2.5, threshold_k=2.5
 
 
 
-def plot_transition():
-    """Plot the phase transition around σ* = √(2π)"""
+def _cached_run(cache, simulator, workers, **kwargs):
+    """
+    cached() run of a simulate_*_model. Runs on any number of workers are
+    bit-identical and share an entry; workers=None is the legacy numpy
+    stream, which draws different numbers and keeps its own.
+    """
+    ignore = () if workers is None else ('workers',)
+    return cached(cache, simulator, seed=42, workers=workers, ignore=ignore, **kwargs)
+
+
+def _wealth_summary(wealth):
+    """
+    (ranks, curve, (survivors, wealth at rank 1000), top order statistics,
+    bucket statistics, median) of one run's final wealth.
+    """
+    living = wealth[wealth > 0]
+
+    # Rank-wealth distribution (order statistics selected in place; the
+    # counts and means below do not depend on the order of `living`)
+    ranks, curve = rank_curve(living, overwrite=True)
+    anchor = wealth_at_ranks(living, [1000], overwrite=True)[0] if len(living) > 1000 else None
+    top = top_k(living, DEFAULT_TAIL, overwrite=True)
+
+    # Statistics at the wealth thresholds (one pass over wealth)
+    bucket_stats = BucketStats()
+    bucket_stats.update(wealth)
+    return ranks, curve, (len(living), anchor), top, bucket_stats.result(), np.median(living)
+
+
+def _sketch_summary(bucket_stats, top, quantiles):
+    """_wealth_summary() from the reducers of a chunked run: the rank curve
+    below rank DEFAULT_TAIL and the median within DDSketch's 1%."""
+    ranks, curve = sketch_rank_curve(top, quantiles)
+    values = top.result()
+    values = values[values > 0]
+    anchor = values[1000] if len(values) > 1000 else None
+    return ranks, curve, (quantiles.count, anchor), values, bucket_stats.result(), quantiles.result()['median_wealth']
+
+
+def _density_summary(dist, n):
+    """_wealth_summary() of the expected distribution of n participants."""
+    ranks, curve = dist.rank_curve(n)
+    n_living = int(round(n * dist.living))
+    anchor = dist.wealth_at_ranks([1000], n)[0] if n_living > 1000 else None
+
+    # Expected counts, to the nearest participant
+    counts = dist.bucket_stats(n)
+    counts.update({key: round(value) for key, value in counts.items()
+                   if key.startswith('count_') or key == 'total_survivors'})
+    return ranks, curve, (n_living, anchor), dist.top_k(DEFAULT_TAIL, n), counts, dist.median()
+
+
+def _transition_summaries(sigmas, n, workers, cache, density, crn):
+    """One summary per sigma, in order (see plot_transition)."""
+    if density:
+        for dist in density_evolution.evolve_sweep('atv', sigmas):
+            yield _density_summary(dist, n)
+    elif crn:
+        reducers = [[BucketStats(), TopK(DEFAULT_TAIL), DDSketch()] for _ in sigmas]
+        for row in simulation_engine.run_sweep('atv', n, sigmas, reducers=reducers, seed=42, workers=workers):
+            yield _sketch_summary(*row)
+    else:
+        # One run in memory at a time
+        for sigma in sigmas:
+            yield _wealth_summary(_cached_run(cache, simulate_atv_model, workers, n=n, sigma=sigma))
+
+
+def plot_transition(workers=None, cache=None, density=False, crn=False, tail_fits=False):
+    """
+    Plot the phase transition around σ* = √(2π)
+
+    Each sigma is an independent run seeded with 42, as np.random.seed(42)
+    before every simulate_atv_model() always did (workers: run it on the
+    engine's SeedSequence streams instead; cache: SimulationCache for the
+    runs, or None). Alternatives:
+        crn:     all sigmas share one set of shocks (common random numbers,
+                 simulation_engine.run_sweep), reduced per chunk to bucket
+                 statistics and sketches. Its draws differ from the default
+                 runs; the median and the curve below rank DEFAULT_TAIL are
+                 within 1% (DDSketch)
+        density: expected values from density_evolution instead of sampling
+    tail_fits: also print the fitted tail exponents against V* theory, with
+    bootstrap intervals for sampled runs (the order statistics of a density
+    are expected values, which a bootstrap says nothing about).
+    """
+    import matplotlib.pyplot as plt
+
 
     # Volatilities to test - wide range including low volatilities
     sigmas = [0.1, 0.5, 1.0, 1.5, 2.0, 2.507, 3.0, 3.5, 4.0]
@@ -200,21 +316,15 @@ def plot_transition():
     # Collect statistics for CSV export
     stats_data = []
 
-    # Store sorted wealth for each sigma to add V* theory lines
-    sorted_wealth_by_sigma = {}
+    # Survivor count and wealth at rank 1000 for each sigma, for the V* theory lines
+    anchor_by_sigma = {}
 
-    for i, sigma in enumerate(sigmas):
-        np.random.seed(42)
-        wealth = simulate_atv_model(sigma=sigma)
-        living = wealth[wealth > 0]
+    # Largest survivors of each sigma, for the fitted tail exponents
+    top_by_sigma = {}
 
-        # Plot rank-wealth distribution
-        sorted_w = np.sort(living)[::-1]
-        ranks = np.arange(1, len(sorted_w) + 1)
-        idx = np.unique(np.logspace(0, np.log10(len(ranks)-1), 1000).astype(int))
-
-        # Store sorted wealth for V* theoretical lines
-        sorted_wealth_by_sigma[sigma] = sorted_w
+    summaries = _transition_summaries(sigmas, 10_000_000, workers, cache, density, crn)
+    for i, (sigma, summary) in enumerate(zip(sigmas, summaries)):
+        ranks, curve, anchor_by_sigma[sigma], top_by_sigma[sigma], counts, median_wealth = summary
 
         beta = sigma / critical
         regime_label = "Sub" if beta < 0.95 else "Super" if beta > 1.05 else "CRITICAL"
@@ -223,21 +333,20 @@ def plot_transition():
         linestyle = '-' if sigma in [0.1, 1.0, 2.0, 2.507, 3.0, 4.0] else '-'
         linewidth = 3 if abs(sigma - critical) < 0.01 else 2
 
-        ax.loglog(ranks[idx], sorted_w[idx],
+        ax.loglog(ranks, curve,
                  linestyle=linestyle, linewidth=linewidth, alpha=1, color=colors[i],
                  label=f'σ={sigma:.1f} (β={beta:.2f}) {regime_label}')
 
-        # Calculate statistics at various wealth thresholds
-        full_bankruptcies = np.sum(wealth < 100)  # Essentially $0 (allowing for floating point)
-        heavy_loss = np.sum((wealth >= 100) & (wealth < 2000))  # Lost 90%+ but not fully bankrupt
-        middle_bucket = np.sum((wealth >= 2000) & (wealth <= 20000))
-        c20k = np.sum(living > 20000)
-        c50k = np.sum(living > 50000)
-        c100k = np.sum(living > 100000)
-        m1 = np.sum(living > 1e6)
-        m10 = np.sum(living > 1e7)
-        m100 = np.sum(living > 1e8)
-        b1 = np.sum(living > 1e9)
+        full_bankruptcies = counts['count_full_bankruptcies']  # Essentially $0 (allowing for floating point)
+        heavy_loss = counts['count_heavy_loss']  # Lost 90%+ but not fully bankrupt
+        middle_bucket = counts['count_2k_to_20k']
+        c20k = counts['count_20k']
+        c50k = counts['count_50k']
+        c100k = counts['count_100k']
+        m1 = counts['count_1M']
+        m10 = counts['count_10M']
+        m100 = counts['count_100M']
+        b1 = counts['count_1B']
         ratio = m1/m10 if m10 > 0 else float('inf')
 
         print(f"{sigma:>6.2f} {beta:>6.2f} {full_bankruptcies:>10,} {heavy_loss:>10,} {middle_bucket:>10,} {c20k:>10,} {c50k:>10,} {c100k:>10,} {m1:>10,} {m10:>10,} {m100:>10,} {b1:>8,} {ratio:>8.1f}")
@@ -257,12 +366,18 @@ def plot_transition():
             'count_100M': m100,
             'count_1B': b1,
             'ratio_1M_to_10M': ratio,
-            'total_survivors': len(living),
-            'mean_wealth': np.mean(living),
-            'median_wealth': np.median(living),
-            'max_wealth': np.max(living) if len(living) > 0 else 0
+            'total_survivors': counts['total_survivors'],
+            'mean_wealth': counts['mean_wealth'],
+            'median_wealth': median_wealth,
+            'max_wealth': counts['max_wealth']
         })
 
+    if tail_fits:
+        # Fitted tail exponents (power-law MLE, bootstrap 95% intervals) against V* theory
+        print("\nTail exponent α: fitted vs V* theory\n")
+        print_tail_fits(tail_fit_rows([top_by_sigma[sigma] for sigma in sigmas], sigmas, threshold_k=1,
+                                      n_boot=0 if density else 1_000, seed=42, workers=workers))
+
     # Add reference lines
     ax.axhline(1e6, color='gray', linestyle=':', alpha=1, linewidth=1, label='$1M')
     ax.axhline(1e9, color='green', linestyle=':', alpha=1, linewidth=2, label='$1B')
@@ -274,10 +389,11 @@ def plot_transition():
         if beta > 1.0:  # Only supercritical
             try:
                 theory = vstar_theory(sigma=sigma, threshold_k=1)
-                sorted_w = sorted_wealth_by_sigma[sigma]
-                ranks_vstar = np.logspace(0, np.log10(len(sorted_w)), 100)
+                n_living, anchor_wealth = anchor_by_sigma[sigma]
+                if anchor_wealth is None:
+                    continue
+                ranks_vstar = np.logspace(0, np.log10(n_living), 100)
                 anchor_rank = 1000
-                anchor_wealth = sorted_w[anchor_rank]
                 wealth_vstar = anchor_wealth * (anchor_rank / ranks_vstar) ** (1/theory['alpha'])
                 ax.loglog(ranks_vstar, wealth_vstar, color=theory_colors[i], linestyle='--', linewidth=2, alpha=0.8,
                          label=f'V* theory σ={sigma:.1f} (α={theory["alpha"]:.2f})')
@@ -318,22 +434,22 @@ def plot_transition():
     plt.show()
 
 
-def plot_single_regime_comparison():
-    """Compare subcritical vs supercritical in detail"""
+def plot_single_regime_comparison(workers=None, cache=None):
+    """Compare subcritical vs supercritical in detail (workers, cache: see plot_transition)"""
+    import matplotlib.pyplot as plt
+
 
     fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(14, 6))
     critical = np.sqrt(2 * np.pi)
 
     # Subcritical: σ = 2.0
     print("Running subcritical simulation (σ = 1.0)...")
-    np.random.seed(42)
-    wealth_sub = simulate_atv_model(sigma=1.0, n=5_000_000)
+    wealth_sub = _cached_run(cache, simulate_atv_model, workers, sigma=1.0, n=5_000_000)
     living_sub = wealth_sub[wealth_sub > 0]
 
     # Supercritical: σ = 3.0
     print("Running supercritical simulation (σ = 3.0)...")
-    np.random.seed(42)
-    wealth_super = simulate_atv_model(sigma=3.0, n=5_000_000)
+    wealth_super = _cached_run(cache, simulate_atv_model, workers, sigma=3.0, n=5_000_000)
     living_super = wealth_super[wealth_super > 0]
 
     # Plot 1: Histograms
@@ -349,23 +465,18 @@ def plot_single_regime_comparison():
     ax1.grid(True, alpha=0.3)
 
     # Plot 2: Rank-wealth plot
-    sorted_sub = np.sort(living_sub)[::-1]
-    ranks_sub = np.arange(1, len(sorted_sub) + 1)
-    idx_sub = np.unique(np.logspace(0, np.log10(len(ranks_sub)-1), 1000).astype(int))
-
-    sorted_super = np.sort(living_super)[::-1]
-    ranks_super = np.arange(1, len(sorted_super) + 1)
-    idx_super = np.unique(np.logspace(0, np.log10(len(ranks_super)-1), 1000).astype(int))
+    ranks_sub, curve_sub = rank_curve(living_sub, overwrite=True)
+    ranks_super, curve_super = rank_curve(living_super, overwrite=True)
 
-    ax2.loglog(ranks_sub[idx_sub], sorted_sub[idx_sub], 'b.', markersize=2, alpha=0.5, label='Subcritical σ=1.0')
-    ax2.loglog(ranks_super[idx_super], sorted_super[idx_super], 'r.', markersize=2, alpha=0.5, label='Supercritical σ=3.0')
+    ax2.loglog(ranks_sub, curve_sub, 'b.', markersize=2, alpha=0.5, label='Subcritical σ=1.0')
+    ax2.loglog(ranks_super, curve_super, 'r.', markersize=2, alpha=0.5, label='Supercritical σ=3.0')
 
     # Add V* theoretical line for sigma=3, threshold_k=2.5
     theory = vstar_theory(sigma=3.0, threshold_k=2.5)
-    ranks_vstar = np.logspace(0, np.log10(len(sorted_super)), 100)
+    ranks_vstar = np.logspace(0, np.log10(len(living_super)), 100)
     # Anchor to simulation data at rank ~1000 for stable fit
     anchor_rank = 1000
-    anchor_wealth = sorted_super[anchor_rank]
+    anchor_wealth = wealth_at_ranks(living_super, [anchor_rank], overwrite=True)[0]
     wealth_vstar = anchor_wealth * (anchor_rank / ranks_vstar) ** (1/theory['alpha'])
     ax2.loglog(ranks_vstar, wealth_vstar, 'purple', linestyle='--', linewidth=3, alpha=0.8,
              label=f'V* Theory σ=3.0 (α={theory["alpha"]:.2f})')
@@ -389,8 +500,11 @@ def plot_single_regime_comparison():
     plt.show()
 
 
-def main():
-    """Main execution"""
+def main(workers=None, use_cache=True, density=False, crn=False, tail_fits=False):
+    """
+    Main execution (simulation results are cached on disk unless use_cache is
+    False; density, crn, tail_fits: see plot_transition)
+    """
     print("\n" + "="*70)
     print("V* DISTRIBUTION - SIMPLE ATM MODEL")
     print("="*70)
@@ -414,13 +528,27 @@ def main():
     print("="*90 + "\n")
 
     # Main transition plot
-    plot_transition()
+    cache = SimulationCache() if use_cache else None
+    plot_transition(workers, cache, density, crn, tail_fits)
 
     # Detailed comparison
-    plot_single_regime_comparison()
+    plot_single_regime_comparison(workers, cache)
 
     print("✓ All simulations complete!\n")
 
 
 if __name__ == '__main__':
-    main()
+    import argparse
+    parser = argparse.ArgumentParser(description="V* phase-transition simulations.")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="simulate in parallel chunks on this many processes")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="rerun the simulations instead of loading them from .sim_cache")
+    parser.add_argument('--density', action='store_true',
+                        help="compute the transition plot by density evolution (expected values, no sampling)")
+    parser.add_argument('--crn', action='store_true',
+                        help="simulate the transition plot's sigmas on common random numbers, reduced per chunk")
+    parser.add_argument('--tail-fits', action='store_true',
+                        help="fit the transition plot's tail exponents (tail_estimation) against V* theory")
+    args = parser.parse_args()
+    main(args.workers, use_cache=not args.no_cache, density=args.density, crn=args.crn, tail_fits=args.tail_fits)
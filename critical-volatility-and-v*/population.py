@@ -0,0 +1,149 @@
+"""
+Out-of-core populations: per-participant state in memory-mapped files.
+
+When n exceeds RAM, the wealth and in-game arrays cannot live in memory.
+A Population keeps them in .npy files mapped with np.memmap and advances
+them period by period, streaming over the files one chunk at a time in
+order (sequential I/O; the page cache holds what fits). The kernels of
+simulation_engine work in place on the mapped chunk, so only the scratch
+arrays of one chunk are allocated.
+
+The population stays on disk between runs: it can be reopened, advanced by
+more periods, and analysed in place (BucketStats, the sketches, or any
+reducer) without loading it.
+
+Chunk i draws from the i-th stream spawned from SeedSequence(seed), and the
+stream states are saved after every period. After t periods, the wealth is
+bit-identical to run_chunked(..., t=t, seed=seed, chunk_size=chunk_size).
+
+Layout of a population directory:
+
+    wealth.npy        float64 wealth of every participant
+    active.npy        bool, still taking the high-risk option (in game)
+    population.json   model parameters, periods done, per-chunk RNG states
+
+An interrupted advance() leaves some chunks a period ahead of others; the
+population is then only usable by creating it again.
+
+Usage:
+    pop = Population.create('pop_1e9', 'atv', n=10**9, sigma=3.0, seed=42)
+    pop.advance(15)
+    stats, = pop.reduce([BucketStats()])
+    wealth = Population.open('pop_1e9').wealth      # read-only memmap
+"""
+
+import json
+import os
+
+import numpy as np
+
+from simulation_engine import DEFAULT_CHUNK_SIZE, advance_block, chunk_streams, resolve_threshold
+
+_META = 'population.json'
+
+
+class Population:
+    """A population directory; use Population.create() or Population.open()."""
+
+    def __init__(self, path, meta):
+        self.path = path
+        self.meta = meta
+
+    # -- creation -----------------------------------------------------------
+
+    @classmethod
+    def create(cls, path, model, n, w0=20_000, sigma=2.5, threshold_k=None, seed=None,
+               chunk_size=DEFAULT_CHUNK_SIZE) -> 'Population':
+        """A population of n participants at period 0, written to directory `path`."""
+        threshold_k = resolve_threshold(model, threshold_k)
+        os.makedirs(path, exist_ok=True)
+        streams = chunk_streams(seed, -(-n // chunk_size))
+        wealth = np.lib.format.open_memmap(os.path.join(path, 'wealth.npy'), mode='w+', dtype=np.float64, shape=(n,))
+        active = np.lib.format.open_memmap(os.path.join(path, 'active.npy'), mode='w+', dtype=bool, shape=(n,))
+        for start in range(0, n, chunk_size):
+            wealth[start:start + chunk_size] = w0
+            active[start:start + chunk_size] = True
+        wealth.flush()
+        active.flush()
+        del wealth, active
+
+        meta = {
+            'model': model, 'n': n, 'w0': w0, 'sigma': sigma, 'threshold_k': threshold_k,
+            'seed': seed, 'chunk_size': chunk_size, 'period': 0,
+            'rng_states': [np.random.default_rng(stream).bit_generator.state for stream in streams],
+        }
+        population = cls(path, meta)
+        population._save_meta()
+        return population
+
+    @classmethod
+    def open(cls, path) -> 'Population':
+        with open(os.path.join(path, _META)) as f:
+            return cls(path, json.load(f))
+
+    def _save_meta(self):
+        tmp = os.path.join(self.path, _META + '.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(self.meta, f)
+        os.replace(tmp, os.path.join(self.path, _META))
+
+    # -- state --------------------------------------------------------------
+
+    @property
+    def n(self) -> int:
+        return self.meta['n']
+
+    @property
+    def period(self) -> int:
+        return self.meta['period']
+
+    @property
+    def wealth(self) -> np.memmap:
+        """Current wealth, mapped read-only (zero-copy)."""
+        return np.load(os.path.join(self.path, 'wealth.npy'), mmap_mode='r')
+
+    @property
+    def active(self) -> np.memmap:
+        return np.load(os.path.join(self.path, 'active.npy'), mmap_mode='r')
+
+    def chunks(self, array=None):
+        """Consecutive chunk_size views of the wealth (or another per-participant array)."""
+        array = self.wealth if array is None else array
+        size = self.meta['chunk_size']
+        for start in range(0, self.n, size):
+            yield array[start:start + size]
+
+    # -- simulation ---------------------------------------------------------
+
+    def advance(self, periods=1) -> 'Population':
+        """Simulate `periods` more periods in place, one sweep over the files per period."""
+        meta = self.meta
+        wealth = np.load(os.path.join(self.path, 'wealth.npy'), mmap_mode='r+')
+        active = np.load(os.path.join(self.path, 'active.npy'), mmap_mode='r+')
+        # Scratch for the kernels; wealth and in_game are the mapped chunks themselves
+        size = min(meta['chunk_size'], self.n)
+        z, tmp, mask = np.empty(size), np.empty(size), np.empty(size, dtype=bool)
+        rngs = []
+        for state in meta['rng_states']:
+            rng = np.random.default_rng()
+            rng.bit_generator.state = state
+            rngs.append(rng)
+
+        for _ in range(periods):
+            for rng, w, in_game in zip(rngs, self.chunks(wealth), self.chunks(active)):
+                m = len(w)
+                advance_block(meta['model'], w, z[:m], tmp[:m], in_game, mask[:m], rng, 1,
+                              meta['sigma'], meta['threshold_k'])
+            wealth.flush()
+            active.flush()
+            meta['period'] += 1
+            meta['rng_states'] = [rng.bit_generator.state for rng in rngs]
+            self._save_meta()
+        return self
+
+    def reduce(self, reducers):
+        """Feed the current wealth to reducers chunk by chunk, straight from the mapped file."""
+        for w in self.chunks():
+            for reducer in reducers:
+                reducer.update(w)
+        return reducers
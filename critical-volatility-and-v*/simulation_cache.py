@@ -0,0 +1,326 @@
+"""
+Disk-backed, content-addressed cache of simulation results.
+
+A run is identified by the simulating function's name, all of its
+arguments (defaults included: n, t, w0, sigma, threshold_k, seed, ...) and
+a code version: a hash of the function's source, of the functions and
+constants it uses from its own module, and of simulation_engine.py. So
+editing a simulator, a helper it calls or the engine invalidates its
+entries, while edits elsewhere in its module (plotting code next to the
+simulators) do not. The module name is not part of the key, so a run
+cached by `python plots.py` (module __main__) is found by `import plots`.
+Runs without a seed draw fresh entropy and are never cached.
+
+Results are read-only memory maps of the stored arrays, whether they were
+just computed or loaded; copy one before modifying it in place.
+
+Each entry is a directory named by the key:
+
+    wealth.npy          final wealth (wealth_0.npy, ... for a sweep), memory-mapped on load
+    stats.json          optional summary statistics
+    meta.json           function, arguments, code version, creation time
+
+Entries are written to a temporary directory and renamed into place, so an
+interrupted run leaves no partial entry. When the cache exceeds max_bytes,
+the least recently used entries are evicted.
+
+Usage:
+    cache = SimulationCache()
+    wealth = cache.call(simulate_atv_model, sigma=3.0, seed=42)   # computed once
+    wealth = cache.call(simulate_atv_model, sigma=3.0, seed=42)   # memory-mapped, ~1 ms
+
+    python simulation_cache.py list
+    python simulation_cache.py clear [--function simulate_atv_model]
+    python simulation_cache.py evict --max-bytes 2e9
+"""
+
+import argparse
+import hashlib
+import inspect
+import json
+import os
+import shutil
+import tempfile
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+DEFAULT_ROOT = os.environ.get('SIM_CACHE_DIR', '.sim_cache')
+DEFAULT_MAX_BYTES = 4 << 30
+
+_ENGINE_SOURCE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'simulation_engine.py')
+
+
+@dataclass
+class CacheEntry:
+    key: str
+    wealth: object  # np.memmap, a list of them for a sweep, or None
+    stats: Optional[dict]
+    meta: dict
+
+
+def _json_value(value):
+    """Arguments as plain JSON, so equal runs give equal keys."""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, (list, tuple)):
+        return [_json_value(v) for v in value]
+    if isinstance(value, dict):
+        return {str(k): _json_value(v) for k, v in value.items()}
+    if isinstance(value, np.dtype) or isinstance(value, type):
+        return str(value)
+    return value
+
+
+_code_versions = {}
+
+
+def _referenced_names(code) -> set:
+    """Global names used by a code object and the functions nested in it."""
+    names = set(code.co_names)
+    for const in code.co_consts:
+        if inspect.iscode(const):
+            names |= _referenced_names(const)
+    return names
+
+
+def _dependencies(func) -> dict:
+    """
+    {name: source or repr} of func and of the functions and plain constants
+    it uses from its own module, transitively. Other modules (numpy,
+    simulation_engine, ...) are left to the engine hash or their version.
+    """
+    found, stack = {}, [func]
+    while stack:
+        f = stack.pop()
+        found[f.__qualname__] = inspect.getsource(f)
+        for name in sorted(_referenced_names(f.__code__)):
+            obj = f.__globals__.get(name)
+            if name in found or obj is None:
+                continue
+            if inspect.isfunction(obj) and obj.__module__ == func.__module__:
+                stack.append(obj)
+            elif isinstance(obj, (bool, int, float, str, tuple, frozenset)):
+                found[name] = repr(obj)
+    return found
+
+
+def code_version(func) -> str:
+    """Hash of func's source, of what it uses from its module and of the engine's source."""
+    name = (func.__module__, func.__qualname__)
+    if name not in _code_versions:
+        digest = hashlib.sha256()
+        for dependency, source in sorted(_dependencies(func).items()):
+            digest.update(f"{dependency}\0{source}\0".encode())
+        if os.path.exists(_ENGINE_SOURCE):
+            with open(_ENGINE_SOURCE, 'rb') as f:
+                digest.update(f.read())
+        _code_versions[name] = digest.hexdigest()[:16]
+    return _code_versions[name]
+
+
+class SimulationCache:
+    """
+    Args:
+        root:      cache directory (default: $SIM_CACHE_DIR or ./.sim_cache)
+        max_bytes: total size kept on disk; least recently used entries beyond it are evicted
+    """
+
+    def __init__(self, root=DEFAULT_ROOT, max_bytes=DEFAULT_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    # -- keys ---------------------------------------------------------------
+
+    def describe(self, func, args=(), kwargs=None, ignore=()) -> dict:
+        """The run's identity: function, all arguments (defaults included) and code version."""
+        bound = inspect.signature(func).bind(*args, **(kwargs or {}))
+        bound.apply_defaults()
+        params = {name: _json_value(value) for name, value in bound.arguments.items() if name not in ignore}
+        return {
+            'function': func.__qualname__,
+            'params': params,
+            'code_version': code_version(func),
+        }
+
+    @staticmethod
+    def key(description) -> str:
+        return hashlib.sha256(json.dumps(description, sort_keys=True).encode()).hexdigest()[:32]
+
+    # -- entries ------------------------------------------------------------
+
+    def _path(self, key):
+        return os.path.join(self.root, key)
+
+    def get(self, key) -> Optional[CacheEntry]:
+        path = self._path(key)
+        meta_path = os.path.join(path, 'meta.json')
+        if not os.path.exists(meta_path):
+            return None
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if meta['arrays'] is None:
+            wealth = None
+        elif meta['arrays'] == 'single':
+            wealth = np.load(os.path.join(path, 'wealth.npy'), mmap_mode='r')
+        else:
+            wealth = [np.load(os.path.join(path, f'wealth_{i}.npy'), mmap_mode='r') for i in range(meta['arrays'])]
+        stats = None
+        if os.path.exists(os.path.join(path, 'stats.json')):
+            with open(os.path.join(path, 'stats.json')) as f:
+                stats = json.load(f)
+        os.utime(meta_path)  # last use, for eviction
+        return CacheEntry(key, wealth, stats, meta)
+
+    def put(self, key, description, wealth=None, stats=None) -> CacheEntry:
+        """Store a result (an array, a list of arrays, or None) and optional stats."""
+        os.makedirs(self.root, exist_ok=True)
+        tmp = tempfile.mkdtemp(prefix='.tmp-', dir=self.root)
+        try:
+            if wealth is None:
+                arrays = None
+            elif isinstance(wealth, np.ndarray):
+                arrays = 'single'
+                np.save(os.path.join(tmp, 'wealth.npy'), wealth)
+            else:
+                arrays = len(wealth)
+                for i, w in enumerate(wealth):
+                    np.save(os.path.join(tmp, f'wealth_{i}.npy'), w)
+            if stats is not None:
+                with open(os.path.join(tmp, 'stats.json'), 'w') as f:
+                    json.dump(_json_value(stats), f)
+            meta = dict(description, arrays=arrays, created=time.time())
+            with open(os.path.join(tmp, 'meta.json'), 'w') as f:
+                json.dump(meta, f)
+            if os.path.exists(self._path(key)):
+                shutil.rmtree(self._path(key))
+            os.rename(tmp, self._path(key))
+        except BaseException:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+        self.evict()
+        return self.get(key)
+
+    def call(self, func, *args, ignore=(), **kwargs):
+        """
+        func(*args, **kwargs), from the cache when possible. Arguments named
+        in `ignore` do not change the result (e.g. workers for the engine)
+        and are left out of the key.
+
+        Returns the stored result (read-only np.memmap, or a list of them)
+        on a miss as on a hit; only a result too large for max_bytes comes
+        back as computed.
+        """
+        description = self.describe(func, args, kwargs, ignore)
+        if description['params'].get('seed', 0) is None:
+            return func(*args, **kwargs)
+        key = self.key(description)
+        entry = self.get(key)
+        if entry is not None:
+            self.hits += 1
+            return entry.wealth
+        self.misses += 1
+        wealth = func(*args, **kwargs)
+        entry = self.put(key, description, wealth)
+        return entry.wealth if entry is not None else wealth
+
+    def stats(self, func, *args, ignore=(), **kwargs) -> Optional[dict]:
+        """Summary statistics stored for a run with put_stats, or None."""
+        entry = self.get(self.key(self.describe(func, args, kwargs, ignore)))
+        return entry.stats if entry is not None else None
+
+    def put_stats(self, stats, func, *args, ignore=(), **kwargs):
+        """Attach summary statistics to a run (creating a stats-only entry if needed)."""
+        description = self.describe(func, args, kwargs, ignore)
+        key = self.key(description)
+        path = self._path(key)
+        if os.path.exists(os.path.join(path, 'meta.json')):
+            with open(os.path.join(path, 'stats.json'), 'w') as f:
+                json.dump(_json_value(stats), f)
+        else:
+            self.put(key, description, stats=stats)
+
+    # -- maintenance --------------------------------------------------------
+
+    def entries(self) -> list:
+        """(key, bytes, last used, meta) for every entry, least recently used first."""
+        if not os.path.isdir(self.root):
+            return []
+        found = []
+        for key in os.listdir(self.root):
+            meta_path = os.path.join(self.root, key, 'meta.json')
+            if key.startswith('.') or not os.path.exists(meta_path):
+                continue
+            with open(meta_path) as f:
+                meta = json.load(f)
+            size = sum(entry.stat().st_size for entry in os.scandir(os.path.join(self.root, key)))
+            found.append((key, size, os.path.getmtime(meta_path), meta))
+        return sorted(found, key=lambda e: e[2])
+
+    def size(self) -> int:
+        return sum(size for _, size, _, _ in self.entries())
+
+    def evict(self, max_bytes=None) -> int:
+        """Remove least recently used entries until the cache fits; returns how many."""
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        entries = self.entries()
+        total = sum(size for _, size, _, _ in entries)
+        removed = 0
+        for key, size, _, _ in entries:
+            if total <= max_bytes:
+                break
+            shutil.rmtree(self._path(key), ignore_errors=True)
+            total -= size
+            removed += 1
+        return removed
+
+    def invalidate(self, function=None) -> int:
+        """Remove every entry, or those of one function (by name or qualified name)."""
+        removed = 0
+        for key, _, _, meta in self.entries():
+            name = meta['function']
+            if function is None or function in (name, name.rsplit('.', 1)[-1]):
+                shutil.rmtree(self._path(key), ignore_errors=True)
+                removed += 1
+        return removed
+
+
+def cached(cache: Optional[SimulationCache], func, *args, ignore=(), **kwargs):
+    """cache.call(func, ...), or a plain call when cache is None."""
+    if cache is None:
+        return func(*args, **kwargs)
+    return cache.call(func, *args, ignore=ignore, **kwargs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect and invalidate the simulation cache.")
+    parser.add_argument('--root', default=DEFAULT_ROOT, help="cache directory")
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('list', help="list entries, least recently used first")
+    clear = commands.add_parser('clear', help="remove all entries, or those of one function")
+    clear.add_argument('--function', default=None)
+    evict = commands.add_parser('evict', help="evict least recently used entries down to a size")
+    evict.add_argument('--max-bytes', type=float, default=DEFAULT_MAX_BYTES)
+    args = parser.parse_args()
+
+    cache = SimulationCache(args.root)
+    if args.command == 'list':
+        for key, size, used, meta in cache.entries():
+            params = ', '.join(f"{k}={v}" for k, v in meta['params'].items())
+            print(f"{key}  {size / 2**20:9.1f} MB  {time.strftime('%Y-%m-%d %H:%M', time.localtime(used))}  "
+                  f"{meta['function']}({params})")
+        print(f"total {cache.size() / 2**20:.1f} MB")
+    elif args.command == 'clear':
+        print(f"removed {cache.invalidate(args.function)} entries")
+    else:
+        print(f"evicted {cache.evict(int(args.max_bytes))} entries")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,394 @@
+"""
+Chunked Monte Carlo engine for the ATM / ATV simulators in plots.py.
+
+The simulators in plots.py hold the whole population and allocate several
+temporary float64 arrays every period, so memory grows with n. This engine
+runs the same models block by block: each block of `chunk_size`
+participants is simulated for all periods in preallocated buffers with
+in-place ufuncs, then handed to reducers and discarded. Peak memory is about
+27 bytes per participant of the chunk, whatever n is.
+
+Reducers summarize the blocks. They share one small protocol, so they can
+be combined freely and merged across runs:
+
+    update(w)     consume the final wealth of one block
+    merge(other)  fold in a reducer of the same kind from another run
+    result()      the summary
+
+Chunks can be spread over a process pool (workers=...). Every chunk draws
+from its own Generator spawned from SeedSequence(seed), and the blocks
+reach the reducers in chunk order. The result for a given seed and
+chunk_size is therefore bit-identical for any number of workers.
+
+Usage:
+    moments, spill = Moments(), SpillFile('wealth.f64')
+    run_chunked('atv', n=10**9, sigma=3.0, reducers=[moments, spill], seed=42, workers=8)
+    moments.result()['mean_wealth']
+"""
+
+import multiprocessing
+import os
+
+import numpy as np
+
+CRITICAL = np.sqrt(2 * np.pi)
+SIGMA_LOW = 0.1  # Low-risk option for dropouts (ATV / ATM models)
+
+# Default dropout thresholds, as in the plots.py simulators
+DEFAULT_THRESHOLD_K = {'atv': 1, 'atm': 2.5, 'real_atm': 0.1}
+
+DEFAULT_CHUNK_SIZE = 1 << 20
+
+
+# ---------------------------------------------------------------------------
+# Per-period kernels (in place on one block)
+# ---------------------------------------------------------------------------
+
+class BlockBuffers:
+    """
+    Work arrays for one block, allocated once per process and reused. A
+    sweep block has one row per sigma and shares one row of shocks.
+    """
+
+    def __init__(self, size, dtype, rows=None):
+        shape = size if rows is None else (rows, size)
+        self.w = np.empty(shape, dtype=dtype)
+        self.z = np.empty(shape, dtype=dtype)
+        self.tmp = np.empty(shape, dtype=dtype)
+        self.active = np.empty(shape, dtype=bool)
+        self.mask = np.empty(shape, dtype=bool)
+        self.shocks = np.empty((2, size), dtype=dtype) if rows is not None else None
+
+    def fits(self, m, dtype, rows):
+        shape = (m,) if rows is None else (rows, m)
+        return (self.w.dtype == dtype and self.w.ndim == len(shape)
+                and self.w.shape[:-1] == shape[:-1] and self.w.shape[-1] >= m)
+
+    def view(self, m):
+        arrays = [a[..., :m] for a in (self.w, self.z, self.tmp, self.active, self.mask)]
+        return arrays + [self.shocks[:, :m] if self.shocks is not None else None]
+
+
+def _period_high_low(w, z, tmp, active, mask, high, low, sigma, threshold_k, drop_first):
+    """
+    One year of simulate_atv_model (drop_first=False) or simulate_atm_model
+    (drop_first=True): active participants take the ATM payoff max(X, 0),
+    X ~ N(0, σw); dropouts take the low-risk payoff max(w(1 + 0.1 Z), 0).
+    high and low are the standard-normal shocks (they may alias z and tmp).
+    """
+    # High-risk payoff into z
+    np.multiply(high, sigma, out=z)
+    z *= w
+    np.maximum(z, 0, out=z)
+
+    # Low-risk payoff into tmp
+    np.multiply(low, SIGMA_LOW, out=tmp)
+    tmp += 1
+    tmp *= w
+    np.maximum(tmp, 0, out=tmp)
+
+    # Dropout: payoff below threshold_k * w (mask = stays); w is free now
+    w *= threshold_k
+    np.greater_equal(z, w, out=mask)
+
+    if drop_first:
+        active &= mask
+    np.copyto(w, tmp)
+    np.copyto(w, z, where=active)
+    if not drop_first:
+        active &= mask
+
+
+def _period_real_atm(w, z, tmp, active, mask, high, sigma, threshold_k):
+    """One period of simulate_real_atm_model: pay σw/√(2π), receive max(X, 0)."""
+    np.multiply(high, sigma, out=z)
+    z *= w
+    np.maximum(z, 0, out=z)
+
+    np.multiply(w, sigma / CRITICAL, out=tmp)  # premium
+    z -= tmp
+    z += w
+    np.maximum(z, 0, out=z)  # new wealth
+
+    if threshold_k > 0:
+        np.multiply(w, threshold_k, out=tmp)
+        np.greater_equal(z, tmp, out=mask)
+        active &= mask
+    np.copyto(w, z, where=active)
+
+
+def simulate_block(model, w, z, tmp, active, mask, rng, t, w0, sigma, threshold_k, shocks=None):
+    """
+    Run all t periods for one block; the final wealth is left in w.
+
+    For a sweep, w and the work arrays have one row per sigma, sigma is a
+    column of shape (rows, 1) and shocks is a (2, m) array: each period's
+    normals are drawn once into it and shared by every row. Draws happen in
+    the same order either way, so row i equals a single run at sigma[i].
+    """
+    w.fill(w0)
+    active.fill(True)
+    advance_block(model, w, z, tmp, active, mask, rng, t, sigma, threshold_k, shocks)
+
+
+def advance_block(model, w, z, tmp, active, mask, rng, periods, sigma, threshold_k, shocks=None):
+    """Advance a block's state (w, active) by `periods` periods, drawing from rng."""
+    high, low = (z, tmp) if shocks is None else shocks
+    for _ in range(periods):
+        rng.standard_normal(out=high)
+        if model == 'real_atm':
+            _period_real_atm(w, z, tmp, active, mask, high, sigma, threshold_k)
+        else:
+            rng.standard_normal(out=low)
+            _period_high_low(w, z, tmp, active, mask, high, low, sigma, threshold_k, drop_first=(model == 'atm'))
+
+
+# ---------------------------------------------------------------------------
+# Engine
+# ---------------------------------------------------------------------------
+
+def chunk_streams(seed, n_chunks) -> list:
+    """One independent SeedSequence per chunk, spawned from SeedSequence(seed)."""
+    return np.random.SeedSequence(seed).spawn(n_chunks)
+
+
+def run_chunked(model, n, t=15, w0=20_000, sigma=2.5, threshold_k=None, reducers=(),
+                chunk_size=DEFAULT_CHUNK_SIZE, seed=None, workers=None, rng=None, dtype=np.float64):
+    """
+    Simulate n participants of `model` ('atv', 'atm' or 'real_atm') in blocks
+    of chunk_size and feed every block's final wealth to the reducers, in
+    chunk order.
+
+    Args:
+        threshold_k: dropout threshold (default: the model's default in plots.py)
+        reducers:    objects with update(w); see Moments, Collect, SpillFile
+        seed:        root of the per-chunk streams (None: fresh entropy)
+        workers:     number of processes (None or 1: run in this process)
+        rng:         a single Generator drawn from by every chunk in turn,
+                     instead of per-chunk streams (sequential runs only)
+        dtype:       float64, or float32 to halve memory per participant
+
+    Returns:
+        the reducers, for chaining
+    """
+    threshold_k = resolve_threshold(model, threshold_k)
+    if rng is not None and workers not in (None, 1):
+        raise ValueError("A shared rng cannot be split across workers; pass a seed instead.")
+
+    params = (model, t, w0, sigma, threshold_k, np.dtype(dtype))
+    for w in _run_blocks(params, n, chunk_size, seed, workers, rng):
+        for reducer in reducers:
+            reducer.update(w)
+    return reducers
+
+
+def simulate(model, n, t=15, w0=20_000, sigma=2.5, threshold_k=None, seed=None, workers=None,
+             chunk_size=DEFAULT_CHUNK_SIZE) -> np.ndarray:
+    """Final wealth of all n participants, as one array (n must fit in memory)."""
+    out = np.empty(n)
+    params = (model, t, w0, sigma, resolve_threshold(model, threshold_k), out.dtype)
+    for start, w in zip(range(0, n, chunk_size), _run_blocks(params, n, chunk_size, seed, workers)):
+        out[start:start + len(w)] = w
+    return out
+
+
+def run_sweep(model, n, sigmas, t=15, w0=20_000, threshold_k=None, reducers=None,
+              chunk_size=DEFAULT_CHUNK_SIZE, seed=None, workers=None, dtype=np.float64):
+    """
+    run_chunked() for several sigmas at once with common random numbers:
+    each chunk draws its standard-normal shocks once and applies them to
+    every sigma in a (sigma x participant) block, so a sweep makes as many
+    RNG calls as a single run, and the differences between sigmas carry no
+    sampling noise from independent draws. Row i is bit-identical to
+    run_chunked(..., sigma=sigmas[i]) with the same seed and chunk_size.
+
+    Memory per chunk grows with len(sigmas); lower chunk_size for wide sweeps.
+
+    Args:
+        reducers: one sequence of reducers per sigma (default: a Moments each)
+
+    Returns:
+        the reducers, one sequence per sigma
+    """
+    threshold_k = resolve_threshold(model, threshold_k)
+    sigmas = tuple(float(sigma) for sigma in sigmas)
+    if reducers is None:
+        reducers = [[Moments()] for _ in sigmas]
+    if len(reducers) != len(sigmas):
+        raise ValueError(f"Expected one reducer sequence per sigma ({len(sigmas)}), got {len(reducers)}.")
+
+    params = (model, t, w0, sigmas, threshold_k, np.dtype(dtype))
+    for block in _run_blocks(params, n, chunk_size, seed, workers):
+        for w, row_reducers in zip(block, reducers):
+            for reducer in row_reducers:
+                reducer.update(w)
+    return reducers
+
+
+def simulate_sweep(model, n, sigmas, t=15, w0=20_000, threshold_k=None, seed=None, workers=None,
+                   chunk_size=DEFAULT_CHUNK_SIZE) -> list:
+    """Final wealth of all n participants for every sigma, one array per sigma."""
+    sigmas = tuple(float(sigma) for sigma in sigmas)
+    out = [np.empty(n) for _ in sigmas]
+    params = (model, t, w0, sigmas, resolve_threshold(model, threshold_k), np.dtype(np.float64))
+    for start, block in zip(range(0, n, chunk_size), _run_blocks(params, n, chunk_size, seed, workers)):
+        for row, w in zip(out, block):
+            row[start:start + len(w)] = w
+    return out
+
+
+def resolve_threshold(model, threshold_k):
+    """threshold_k, or the model's default; rejects unknown models."""
+    if model not in DEFAULT_THRESHOLD_K:
+        raise ValueError(f"Unknown model {model!r}; expected one of {sorted(DEFAULT_THRESHOLD_K)}.")
+    return DEFAULT_THRESHOLD_K[model] if threshold_k is None else threshold_k
+
+
+def _run_blocks(params, n, chunk_size, seed, workers, rng=None):
+    """Final-wealth blocks in chunk order, simulated here or on a pool."""
+    starts = range(0, n, chunk_size)
+    if rng is not None:
+        tasks = ((params, min(chunk_size, n - start), rng) for start in starts)
+    else:
+        streams = chunk_streams(seed, len(starts))
+        tasks = ((params, min(chunk_size, n - start), stream) for start, stream in zip(starts, streams))
+
+    if workers in (None, 1):
+        yield from map(_simulate_chunk, tasks)
+    else:
+        with pool_context().Pool(workers) as pool:
+            yield from pool.imap(_simulate_chunk, tasks)
+
+
+# Work buffers of this process, reused by every chunk it simulates
+_buffers = None
+
+
+def _simulate_chunk(task) -> np.ndarray:
+    """
+    Final wealth of one chunk (one row per sigma for a sweep). The returned
+    array is a view of this process's buffers: valid until the next chunk,
+    which is long enough for the reducers in-process and for pickling it
+    back from a worker.
+    """
+    global _buffers
+    (model, t, w0, sigma, threshold_k, dtype), m, stream = task
+    rows = len(sigma) if isinstance(sigma, tuple) else None
+    if _buffers is None or not _buffers.fits(m, dtype, rows):
+        _buffers = BlockBuffers(m, dtype, rows)
+    if rows is not None:
+        sigma = np.array(sigma)[:, None]
+    rng = stream if isinstance(stream, np.random.Generator) else np.random.default_rng(stream)
+    w, z, tmp, active, mask, shocks = _buffers.view(m)
+    simulate_block(model, w, z, tmp, active, mask, rng, t, w0, sigma, threshold_k, shocks)
+    return w
+
+
+def pool_context():
+    """
+    Start method for simulation pools: workers are forked from a server
+    with numpy and this module preloaded (spawn-like isolation, fork-like
+    start-up), or the platform default where fork servers are unavailable.
+    """
+    if 'forkserver' not in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context()
+    ctx = multiprocessing.get_context('forkserver')
+    ctx.set_forkserver_preload(['numpy', __name__])
+    return ctx
+
+
+# ---------------------------------------------------------------------------
+# Reducers
+# ---------------------------------------------------------------------------
+
+class Moments:
+    """Counts, sum and extremes of final wealth, overall and among the living (w > 0)."""
+
+    def __init__(self):
+        self.count = 0
+        self.living = 0
+        self.sum = 0.0
+        self.sum_sq = 0.0
+        self.min_living = np.inf
+        self.max = 0.0
+
+    def update(self, w):
+        living = w[w > 0]
+        self.count += len(w)
+        self.living += len(living)
+        if len(living):
+            self.sum += float(np.sum(living, dtype=np.float64))
+            self.sum_sq += float(np.dot(living, living))
+            self.min_living = min(self.min_living, float(living.min()))
+            self.max = max(self.max, float(living.max()))
+
+    def merge(self, other):
+        self.count += other.count
+        self.living += other.living
+        self.sum += other.sum
+        self.sum_sq += other.sum_sq
+        self.min_living = min(self.min_living, other.min_living)
+        self.max = max(self.max, other.max)
+        return self
+
+    def result(self) -> dict:
+        mean = self.sum / self.living if self.living else 0.0
+        var = self.sum_sq / self.living - mean ** 2 if self.living else 0.0
+        return {
+            'count': self.count,
+            'total_survivors': self.living,
+            'mean_wealth': mean,
+            'std_wealth': np.sqrt(max(var, 0.0)),
+            'min_living': self.min_living if self.living else 0.0,
+            'max_wealth': self.max,
+        }
+
+
+class Collect:
+    """Keep every block (only for n that fits in memory); result() is the full array."""
+
+    def __init__(self):
+        self.blocks = []
+
+    def update(self, w):
+        self.blocks.append(w.copy())
+
+    def merge(self, other):
+        self.blocks.extend(other.blocks)
+        return self
+
+    def result(self) -> np.ndarray:
+        return np.concatenate(self.blocks) if self.blocks else np.empty(0)
+
+
+class SpillFile:
+    """
+    Append every block to a raw binary file (native-endian, dtype of the
+    run), for populations too large to keep; result() maps it back with
+    np.memmap without reading it into memory.
+    """
+
+    def __init__(self, path, dtype=np.float64, append=False):
+        self.path = path
+        self.dtype = np.dtype(dtype)
+        self.count = os.path.getsize(path) // self.dtype.itemsize if append and os.path.exists(path) else 0
+        if not append:
+            open(path, 'wb').close()
+
+    def update(self, w):
+        with open(self.path, 'ab') as f:
+            np.asarray(w, dtype=self.dtype).tofile(f)
+        self.count += len(w)
+
+    def merge(self, other):
+        """Append another spill file's contents to this one."""
+        with open(self.path, 'ab') as out, open(other.path, 'rb') as src:
+            while block := src.read(1 << 24):
+                out.write(block)
+        self.count += other.count
+        return self
+
+    def result(self) -> np.memmap:
+        if self.count == 0:
+            return np.empty(0, dtype=self.dtype)
+        return np.memmap(self.path, dtype=self.dtype, mode='r', shape=(self.count,))
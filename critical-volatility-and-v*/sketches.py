@@ -0,0 +1,217 @@
+"""
+Mergeable streaming sketches of a wealth distribution.
+
+For populations too large to hold, these reducers summarize the final
+wealth block by block (simulation_engine.run_chunked) in memory that does
+not grow with n, and merge across chunks, workers and runs. They cover what
+the plots read from the full population:
+
+    LogHistogram   the ax.hist input       exact counts for fixed log bins
+    TopK           the extreme tail        exact k largest values
+    DDSketch       median, rank curve      quantiles within relative error α
+
+sketch_rank_curve() combines TopK (exact for the top k ranks) and DDSketch
+(relative error α below them) into the rank-wealth curve.
+
+Usage:
+    hist, top, quantiles = LogHistogram(), TopK(1000), DDSketch(0.01)
+    run_chunked('atv', n=10**9, sigma=3.0, reducers=[hist, top, quantiles], workers=8)
+    ranks, values = sketch_rank_curve(top, quantiles)
+    median = quantiles.quantile(0.5, include_zeros=False)
+"""
+
+import numpy as np
+
+from wealth_stats import log_rank_positions
+
+
+class LogHistogram:
+    """
+    Counts of wealth in fixed bins; the default edges are those of
+    plot_single_regime_comparison (100 log-spaced edges from $100 to $1T).
+
+    Error bound: none; the counts equal np.histogram(w, edges) over all
+    blocks. Values outside the edges (including zeros) are counted in
+    `below` / `above`.
+
+    To draw it: ax.hist(edges[:-1], bins=edges, weights=counts, density=True)
+    gives the same bars as ax.hist(w, bins=edges, density=True).
+    """
+
+    def __init__(self, edges=None):
+        self.edges = np.logspace(2, 12, 100) if edges is None else np.asarray(edges, dtype=float)
+        self.counts = np.zeros(len(self.edges) - 1, dtype=np.int64)
+        self.below = 0
+        self.above = 0
+
+    def update(self, w):
+        self.counts += np.histogram(w, bins=self.edges)[0]
+        self.below += int(np.count_nonzero(w < self.edges[0]))
+        self.above += int(np.count_nonzero(w > self.edges[-1]))
+
+    def merge(self, other):
+        if not np.array_equal(self.edges, other.edges):
+            raise ValueError("Cannot merge histograms with different bin edges.")
+        self.counts += other.counts
+        self.below += other.below
+        self.above += other.above
+        return self
+
+    def density(self) -> np.ndarray:
+        """Probability density per bin, as np.histogram(..., density=True)."""
+        total = self.counts.sum()
+        return self.counts / (total * np.diff(self.edges)) if total else np.zeros(len(self.counts))
+
+    def result(self):
+        return self.edges, self.counts
+
+
+class TopK:
+    """
+    The k largest values seen (exact). Each block is filtered against the
+    current k-th largest value, so after the first blocks only a few
+    candidates per block are merged in.
+    """
+
+    def __init__(self, k=1000):
+        self.k = k
+        self.values = np.empty(0)
+
+    def update(self, w):
+        w = np.asarray(w)
+        if len(self.values) == self.k:
+            w = w[w > self.values[0]]
+        if len(w):
+            self._keep(np.concatenate([self.values, w]))
+
+    def merge(self, other):
+        self._keep(np.concatenate([self.values, other.values]))
+        return self
+
+    def _keep(self, values):
+        if len(values) > self.k:
+            values = np.partition(values, len(values) - self.k)[len(values) - self.k:]
+        # values[0] is the smallest kept value, the filter threshold for update()
+        self.values = np.partition(values, 0) if len(values) else values
+
+    def result(self) -> np.ndarray:
+        """The top values in descending order."""
+        return np.sort(self.values)[::-1]
+
+    def hill_alpha(self) -> float:
+        """
+        Hill estimate of the tail exponent α from the kept values: the k - 1
+        largest against the k-th as threshold (nan if fewer than two positive values).
+        """
+        top = self.result()
+        top = top[top > 0]
+        if len(top) < 2:
+            return float('nan')
+        gamma = np.mean(np.log(top[:-1])) - np.log(top[-1])
+        return 1 / gamma if gamma > 0 else float('inf')
+
+
+class DDSketch:
+    """
+    Relative-error quantile sketch (DDSketch, Masson et al. 2019) for
+    non-negative values.
+
+    Positive values fall into logarithmic buckets (γ^(i-1), γ^i] with
+    γ = (1 + α) / (1 - α), and each bucket is represented by 2γ^i / (γ + 1).
+    Error bound: every quantile or rank query returns a value within
+    relative error α of the exact order statistic. Zeros are counted exactly.
+    Memory is one counter per bucket between the smallest and the largest
+    value: log(max / min) / log(γ), about 2,100 buckets for α = 1% over
+    values from 10⁻³ to 10¹⁵.
+    """
+
+    def __init__(self, relative_accuracy=0.01):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy must be in (0, 1).")
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = np.log(self.gamma)
+        self.counts = np.zeros(0, dtype=np.int64)
+        self.offset = 0  # bucket index of counts[0]
+        self.zeros = 0
+        self.count = 0  # positive values
+
+    def update(self, w):
+        w = np.asarray(w)
+        if len(w) and w.min() < 0:
+            raise ValueError("DDSketch only accepts non-negative values.")
+        positive = w[w > 0]
+        self.zeros += len(w) - len(positive)
+        if len(positive):
+            index = np.ceil(np.log(positive) / self._log_gamma).astype(np.int64)
+            low = int(index.min())
+            self._add(low, np.bincount(index - low))
+
+    def merge(self, other):
+        if other.gamma != self.gamma:
+            raise ValueError("Cannot merge sketches with different relative accuracy.")
+        self.zeros += other.zeros
+        if other.count:
+            self._add(other.offset, other.counts)
+        return self
+
+    def _add(self, low, counts):
+        """Add bucket counts starting at bucket index low, growing the array as needed."""
+        high = low + len(counts)
+        if not self.count:
+            self.counts, self.offset = np.zeros(len(counts), dtype=np.int64), low
+        elif low < self.offset or high > self.offset + len(self.counts):
+            new_offset = min(low, self.offset)
+            grown = np.zeros(max(high, self.offset + len(self.counts)) - new_offset, dtype=np.int64)
+            grown[self.offset - new_offset:self.offset - new_offset + len(self.counts)] = self.counts
+            self.counts, self.offset = grown, new_offset
+        self.counts[low - self.offset:high - self.offset] += counts
+        self.count += int(counts.sum())
+
+    def values_at_ranks(self, ranks) -> np.ndarray:
+        """Estimated values at 0-based ascending ranks among the positive values."""
+        ranks = np.asarray(ranks)
+        if np.any((ranks < 0) | (ranks >= self.count)):
+            raise IndexError(f"Ranks must lie in [0, {self.count}).")
+        bucket = np.searchsorted(np.cumsum(self.counts), ranks, side='right') + self.offset
+        return 2 * self.gamma ** bucket / (self.gamma + 1)
+
+    def quantile(self, q, include_zeros=True):
+        """
+        The value at rank floor(q * (n - 1)) (n: all values, or only the
+        positive ones with include_zeros=False); q may be an array.
+        """
+        q = np.asarray(q, dtype=float)
+        n = self.count + self.zeros if include_zeros else self.count
+        if n == 0:
+            raise ValueError("Quantile of an empty sketch.")
+        rank = np.floor(q * (n - 1)).astype(np.int64)
+        if include_zeros:
+            rank = rank - self.zeros
+        positive = rank >= 0
+        values = np.zeros(rank.shape)
+        values[positive] = self.values_at_ranks(rank[positive])
+        return values if values.ndim else float(values)
+
+    def result(self) -> dict:
+        """Counts and the median of the living (w > 0), as in plot_transition's statistics."""
+        return {'count': self.count + self.zeros, 'zeros': self.zeros,
+                'median_wealth': self.quantile(0.5, include_zeros=False) if self.count else 0.0}
+
+
+def sketch_rank_curve(top: TopK, quantiles: DDSketch, num=1000):
+    """
+    (ranks, values) of the positive values at about num log-spaced ranks,
+    like wealth_stats.rank_curve: exact for ranks up to top.k, within
+    relative error α (quantiles.relative_accuracy) below them. Both sketches
+    must have seen the same values.
+    """
+    n = quantiles.count
+    positions = log_rank_positions(n, num)
+    top_values = top.result()
+    top_values = top_values[top_values > 0]
+    values = np.empty(len(positions))
+    exact = positions < len(top_values)
+    values[exact] = top_values[positions[exact]]
+    values[~exact] = quantiles.values_at_ranks(n - 1 - positions[~exact])
+    return positions + 1, values
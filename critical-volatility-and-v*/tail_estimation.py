@@ -0,0 +1,265 @@
+"""
+Tail-exponent estimation: Hill and power-law MLE, with bootstrap intervals.
+
+Both estimators read only the largest values, so they work from the top
+order statistics of a run: wealth_stats.top_k() on a population in memory,
+or the sketches of a chunked run (TopK, extended below its k ranks by a
+DDSketch). α is the tail exponent of vstar_theory(): P(W > w) ~ w^-α, so
+the rank-wealth curve falls as rank^(-1/α).
+
+    hill()           Hill estimate for every number k of order statistics
+    powerlaw_fit()   continuous power-law MLE with x_min chosen by the
+                     Kolmogorov-Smirnov distance (Clauset, Shalizi & Newman 2009)
+    bootstrap()      percentile interval of either, replicates in parallel
+
+For a given x_min, the (bias-corrected) MLE of α is the Hill estimate with
+x_min as threshold, so powerlaw_fit() evaluates all candidate thresholds
+from one cumulative sum and scores each by the KS distance between the
+tail above it and the fitted power law.
+
+Bootstrap replicates resample the order statistics with replacement (the
+full-sample bootstrap, given the number of values above the threshold) and
+are fitted in batches, vectorized over replicates. Batch i draws from the
+i-th stream spawned from SeedSequence(seed), so intervals do not depend on
+the number of workers.
+
+Usage:
+    top = top_k(living, 5_000)
+    fit = powerlaw_fit(top)                     # alpha, x_min, n_tail, ks
+    fit = bootstrap(top, seed=42, workers=8)    # adds alpha_low, alpha_high
+    for row in sweep_tail_fits('atv', 10**7, [2.507, 3.0, 3.5], seed=42, workers=8):
+        print(row['sigma'], row['alpha_theory'], row['alpha'], row['alpha_low'], row['alpha_high'])
+
+    python tail_estimation.py --n 10000000 --sigmas 2.507 3 3.5 4 --workers 8
+"""
+
+import argparse
+
+import numpy as np
+
+from simulation_engine import DEFAULT_CHUNK_SIZE, chunk_streams, pool_context, resolve_threshold, run_sweep
+from sketches import DDSketch, TopK
+
+# Order statistics kept per run, and the smallest tail powerlaw_fit() considers
+DEFAULT_TAIL = 5_000
+MIN_TAIL = 50
+# Candidate thresholds for x_min: about this many log-spaced tail sizes
+_CANDIDATES = 100
+# Replicates per task: a batch of 5,000 order statistics is ~10 MB of work arrays
+_BOOTSTRAP_BATCH = 25
+
+
+def order_statistics(top: TopK, quantiles: DDSketch = None, k=None) -> np.ndarray:
+    """
+    The k largest positive values in descending order from the sketches of a
+    run: exact from TopK, then (if quantiles is given and k > top.k) within
+    relative error α from the DDSketch. Both sketches must have seen the
+    same values.
+    """
+    values = top.result()
+    values = values[values > 0]
+    if quantiles is None or k is None or k <= len(values) or len(values) < top.k:
+        return values[:k]
+    ranks = np.arange(len(values), min(k, quantiles.count))
+    return np.concatenate([values, quantiles.values_at_ranks(quantiles.count - 1 - ranks)])
+
+
+def hill(top, k=None) -> np.ndarray:
+    """
+    Hill estimates of α from descending order statistics: the k - 1 largest
+    against the k-th as threshold (as TopK.hill_alpha), for each k in k
+    (default: every k from 2 to len(top)). top may hold one sample per row.
+    """
+    log_top = np.log(top)
+    ks = np.arange(2, log_top.shape[-1] + 1) if k is None else np.asarray(k)
+    return _hill_logs(log_top, ks)
+
+
+def _hill_logs(log_top, ks):
+    cum = np.cumsum(log_top, axis=-1)
+    gamma = cum[..., ks - 2] / (ks - 1) - log_top[..., ks - 1]
+    with np.errstate(divide='ignore'):
+        return np.where(gamma > 0, 1 / gamma, np.inf)
+
+
+def _candidate_tails(size, min_tail=MIN_TAIL, num=_CANDIDATES) -> np.ndarray:
+    """Log-spaced tail sizes from min_tail to size."""
+    if size < min_tail:
+        raise ValueError(f"Need at least {min_tail} positive order statistics, got {size}.")
+    return np.unique(np.geomspace(min_tail, size, num).astype(np.intp))
+
+
+def _fit_rows(top, ks):
+    """(alpha, tail size, KS distance) of the best threshold for each row of top."""
+    log_top = np.log(top)
+    alphas = _hill_logs(log_top, ks)
+    distances = np.empty(alphas.shape)
+    for j, k in enumerate(ks):
+        # Fitted CCDF (x / x_min)^-α at each tail value against the empirical
+        # one, which steps from (i - 1) / k to i / k at the i-th largest
+        fitted = np.exp(-alphas[:, j:j + 1] * (log_top[:, :k] - log_top[:, k - 1:k]))
+        steps = np.arange(1, k + 1) / k
+        distances[:, j] = np.maximum(np.abs(fitted - steps), np.abs(fitted - (steps - 1 / k))).max(axis=1)
+    best = distances.argmin(axis=1)
+    rows = np.arange(len(top))
+    return alphas[rows, best], ks[best], distances[rows, best]
+
+
+def powerlaw_fit(top, min_tail=MIN_TAIL) -> dict:
+    """
+    Power-law MLE of α with x_min chosen to minimize the KS distance, from
+    descending order statistics (at least min_tail positive values).
+
+    Returns:
+        dict with alpha, x_min, n_tail (values at or above x_min) and ks
+    """
+    top = np.asarray(top, dtype=float)
+    top = top[top > 0]
+    ks = _candidate_tails(len(top), min_tail)
+    alpha, n_tail, distance = _fit_rows(top[np.newaxis], ks)
+    return {'alpha': float(alpha[0]), 'x_min': float(top[n_tail[0] - 1]),
+            'n_tail': int(n_tail[0]), 'ks': float(distance[0])}
+
+
+# ---------------------------------------------------------------------------
+# Bootstrap
+# ---------------------------------------------------------------------------
+
+def bootstrap(top, method='powerlaw', k=None, n_boot=1_000, level=0.95, min_tail=MIN_TAIL,
+              seed=None, workers=None, pool=None) -> dict:
+    """
+    Estimate α from descending order statistics, with a percentile bootstrap
+    interval.
+
+    Args:
+        method:  'powerlaw' (powerlaw_fit, x_min refitted per replicate) or
+                 'hill' (Hill estimate at k order statistics)
+        k:       order statistics for 'hill' (default: all of top)
+        level:   coverage of the interval
+        workers: processes for the replicates (None: this process)
+        pool:    an open pool to run them on instead (see tail_fit_rows)
+
+    Returns:
+        the estimate's dict (powerlaw_fit's, or alpha and k for 'hill') with
+        alpha_low, alpha_high and the replicates' alpha_se
+    """
+    top = np.asarray(top, dtype=float)
+    top = top[top > 0]
+    if method == 'powerlaw':
+        fit = powerlaw_fit(top, min_tail)
+    elif method == 'hill':
+        k = len(top) if k is None else min(k, len(top))
+        top = top[:k]
+        fit = {'alpha': float(hill(top, [k])[0]), 'k': k}
+    else:
+        raise ValueError(f"Unknown method: {method!r}")
+
+    sizes = [min(_BOOTSTRAP_BATCH, n_boot - start) for start in range(0, n_boot, _BOOTSTRAP_BATCH)]
+    tasks = ((top, method, min_tail, size, stream) for size, stream in zip(sizes, chunk_streams(seed, len(sizes))))
+    if pool is not None:
+        replicates = np.concatenate(list(pool.imap(_bootstrap_batch, tasks)))
+    elif workers in (None, 1):
+        replicates = np.concatenate(list(map(_bootstrap_batch, tasks)))
+    else:
+        with pool_context().Pool(workers) as pool:
+            replicates = np.concatenate(list(pool.imap(_bootstrap_batch, tasks)))
+
+    low, high = np.quantile(replicates, [(1 - level) / 2, (1 + level) / 2])
+    fit.update({'alpha_low': float(low), 'alpha_high': float(high), 'alpha_se': float(np.std(replicates))})
+    return fit
+
+
+def _bootstrap_batch(task) -> np.ndarray:
+    """α of one batch of resampled order statistics, fitted as one array."""
+    top, method, min_tail, size, stream = task
+    rng = np.random.default_rng(stream)
+    samples = top[rng.integers(0, len(top), size=(size, len(top)))]
+    samples.sort(axis=1)
+    samples = samples[:, ::-1]
+    if method == 'hill':
+        return hill(samples, [len(top)])[:, 0]
+    return _fit_rows(samples, _candidate_tails(len(top), min_tail))[0]
+
+
+# ---------------------------------------------------------------------------
+# Fitted versus theoretical α over a sweep
+# ---------------------------------------------------------------------------
+
+def _theory_alpha(sigma, threshold_k) -> float:
+    """vstar_theory()'s α, or nan where its survival probability 1 - Φ(k) is 0 in floating point."""
+    from scipy.stats import norm
+    from plots import vstar_theory
+
+    if norm.cdf(threshold_k / sigma) == 1:  # k above ~8.3: no survivors to form a tail
+        return float('nan')
+    return float(vstar_theory(sigma, threshold_k)['alpha'])
+
+
+def tail_fit_row(top, sigma, threshold_k, n_boot=1_000, seed=None, workers=None, pool=None) -> dict:
+    """The power-law fit of one run's top order statistics, with its bootstrap
+    interval (none for n_boot=0) and the V* theory α for (sigma, threshold_k)."""
+    row = {'sigma': sigma, 'beta': sigma / np.sqrt(2 * np.pi), 'alpha_theory': _theory_alpha(sigma, threshold_k)}
+    top = np.asarray(top, dtype=float)
+    top = top[top > 0]
+    if len(top) < MIN_TAIL:
+        return row
+    if n_boot:
+        row.update(bootstrap(top, n_boot=n_boot, seed=seed, workers=workers, pool=pool))
+    else:
+        row.update(powerlaw_fit(top))
+    row['alpha_hill'] = float(hill(top, [len(top)])[0])
+    return row
+
+
+def tail_fit_rows(tops, sigmas, threshold_k, n_boot=1_000, seed=None, workers=None) -> list:
+    """tail_fit_row() for each sigma's order statistics, bootstrapping all of
+    them on one pool of workers."""
+    if not n_boot or workers in (None, 1):
+        return [tail_fit_row(top, sigma, threshold_k, n_boot, seed) for top, sigma in zip(tops, sigmas)]
+    with pool_context().Pool(workers) as pool:
+        return [tail_fit_row(top, sigma, threshold_k, n_boot, seed, pool=pool) for top, sigma in zip(tops, sigmas)]
+
+
+def sweep_tail_fits(model, n, sigmas, t=15, w0=20_000, threshold_k=None, tail=DEFAULT_TAIL, n_boot=1_000,
+                    chunk_size=DEFAULT_CHUNK_SIZE, seed=None, workers=None) -> list:
+    """
+    Simulate a sigma sweep (run_sweep, keeping the top `tail` values of each
+    sigma) and fit its tails: one tail_fit_row() per sigma.
+    """
+    threshold_k = resolve_threshold(model, threshold_k)
+    reducers = run_sweep(model, n, sigmas, t, w0, threshold_k, [[TopK(tail)] for _ in sigmas],
+                         chunk_size, seed, workers)
+    return tail_fit_rows([top.result() for top, in reducers], sigmas, threshold_k, n_boot, seed, workers)
+
+
+def print_tail_fits(rows):
+    print(f"{'σ':>6} {'β':>6} {'α theory':>9} {'α fit':>7} {'95% CI':>17} {'α Hill':>7} {'x_min':>12} {'tail':>6} {'KS':>6}")
+    print("-" * 86)
+    for row in rows:
+        if 'alpha' not in row:
+            print(f"{row['sigma']:>6.2f} {row['beta']:>6.2f} {row['alpha_theory']:>9.3f}   (too few survivors)")
+            continue
+        interval = f"[{row['alpha_low']:.3f}, {row['alpha_high']:.3f}]" if 'alpha_low' in row else "-"
+        print(f"{row['sigma']:>6.2f} {row['beta']:>6.2f} {row['alpha_theory']:>9.3f} {row['alpha']:>7.3f} "
+              f"{interval:>17} {row['alpha_hill']:>7.3f} {row['x_min']:>12,.0f} {row['n_tail']:>6} {row['ks']:>6.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fitted versus V* theory tail exponents over a sigma sweep.")
+    parser.add_argument('--model', default='atv', choices=['atv', 'atm', 'real_atm'])
+    parser.add_argument('--n', type=int, default=10_000_000)
+    parser.add_argument('--t', type=int, default=15)
+    parser.add_argument('--sigmas', type=float, nargs='+', default=[2.507, 3.0, 3.5, 4.0])
+    parser.add_argument('--tail', type=int, default=DEFAULT_TAIL, help="order statistics kept per sigma")
+    parser.add_argument('--n-boot', type=int, default=1_000, help="bootstrap replicates")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    rows = sweep_tail_fits(args.model, args.n, args.sigmas, args.t, tail=args.tail, n_boot=args.n_boot,
+                           seed=args.seed, workers=args.workers)
+    print_tail_fits(rows)
+
+
+if __name__ == "__main__":
+    main()
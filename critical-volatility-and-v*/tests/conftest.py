@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The modules are imported by plain name, as the scripts in this directory do
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
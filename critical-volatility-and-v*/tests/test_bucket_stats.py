@@ -0,0 +1,67 @@
+import pickle
+
+import numpy as np
+import pytest
+
+from wealth_stats import _STATS_BLOCK, BucketStats
+
+
+def _baseline_counts(wealth):
+    """plot_transition's statistics as the baseline computed them, from the full array."""
+    living = wealth[wealth > 0]
+    return {
+        'count_full_bankruptcies': np.sum(wealth < 100),
+        'count_heavy_loss': np.sum((wealth >= 100) & (wealth < 2000)),
+        'count_2k_to_20k': np.sum((wealth >= 2000) & (wealth <= 20000)),
+        'count_20k': np.sum(living > 20000),
+        'count_50k': np.sum(living > 50000),
+        'count_100k': np.sum(living > 100000),
+        'count_1M': np.sum(living > 1e6),
+        'count_10M': np.sum(living > 1e7),
+        'count_100M': np.sum(living > 1e8),
+        'count_1B': np.sum(living > 1e9),
+        'total_survivors': len(living),
+        'mean_wealth': np.mean(living),
+        'max_wealth': np.max(living),
+    }
+
+
+def _wealth():
+    rng = np.random.default_rng(11)
+    w = rng.pareto(0.8, 3 * _STATS_BLOCK + 123) * 2e3
+    w[rng.random(len(w)) < 0.4] = 0
+    # Values exactly on every threshold, where < / <= / > matter
+    w[:9] = [100, 2_000, 20_000, 50_000, 100_000, 1e6, 1e7, 1e8, 1e9]
+    return w
+
+
+def test_matches_baseline_arithmetic():
+    w = _wealth()
+    stats = BucketStats()
+    stats.update(w)
+    result = stats.result()
+    expected = _baseline_counts(w)
+    assert result.keys() == expected.keys()
+    for key, value in expected.items():
+        assert result[key] == pytest.approx(value, rel=1e-12), key
+
+
+def test_chunks_merge_and_pickle():
+    w = _wealth()
+    single = BucketStats()
+    single.update(w)
+    parts = []
+    for start in range(0, len(w), 50_000):
+        part = BucketStats()
+        part.update(w[start:start + 50_000])
+        parts.append(pickle.loads(pickle.dumps(part)))
+    merged = parts[0]
+    for part in parts[1:]:
+        merged.merge(part)
+    assert merged.result() == pytest.approx(single.result(), rel=1e-12)
+    assert pickle.loads(pickle.dumps(single))._mask is None  # scratch buffer is not shipped
+
+
+def test_empty():
+    result = BucketStats().result()
+    assert result['total_survivors'] == 0 and result['mean_wealth'] == 0.0
@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+
+import density_evolution
+import simulation_engine
+from wealth_stats import BucketStats
+
+N = 2_000_000
+
+
+@pytest.mark.parametrize('model, sigma', [('atv', 3.0), ('atv', 1.0), ('atm', 3.0), ('real_atm', 2.5)])
+def test_bucket_counts_match_monte_carlo(model, sigma):
+    expected = density_evolution.evolve(model, sigma=sigma).bucket_stats(N)
+    stats, = simulation_engine.run_chunked(model, N, sigma=sigma, reducers=[BucketStats()], seed=1)
+    sampled = stats.result()
+    for key, count in sampled.items():
+        if not (key.startswith('count_') or key == 'total_survivors'):
+            continue
+        mean = max(expected[key], 0.0)  # FFT round-off leaves empty buckets at about ±1e-9
+        # Binomial sampling error of the run, plus 0.2% for the grid
+        sd = np.sqrt(mean * max(1 - mean / N, 0.0))
+        assert abs(count - mean) <= 4 * sd + 0.002 * mean + 1, (key, count, mean)
+
+
+@pytest.mark.parametrize('model, sigma', [('atv', 3.0), ('atm', 2.0), ('real_atm', 2.5)])
+def test_mass_is_conserved(model, sigma):
+    stats = density_evolution.evolve(model, sigma=sigma).bucket_stats(N)
+    total = stats['count_full_bankruptcies'] + stats['count_heavy_loss'] + stats['count_2k_to_20k'] + stats['count_20k']
+    assert total == pytest.approx(N, rel=1e-9)
+
+
+def test_order_statistics_match_monte_carlo():
+    dist = density_evolution.evolve('atv', sigma=3.0)
+    wealth = simulation_engine.simulate('atv', N, sigma=3.0, seed=1)
+    living = np.sort(wealth[wealth > 0])[::-1]
+    assert dist.median() == pytest.approx(np.median(living), rel=0.01)
+    # The r-th largest of a power law with α ≈ 0.9 varies by about 1 / (α √r) between runs
+    for rank, rtol in [(1_000, 0.15), (10_000, 0.05), (100_000, 0.02)]:
+        assert dist.wealth_at_ranks([rank - 1], N)[0] == pytest.approx(living[rank - 1], rel=rtol), rank
@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+
+from horizons import horizon_table, run_horizons
+from simulation_engine import Collect, simulate
+from sketches import TopK
+from wealth_stats import BucketStats
+
+KWARGS = dict(n=3000, sigma=3.0, seed=8, chunk_size=700)
+
+
+def test_period_summaries_match_direct_runs():
+    periods, snapshots = run_horizons('atv', t=4, snapshots={2: [Collect()]}, **KWARGS)
+    rows = horizon_table(periods)
+    assert [row['period'] for row in rows] == [1, 2, 3, 4]
+
+    for row in rows:
+        wealth = simulate('atv', t=row['period'], **KWARGS)
+        living = wealth[wealth > 0]
+        direct = BucketStats()
+        direct.update(wealth)
+        for key, value in direct.result().items():
+            assert row[key] == pytest.approx(value, rel=1e-12), key
+        assert row['median_wealth'] == pytest.approx(np.median(living), rel=0.021)
+        top = TopK(1000)
+        top.update(wealth)
+        assert row['tail_alpha'] == top.hill_alpha()
+
+    np.testing.assert_array_equal(snapshots[2][0].result(), simulate('atv', t=2, **KWARGS))
+
+
+def test_summaries_do_not_depend_on_the_worker_count():
+    one, _ = run_horizons('real_atm', t=3, workers=1, **KWARGS)
+    two, _ = run_horizons('real_atm', t=3, workers=2, **KWARGS)
+    assert horizon_table(one) == horizon_table(two)
@@ -0,0 +1,24 @@
+import numpy as np
+import pytest
+
+from population import Population
+from simulation_engine import Collect, simulate
+
+
+@pytest.mark.parametrize('model', ['atv', 'atm', 'real_atm'])
+def test_reopened_population_continues_bit_identically(tmp_path, model):
+    kwargs = dict(n=2500, sigma=3.0, seed=4, chunk_size=600)
+    Population.create(str(tmp_path / 'a'), model, **kwargs).advance(3)
+    resumed = Population.open(str(tmp_path / 'a')).advance(2)
+    straight = Population.create(str(tmp_path / 'b'), model, **kwargs).advance(5)
+
+    assert resumed.period == 5
+    np.testing.assert_array_equal(resumed.wealth, straight.wealth)
+    np.testing.assert_array_equal(resumed.active, straight.active)
+    np.testing.assert_array_equal(resumed.wealth, simulate(model, t=5, **kwargs))
+
+
+def test_reduce_streams_the_mapped_wealth(tmp_path):
+    population = Population.create(str(tmp_path / 'p'), 'atv', n=1000, seed=1, chunk_size=300).advance(2)
+    collect, = population.reduce([Collect()])
+    np.testing.assert_array_equal(collect.result(), population.wealth)
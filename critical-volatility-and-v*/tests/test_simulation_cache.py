@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+
+import plots
+from simulation_cache import SimulationCache, cached
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return SimulationCache(str(tmp_path / 'cache'))
+
+
+def test_hit_and_miss_return_the_same_read_only_result(cache):
+    first = cache.call(plots.simulate_atv_model, n=1_000, seed=1)
+    second = cache.call(plots.simulate_atv_model, n=1_000, seed=1)
+    assert (cache.misses, cache.hits) == (1, 1)
+    assert type(first) is type(second) is np.memmap
+    assert not first.flags.writeable
+    np.testing.assert_array_equal(first, plots.simulate_atv_model(n=1_000, seed=1))
+
+
+def test_unseeded_runs_are_not_cached(cache):
+    cache.call(plots.simulate_atv_model, n=100)
+    assert cache.entries() == []
+
+
+def test_worker_counts_share_an_entry_but_not_the_legacy_stream(cache):
+    legacy = plots._cached_run(cache, plots.simulate_atv_model, None, n=1_000)
+    one = plots._cached_run(cache, plots.simulate_atv_model, 1, n=1_000)
+    two = plots._cached_run(cache, plots.simulate_atv_model, 2, n=1_000)
+    assert (cache.misses, cache.hits) == (2, 1)
+    np.testing.assert_array_equal(one, two)
+    assert not np.array_equal(legacy, one)
+
+
+def test_cached_without_cache_is_a_plain_call():
+    np.testing.assert_array_equal(cached(None, plots.simulate_atv_model, n=100, seed=3),
+                                  plots.simulate_atv_model(n=100, seed=3))
+
+
+def _load(path, module_name):
+    import importlib.util
+    spec = importlib.util.spec_from_file_location(module_name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_key_does_not_depend_on_the_module_name(cache):
+    # `python plots.py` runs the same functions as module __main__
+    renamed = _load(plots.__file__, 'plots_as_main')
+    assert renamed.simulate_atv_model.__module__ != plots.simulate_atv_model.__module__
+    assert (cache.key(cache.describe(renamed.simulate_atv_model, kwargs={'seed': 1}))
+            == cache.key(cache.describe(plots.simulate_atv_model, kwargs={'seed': 1})))
+
+
+_SIMULATOR = '''
+import numpy as np
+
+SCALE = {scale}
+
+
+def _step(w):
+    return w * SCALE
+
+
+def simulate(n=10, seed=None):
+    return _step(np.ones(n))
+
+
+def plot():
+    return {plot!r}
+'''
+
+
+@pytest.mark.parametrize('edit, changes', [({'plot': 'other title'}, False), ({'scale': 3}, True)])
+def test_code_version_follows_what_the_simulator_uses(tmp_path, edit, changes):
+    from simulation_cache import code_version
+    versions = []
+    for i, fields in enumerate([{'scale': 2, 'plot': 'title'}, {'scale': 2, 'plot': 'title', **edit}]):
+        path = tmp_path / f'sim_{i}.py'
+        path.write_text(_SIMULATOR.format(**fields))
+        versions.append(code_version(_load(str(path), f'{tmp_path.name}_{i}').simulate))
+    assert (versions[0] != versions[1]) == changes
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+import plots
+import simulation_engine
+from simulation_engine import Collect, Moments, chunk_streams, run_chunked, simulate
+
+LEGACY = {'atv': plots.simulate_atv_model, 'atm': plots.simulate_atm_model,
+          'real_atm': plots.simulate_real_atm_model}
+
+
+@pytest.mark.parametrize('model', sorted(LEGACY))
+def test_one_chunk_matches_the_unchunked_simulator(model, monkeypatch):
+    # Feed the legacy simulator the normals the engine draws for its only chunk
+    n, seed = 3000, 5
+    rng = np.random.default_rng(chunk_streams(seed, 1)[0])
+    monkeypatch.setattr(np.random, 'randn', lambda size: rng.standard_normal(size))
+    legacy = LEGACY[model](n=n, t=6, sigma=3.0)
+    chunked = simulate(model, n, t=6, sigma=3.0, seed=seed)
+    np.testing.assert_allclose(chunked, legacy, rtol=1e-12)
+    assert ((chunked > 0) == (legacy > 0)).all()
+
+
+@pytest.mark.parametrize('model', sorted(LEGACY))
+def test_reducers_see_the_simulated_blocks_in_order(model):
+    n, chunk_size = 2500, 700
+    wealth = simulate(model, n, t=5, seed=1, chunk_size=chunk_size)
+    collect, moments = run_chunked(model, n, t=5, reducers=[Collect(), Moments()], seed=1,
+                                   chunk_size=chunk_size)
+    np.testing.assert_array_equal(collect.result(), wealth)
+    living = wealth[wealth > 0]
+    summary = moments.result()
+    assert summary['total_survivors'] == len(living)
+    assert summary['mean_wealth'] == pytest.approx(living.mean(), rel=1e-12)
+
+
+def test_results_do_not_depend_on_the_worker_count():
+    kwargs = dict(t=5, sigma=2.0, seed=11, chunk_size=400)
+    one = simulate('atv', 2000, workers=1, **kwargs)
+    np.testing.assert_array_equal(simulate('atv', 2000, workers=2, **kwargs), one)
+    collect, = run_chunked('atv', 2000, reducers=[Collect()], workers=3, **kwargs)
+    np.testing.assert_array_equal(collect.result(), one)
+
+
+def test_shared_rng_rejects_workers():
+    with pytest.raises(ValueError):
+        run_chunked('atv', 10, rng=np.random.default_rng(0), workers=2)
+    assert simulation_engine.resolve_threshold('atm', None) == 2.5
@@ -0,0 +1,95 @@
+import numpy as np
+import pytest
+
+from sketches import DDSketch, LogHistogram, TopK, sketch_rank_curve
+from wealth_stats import rank_curve
+
+
+def _wealth(n=300_000, seed=3):
+    """Pareto-tailed wealth with a third of it exactly zero, like a supercritical run."""
+    rng = np.random.default_rng(seed)
+    w = rng.pareto(1.1, n) * 2e4
+    w[rng.random(n) < 1 / 3] = 0
+    return w
+
+
+def _blocks(w, sizes=(1, 999, 50_000, 70_000)):
+    """Uneven blocks, including tiny ones, covering all of w."""
+    edges = np.cumsum(sizes)
+    return np.split(w, edges[edges < len(w)])
+
+
+def _fed(reducer_type, blocks, **kwargs):
+    reducer = reducer_type(**kwargs)
+    for block in blocks:
+        reducer.update(block)
+    return reducer
+
+
+@pytest.mark.parametrize('k', [1, 10, 1000])
+def test_topk_merge_equals_single_pass(k):
+    w = _wealth()
+    blocks = _blocks(w)
+    merged = _fed(TopK, blocks[:2], k=k).merge(_fed(TopK, blocks[2:], k=k))
+    expected = np.sort(w)[::-1][:k]
+    np.testing.assert_array_equal(_fed(TopK, [w], k=k).result(), expected)
+    np.testing.assert_array_equal(_fed(TopK, blocks, k=k).result(), expected)
+    np.testing.assert_array_equal(merged.result(), expected)
+
+
+def test_ddsketch_merge_equals_single_pass():
+    w = _wealth()
+    blocks = _blocks(w)
+    single = _fed(DDSketch, [w])
+    merged = _fed(DDSketch, blocks[::2]).merge(_fed(DDSketch, blocks[1::2]))
+    assert (merged.count, merged.zeros) == (single.count, single.zeros) == (np.count_nonzero(w), np.sum(w == 0))
+    np.testing.assert_array_equal(np.trim_zeros(merged.counts), np.trim_zeros(single.counts))
+    with pytest.raises(ValueError):
+        single.merge(DDSketch(0.05))
+
+
+@pytest.mark.parametrize('accuracy', [0.01, 0.05])
+def test_ddsketch_relative_error(accuracy):
+    w = _wealth()
+    sketch = _fed(DDSketch, _blocks(w), relative_accuracy=accuracy)
+    positive = np.sort(w[w > 0])
+    ranks = np.unique(np.linspace(0, len(positive) - 1, 500).astype(int))
+    estimates = sketch.values_at_ranks(ranks)
+    assert np.all(np.abs(estimates - positive[ranks]) <= accuracy * positive[ranks] * (1 + 1e-12))
+    assert sketch.quantile(0.1) == 0.0
+    assert sketch.result()['median_wealth'] == pytest.approx(np.median(positive), rel=accuracy)
+
+
+def test_sketch_rank_curve():
+    w = _wealth()
+    top, quantiles = TopK(1000), DDSketch()
+    for block in _blocks(w):
+        top.update(block)
+        quantiles.update(block)
+    ranks, values = sketch_rank_curve(top, quantiles)
+    exact_ranks, exact = rank_curve(w[w > 0])
+    np.testing.assert_array_equal(ranks, exact_ranks)
+    exact_top = ranks <= 1000
+    np.testing.assert_array_equal(values[exact_top], exact[exact_top])
+    np.testing.assert_allclose(values, exact, rtol=quantiles.relative_accuracy * (1 + 1e-12))
+
+
+def test_log_histogram_merge():
+    w = _wealth()
+    blocks = _blocks(w)
+    merged = _fed(LogHistogram, blocks[:3]).merge(_fed(LogHistogram, blocks[3:]))
+    edges, counts = merged.result()
+    np.testing.assert_array_equal(counts, np.histogram(w, bins=edges)[0])
+    assert merged.below == np.sum(w < edges[0]) and merged.above == np.sum(w > edges[-1])
+
+
+def test_sketch_summary_anchor_matches_the_exact_summary():
+    import plots
+    from wealth_stats import BucketStats
+    w = _wealth(20_000)
+    reducers = [BucketStats(), TopK(plots.DEFAULT_TAIL), DDSketch()]
+    for block in _blocks(w):
+        for reducer in reducers:
+            reducer.update(block)
+    exact = plots._wealth_summary(w.copy())[2]
+    assert plots._sketch_summary(*reducers)[2] == exact
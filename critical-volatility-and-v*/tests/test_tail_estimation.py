@@ -0,0 +1,43 @@
+import warnings
+
+import numpy as np
+import pytest
+
+from tail_estimation import bootstrap, hill, powerlaw_fit, tail_fit_row, tail_fit_rows
+
+
+def _pareto_top(alpha, n=200_000, k=5_000, seed=5):
+    rng = np.random.default_rng(seed)
+    return np.sort(rng.pareto(alpha, n) + 1)[::-1][:k] * 2e4
+
+
+@pytest.mark.parametrize('alpha', [0.8, 1.5])
+def test_estimators_recover_alpha(alpha):
+    top = _pareto_top(alpha)
+    assert hill(top, [len(top)])[0] == pytest.approx(alpha, rel=0.05)
+    assert powerlaw_fit(top)['alpha'] == pytest.approx(alpha, rel=0.1)
+
+
+def test_bootstrap_does_not_depend_on_workers():
+    top = _pareto_top(1.2)
+    serial = bootstrap(top, n_boot=60, seed=9)
+    parallel = bootstrap(top, n_boot=60, seed=9, workers=2)
+    assert serial == parallel
+    assert serial['alpha_low'] <= serial['alpha'] <= serial['alpha_high']
+
+
+def test_rows_share_one_pool_and_skip_bootstrap_on_request():
+    tops = [_pareto_top(1.0), _pareto_top(2.0)]
+    serial = tail_fit_rows(tops, [3.0, 4.0], 1, n_boot=50, seed=2)
+    pooled = tail_fit_rows(tops, [3.0, 4.0], 1, n_boot=50, seed=2, workers=2)
+    assert serial == pooled
+    plain = tail_fit_row(tops[0], 3.0, 1, n_boot=0)
+    assert 'alpha_low' not in plain and plain['alpha'] == serial[0]['alpha']
+
+
+def test_theory_alpha_is_nan_without_warnings_far_below_critical():
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        row = tail_fit_row(_pareto_top(1.0), 0.1, 1, n_boot=0)
+    assert np.isnan(row['alpha_theory'])
+    assert tail_fit_row(np.ones(10), 3.0, 1)['alpha_theory'] == pytest.approx(0.889, abs=1e-3)
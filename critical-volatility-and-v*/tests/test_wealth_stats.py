@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from wealth_stats import _select, log_rank_positions, rank_curve, top_k, wealth_at_ranks
+
+
+def _samples():
+    rng = np.random.default_rng(7)
+    return {
+        'pareto': rng.pareto(1.2, 200_000) * 2e4,
+        'ties': rng.integers(0, 50, 100_000).astype(float),
+        'small': rng.standard_normal(17),
+    }
+
+
+@pytest.mark.parametrize('name', ['pareto', 'ties', 'small'])
+def test_wealth_at_ranks_matches_sort(name):
+    wealth = _samples()[name]
+    descending = np.sort(wealth)[::-1]
+    n = len(wealth)
+    positions = np.unique(np.r_[0, 1, n // 2, n - 1, -1, -n, np.random.default_rng(0).integers(0, n, 50)])
+    before = wealth.copy()
+    np.testing.assert_array_equal(wealth_at_ranks(wealth, positions), descending[positions])
+    np.testing.assert_array_equal(wealth, before)
+
+    work = wealth.copy()
+    np.testing.assert_array_equal(wealth_at_ranks(work, positions, overwrite=True), descending[positions])
+    np.testing.assert_array_equal(np.sort(work), np.sort(wealth))
+
+
+@pytest.mark.parametrize('name', ['pareto', 'ties'])
+@pytest.mark.parametrize('count', [1, 5, 40, 2_000])
+def test_select_places_every_requested_index(name, count):
+    wealth = _samples()[name]
+    ascending = np.sort(wealth)
+    kth = np.unique(np.random.default_rng(count).integers(0, len(wealth), count))
+    work = wealth.copy()
+    _select(work, kth)
+    np.testing.assert_array_equal(work[kth], ascending[kth])
+    for k in kth[:20]:
+        assert work[:k].max(initial=-np.inf) <= work[k] <= work[k + 1:].min(initial=np.inf)
+
+
+def test_rank_curve_and_top_k():
+    wealth = _samples()['pareto']
+    descending = np.sort(wealth)[::-1]
+    ranks, values = rank_curve(wealth)
+    np.testing.assert_array_equal(ranks, log_rank_positions(len(wealth)) + 1)
+    np.testing.assert_array_equal(values, descending[ranks - 1])
+    np.testing.assert_array_equal(top_k(wealth, 1000), descending[:1000])
+    np.testing.assert_array_equal(top_k(wealth[:10], 1000), np.sort(wealth[:10])[::-1])
+    assert len(top_k(wealth, 0)) == 0
+
+
+def test_out_of_range_positions():
+    with pytest.raises(IndexError):
+        wealth_at_ranks(np.arange(5.0), [5])
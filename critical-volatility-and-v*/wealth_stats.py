@@ -0,0 +1,199 @@
+"""
+Order statistics and bucket statistics of simulated wealth.
+
+The rank-wealth plots in plots.py read about a thousand log-spaced ranks and
+one anchor rank out of millions of survivors. Sorting the whole population
+for that costs O(n log n) and a full-size copy. Here a few order statistics
+are selected with single-pivot np.partition in O(n), a dense set of them
+(the rank curve) costs about one sort, and both can work in place.
+
+Ranks are counted from the richest participant. Positions are 0-based, so
+position p is rank p + 1, matching np.sort(wealth)[::-1][p].
+
+BucketStats computes plot_transition's threshold counts, mean and max in one
+pass over memory, chunk by chunk.
+
+Usage:
+    ranks, values = rank_curve(living)      # ~1000 log-spaced points
+    richest = top_k(living, 100)            # exact, descending
+"""
+
+import numpy as np
+
+
+def log_rank_positions(n, num=1000) -> np.ndarray:
+    """About num log-spaced positions in 1..n-1 (the points plots.py draws)."""
+    if n < 2:
+        return np.arange(n)
+    return np.unique(np.logspace(0, np.log10(n - 1), num).astype(int))
+
+
+def wealth_at_ranks(wealth, positions, overwrite=False) -> np.ndarray:
+    """
+    np.sort(wealth)[::-1][positions], by partitioning on those order
+    statistics only.
+
+    Args:
+        positions: 0-based positions from the top (negative counts from the bottom)
+        overwrite: partition `wealth` itself instead of a copy; its order is
+                   then arbitrary (sums, counts and means are unaffected)
+    """
+    wealth = np.asarray(wealth)
+    positions = np.asarray(positions, dtype=np.intp)
+    n = len(wealth)
+    if positions.size == 0:
+        return np.empty(0, dtype=wealth.dtype)
+    if positions.min() < -n or positions.max() >= n:
+        raise IndexError(f"Rank positions must lie in [-{n}, {n}) for {n} values.")
+
+    kth = n - 1 - positions % n  # ascending index of each requested value
+    work = wealth if overwrite else wealth.copy()
+    _select(work, np.unique(kth))
+    return work[kth]
+
+
+# Segments at most this long, or holding more requested indices than this,
+# are sorted outright: every further split costs a partition pass over the
+# segment (~3 ns/element), a vectorized sort ~10 ns/element in total
+_SORT_SEGMENT = 1 << 14
+_MAX_PIVOTS = 12
+
+
+def _select(work, kth):
+    """
+    Partition `work` in place so that work[k] is the k-th smallest value for
+    every k in the sorted array kth.
+
+    np.partition with many pivots falls back to a scalar loop several times
+    slower than a full sort; with a single pivot it uses the vectorized
+    quickselect. So split the range at one requested index near its middle
+    and recurse on both halves, as long as a segment holds few requested
+    indices; otherwise sort it. A handful of ranks (an anchor, quantiles,
+    the top k) costs O(n); a thousand ranks spread over the whole range cost
+    about one in-place sort.
+    """
+    stack = [(0, len(work), 0, len(kth))]
+    while stack:
+        lo, hi, first, last = stack.pop()
+        if first >= last:
+            continue
+        if hi - lo <= _SORT_SEGMENT or last - first > _MAX_PIVOTS:
+            work[lo:hi].sort()
+            continue
+        mid = first + min(int(np.searchsorted(kth[first:last], (lo + hi) // 2)), last - first - 1)
+        k = int(kth[mid])
+        work[lo:hi].partition(k - lo)
+        stack.append((lo, k, first, mid))
+        stack.append((k + 1, hi, mid + 1, last))
+
+
+def rank_curve(wealth, num=1000, overwrite=False):
+    """
+    (ranks, values) at about num log-spaced ranks, as plotted by
+    loglog(ranks, values).
+    """
+    positions = log_rank_positions(len(wealth), num)
+    return positions + 1, wealth_at_ranks(wealth, positions, overwrite)
+
+
+def top_k(wealth, k, overwrite=False) -> np.ndarray:
+    """The k largest values in descending order (exact), in O(n + k log k)."""
+    wealth = np.asarray(wealth)
+    n = len(wealth)
+    k = min(k, n)
+    if k <= 0:
+        return np.empty(0, dtype=wealth.dtype)
+    work = wealth if overwrite else wealth.copy()
+    work.partition(n - k)
+    return np.sort(work[n - k:])[::-1]
+
+
+# ---------------------------------------------------------------------------
+# Bucket statistics
+# ---------------------------------------------------------------------------
+
+# plot_transition's buckets: bankrupt below $100, heavy loss below $2k, then
+# $2k-20k inclusive, and tail counts strictly above each threshold
+LOSS_THRESHOLDS = (100, 2_000)
+TAIL_THRESHOLDS = (20_000, 50_000, 100_000, 1e6, 1e7, 1e8, 1e9)
+
+# Elements per sub-block: small enough that all comparisons on a sub-block
+# hit cache, so the data is read from memory once
+_STATS_BLOCK = 1 << 16
+
+
+def _money_label(x) -> str:
+    for value, suffix in ((1e9, 'B'), (1e6, 'M'), (1e3, 'k')):
+        if x >= value:
+            return f"{x / value:g}{suffix}"
+    return f"{x:g}"
+
+
+class BucketStats:
+    """
+    plot_transition's statistics (bucket and tail counts, survivors, mean
+    and max) in one trip through memory, mergeable across chunks. Follows
+    the reducer protocol of simulation_engine (update / merge / result).
+
+    Wealth must be non-negative (as the simulators produce): survivors are
+    the non-zero values.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.living = 0
+        self.sum = 0.0
+        self.max = 0.0
+        # Values >= each loss threshold, then > each tail threshold
+        self.at_least = np.zeros(len(LOSS_THRESHOLDS) + len(TAIL_THRESHOLDS), dtype=np.int64)
+        self._mask = None
+
+    def update(self, w):
+        w = np.asarray(w)
+        if self._mask is None:
+            self._mask = np.empty(_STATS_BLOCK, dtype=bool)
+        for start in range(0, len(w), _STATS_BLOCK):
+            block = w[start:start + _STATS_BLOCK]
+            mask = self._mask[:len(block)]
+            for j, threshold in enumerate(LOSS_THRESHOLDS):
+                np.greater_equal(block, threshold, out=mask)
+                self.at_least[j] += np.count_nonzero(mask)
+            for j, threshold in enumerate(TAIL_THRESHOLDS, len(LOSS_THRESHOLDS)):
+                np.greater(block, threshold, out=mask)
+                self.at_least[j] += np.count_nonzero(mask)
+            self.living += int(np.count_nonzero(block))
+            self.sum += float(block.sum())
+            if len(block):
+                self.max = max(self.max, float(block.max()))
+        self.count += len(w)
+
+    def merge(self, other):
+        self.count += other.count
+        self.living += other.living
+        self.sum += other.sum
+        self.max = max(self.max, other.max)
+        self.at_least += other.at_least
+        return self
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_mask'] = None  # scratch buffer, not worth pickling to or from workers
+        return state
+
+    def result(self) -> dict:
+        """The statistics under the simulation_results.csv column names."""
+        middle = LOSS_THRESHOLDS[1]
+        above = self.at_least
+        stats = {
+            'count_full_bankruptcies': int(self.count - above[0]),
+            'count_heavy_loss': int(above[0] - above[1]),
+            f'count_{_money_label(middle)}_to_{_money_label(TAIL_THRESHOLDS[0])}': int(above[1] - above[2]),
+        }
+        for j, threshold in enumerate(TAIL_THRESHOLDS, len(LOSS_THRESHOLDS)):
+            stats[f'count_{_money_label(threshold)}'] = int(above[j])
+        stats.update({
+            'total_survivors': int(self.living),
+            'mean_wealth': self.sum / self.living if self.living else 0.0,
+            'max_wealth': self.max,
+        })
+        return stats
@@ -0,0 +1,67 @@
+"""
+Pool of reusable Two-Board environments.
+
+Short-episode curricula spend a large share of their time constructing
+environments. EnvPool hands out idle instances re-targeted with
+TwoBoardEnv.reset(equation, var), which rebuilds only the episode state and
+keeps the warm caches (per-string extraction memo, transform cache,
+equation analyses, expression store).
+"""
+
+from contextlib import contextmanager
+
+from two_board_environment import TwoBoardEnv
+
+
+class EnvPool:
+    """
+    Args:
+        max_idle:   maximum number of released environments kept for reuse
+        **env_kwargs: passed to TwoBoardEnv for every instance the pool creates
+                    (Imaginary-board caps, caches, parse limits)
+
+    Usage:
+        pool = EnvPool()
+        with pool.session(Eq(x**2, 2)) as env:
+            env.step(...)
+    """
+
+    def __init__(self, max_idle=64, **env_kwargs):
+        self.max_idle = max_idle
+        self.env_kwargs = env_kwargs
+        self._idle = []
+        self.created = 0
+        self.reused = 0
+
+    def acquire(self, equation, var=None) -> TwoBoardEnv:
+        """An environment at the start of an episode for `equation`."""
+        if self._idle:
+            env = self._idle.pop()
+            env.reset(equation, var)
+            self.reused += 1
+            return env
+        self.created += 1
+        return TwoBoardEnv(equation, var, **self.env_kwargs)
+
+    def release(self, env: TwoBoardEnv):
+        """
+        Return an environment to the pool (dropped if the pool is full),
+        ending its episode if no terminal action did.
+        """
+        env.end_episode()
+        if len(self._idle) < self.max_idle:
+            self._idle.append(env)
+
+    @contextmanager
+    def session(self, equation, var=None):
+        env = self.acquire(equation, var)
+        try:
+            yield env
+        finally:
+            self.release(env)
+
+    def __len__(self):
+        return len(self._idle)
+
+    def stats(self) -> dict:
+        return {'idle': len(self._idle), 'created': self.created, 'reused': self.reused}
@@ -0,0 +1,451 @@
+"""
+Caches shared by Two-Board environments in one process.
+
+TransformCache memoizes the Real-board transformations (simplify, expand,
+factor, collect). Curricula repeat equations, so the same structurally
+identical expressions are transformed over and over across episodes. The
+printed strings and equation analyses memoized there have budgets of their
+own.
+
+ExpressionStore hash-conses expression trees, so that environments hosted
+by the same worker share one instance of every distinct subexpression
+(equations, hidden roots, board contents) instead of one copy each.
+
+CacheManager applies a per-worker CachePolicy at episode boundaries (bounding
+or clearing SymPy's global cache, collecting garbage) and records memory
+telemetry per episode, so long-running workers keep a flat resident size.
+"""
+
+import gc
+import heapq
+import os
+import pickle
+import sys
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Optional
+
+from sympy import Basic, preorder_traversal
+from sympy.core.operations import AssocOp
+
+
+def expr_size(expr) -> int:
+    """Number of nodes in the expression tree."""
+    return sum(1 for _ in preorder_traversal(expr))
+
+
+# Separate budgets for memos that share the cache with the transformations:
+# printed strings and equation analyses are small or few, and must not take
+# entries from the SIMPLIFY/EXPAND/FACTOR/COLLECT results (or be evicted by them)
+DEFAULT_OP_BUDGETS = {'str': 20_000, 'analyze': 2_000}
+
+
+class TransformCache:
+    """
+    Bounded memo for expression transformations, keyed by (operation, input
+    expression, extra arguments). SymPy hashes expressions structurally and
+    caches the hash on the object, so a lookup costs one hash and, on a hit,
+    one structural comparison.
+
+    Eviction is GreedyDual-Size: an entry's priority is the recompute cost
+    (seconds the transformation took) divided by its size (nodes of input +
+    result), plus an inflation value that rises to the priority of each
+    evicted entry. Cheap-to-recompute, large entries go first; entries that
+    keep being hit are refreshed and stay.
+
+    Args:
+        max_entries: maximum number of cached results (0 disables caching)
+        max_nodes:   maximum total size in expression nodes (None = no limit)
+        path:        optional pickle file; loaded on construction if it
+                     exists, written by save()
+        op_budgets:  {operation: max_entries} for operations kept in their
+                     own partition with its own eviction; max_entries and
+                     max_nodes bound the other operations together
+    """
+
+    def __init__(self, max_entries=10_000, max_nodes=None, path=None, op_budgets=DEFAULT_OP_BUDGETS):
+        self.max_entries = max_entries
+        self.max_nodes = max_nodes
+        self.path = path
+        self._partitions = {op: TransformCache(budget, op_budgets={}) for op, budget in op_budgets.items()}
+        self.clear()
+        if path is not None and os.path.exists(path):
+            self.load(path)
+
+    def clear(self):
+        for partition in self._partitions.values():
+            partition.clear()
+        self._entries = {}  # {key: [result, cost, size, priority]}
+        self._heap = []  # (priority, seq, key), stale items skipped lazily
+        self._seq = 0
+        self._inflation = 0.0
+        self.nodes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries) + sum(len(p) for p in self._partitions.values())
+
+    def __contains__(self, key):
+        partition = self._partitions.get(key[0])
+        return key in (self._entries if partition is None else partition)
+
+    def get_or_compute(self, op, fn, expr, *args):
+        """Return fn(expr, *args), from the cache when this (op, expr, args) was seen before."""
+        partition = self._partitions.get(op)
+        if partition is not None:
+            return partition.get_or_compute(op, fn, expr, *args)
+        key = (op, expr, args)
+        entry = self._entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            self._push(key, entry)
+            return entry[0]
+
+        self.misses += 1
+        start = time.perf_counter()
+        result = fn(expr, *args)
+        cost = time.perf_counter() - start
+        if self.max_entries:
+            self._store(key, result, cost, expr_size(expr) + expr_size(result))
+        return result
+
+    def _push(self, key, entry):
+        entry[3] = self._inflation + entry[1] / entry[2]
+        self._seq += 1
+        heapq.heappush(self._heap, (entry[3], self._seq, key))
+        if len(self._heap) > 4 * len(self._entries) + 64:
+            # Drop the stale items left behind by refreshed entries
+            self._heap = [(e[3], i, k) for i, (k, e) in enumerate(self._entries.items())]
+            heapq.heapify(self._heap)
+
+    def _store(self, key, result, cost, size):
+        entry = [result, cost, size, 0.0]
+        self._entries[key] = entry
+        self.nodes += size
+        self._push(key, entry)
+        while self._entries and (len(self._entries) > self.max_entries
+                                 or (self.max_nodes is not None and self.nodes > self.max_nodes)):
+            self._evict_one()
+
+    def _evict_one(self):
+        while True:
+            priority, _, key = heapq.heappop(self._heap)
+            entry = self._entries.get(key)
+            if entry is not None and entry[3] == priority:
+                break
+        del self._entries[key]
+        self.nodes -= entry[2]
+        self._inflation = priority
+        self.evictions += 1
+
+    def stats(self) -> dict:
+        """Metrics of the shared budget; each partition's under 'partitions'."""
+        lookups = self.hits + self.misses
+        stats = {
+            'entries': len(self._entries),
+            'nodes': self.nodes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+        }
+        if self._partitions:
+            stats['partitions'] = {op: p.stats() for op, p in self._partitions.items()}
+        return stats
+
+    # -- persistence -------------------------------------------------------
+
+    def save(self, path=None):
+        """Pickle the cached results (not the metrics) to path (default: self.path)."""
+        path = path or self.path
+        if path is None:
+            raise ValueError("No path given for TransformCache.save().")
+        items = [(key, entry[0], entry[1], entry[2])
+                 for cache in (self, *self._partitions.values()) for key, entry in cache._entries.items()]
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump(items, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+
+    def load(self, path=None):
+        """Merge previously saved results into the cache."""
+        path = path or self.path
+        with open(path, "rb") as f:
+            items = pickle.load(f)
+        for key, result, cost, size in items:
+            cache = self._partitions.get(key[0], self)
+            if key not in cache._entries and cache.max_entries:
+                cache._store(key, result, cost, size)
+
+
+class ExpressionStore:
+    """
+    Hash-consing table: intern() returns the canonical instance of an
+    expression and rebuilds it, bottom-up, on canonical children, so equal
+    subtrees of different expressions are one object in memory.
+
+    SymPy expressions cannot be weakly referenced, so the table holds strong
+    references; collect() drops the entries that nothing outside the table
+    uses any more.
+    """
+
+    def __init__(self):
+        self._table = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._table)
+
+    def __contains__(self, expr):
+        return expr in self._table
+
+    def intern(self, expr):
+        """Canonical instance of expr (non-sympy values are returned unchanged)."""
+        if not isinstance(expr, Basic):
+            return expr
+        canon = self._table.get(expr)
+        if canon is not None:
+            self.hits += 1
+            return canon
+        self.misses += 1
+        args = expr.args
+        if args:
+            shared = tuple(self.intern(a) for a in args)
+            if any(new is not old for new, old in zip(shared, args)):
+                rebuilt = _rebuild(expr, shared)
+                if rebuilt == expr:
+                    expr = rebuilt
+        self._table[expr] = expr
+        return expr
+
+    def intern_all(self, exprs) -> list:
+        return [self.intern(e) for e in exprs]
+
+    def collect(self) -> int:
+        """
+        Drop entries referenced only by the table (and by other unused
+        entries), repeating until nothing changes. Returns the number dropped.
+        """
+        # Table key + value, the loop variable and getrefcount's argument
+        unused_refs = 4
+        dropped = 0
+        while True:
+            dead = [e for e in self._table if sys.getrefcount(e) <= unused_refs]
+            if not dead:
+                return dropped
+            for e in dead:
+                del self._table[e]
+            dropped += len(dead)
+            del dead
+
+    def clear(self):
+        self._table.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> dict:
+        return {
+            'entries': len(self._table),
+            'bytes': sum(node_bytes(e) for e in self._table),
+            'hits': self.hits,
+            'misses': self.misses,
+        }
+
+
+def _rebuild(expr, args):
+    if isinstance(expr, AssocOp):
+        return expr.func._from_args(args, expr.is_commutative)
+    return expr.func(*args)
+
+
+def node_bytes(expr) -> int:
+    """Approximate size of one expression node: the object plus its args tuple."""
+    return sys.getsizeof(expr) + (sys.getsizeof(expr._args) if expr._args else 0)
+
+
+def expression_memory(exprs) -> dict:
+    """
+    Memory held by a collection of expression trees, counted once per tree
+    node ('nodes', 'bytes') and once per distinct object ('unique_nodes',
+    'unique_bytes'). The difference is what sharing saves.
+    """
+    nodes = total = 0
+    unique = {}
+    stack = [e for e in exprs if isinstance(e, Basic)]
+    while stack:
+        e = stack.pop()
+        size = unique.get(id(e))
+        if size is None:
+            size = unique[id(e)] = node_bytes(e)
+        nodes += 1
+        total += size
+        stack.extend(e.args)
+    return {
+        'nodes': nodes,
+        'bytes': total,
+        'unique_nodes': len(unique),
+        'unique_bytes': sum(unique.values()),
+    }
+
+
+# ---------------------------------------------------------------------------
+# Worker memory management
+# ---------------------------------------------------------------------------
+
+def sympy_cache_entries() -> int:
+    """Number of results held by SymPy's global cache (all @cacheit functions)."""
+    from sympy.core.cache import CACHE
+    return sum(f.cache_info().currsize for f in CACHE)
+
+
+def current_rss() -> Optional[int]:
+    """
+    Resident set size of this process in bytes. Read from /proc on Linux;
+    elsewhere the peak RSS from getrusage is returned instead, and None if
+    neither is available.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+@dataclass(frozen=True)
+class CachePolicy:
+    """
+    What a worker does with its caches at episode boundaries.
+
+    max_sympy_entries:    clear SymPy's global cache when an episode ends
+                          with more results than this in it (None = SymPy's
+                          own per-function LRU bound only)
+    clear_on_reset:       also clear it on every RESET action
+    clear_on_episode_end: clear it whenever an episode ends
+    collect_every:        run gc and drop unused ExpressionStore entries
+                          every this many episodes (0 = never); a full
+                          collection costs tens of milliseconds
+    """
+    max_sympy_entries: Optional[int] = 50_000
+    clear_on_reset: bool = False
+    clear_on_episode_end: bool = False
+    collect_every: int = 100
+
+
+DEFAULT_CACHE_POLICY = CachePolicy()
+
+
+class CacheManager:
+    """
+    Applies a CachePolicy for the environments of one worker and keeps a
+    per-episode memory record (the last `history` episodes).
+
+    Environments call on_reset() for RESET actions and end_episode() when an
+    episode reaches a terminal action or is abandoned (reset() or
+    EnvPool.release() before a terminal action).
+    """
+
+    def __init__(self, policy: CachePolicy = DEFAULT_CACHE_POLICY,
+                 transform_cache=None, expression_store=None, history=1000):
+        self.policy = policy
+        self.transform_cache = transform_cache
+        self.expression_store = expression_store
+        self.samples = deque(maxlen=history)
+        self.episodes = 0
+        self.sympy_clears = 0
+        self._baseline_rss = self._last_rss = current_rss()
+
+    def _clear_sympy_cache(self):
+        from sympy.core.cache import clear_cache
+        clear_cache()
+        self.sympy_clears += 1
+
+    def on_reset(self):
+        if self.policy.clear_on_reset:
+            self._clear_sympy_cache()
+
+    def end_episode(self) -> dict:
+        """Apply the policy and record one telemetry sample; returns the sample."""
+        start = time.perf_counter()
+        self.episodes += 1
+        entries = sympy_cache_entries()
+        limit = self.policy.max_sympy_entries
+        cleared = self.policy.clear_on_episode_end or (limit is not None and entries > limit)
+        if cleared:
+            self._clear_sympy_cache()
+            entries = 0
+        collected = None
+        store = self.expression_store or shared_expression_store()
+        if self.policy.collect_every and self.episodes % self.policy.collect_every == 0:
+            gc.collect()
+            collected = store.collect()
+
+        rss = current_rss()
+        sample = {
+            'episode': self.episodes,
+            'rss': rss,
+            'rss_delta': rss - self._last_rss if rss is not None and self._last_rss is not None else None,
+            'sympy_cache_entries': entries,
+            'sympy_cache_cleared': cleared,
+            'transform_cache_entries': len(self.transform_cache or shared_transform_cache()),
+            'store_entries': len(store),
+            'store_collected': collected,
+            'maintenance_seconds': time.perf_counter() - start,
+        }
+        self._last_rss = rss
+        self.samples.append(sample)
+        return sample
+
+    def summary(self) -> dict:
+        """Totals since the manager was created, and mean RSS growth over the recorded episodes."""
+        deltas = [s['rss_delta'] for s in self.samples if s['rss_delta'] is not None]
+        return {
+            'episodes': self.episodes,
+            'sympy_clears': self.sympy_clears,
+            'rss': self._last_rss,
+            'rss_growth': (self._last_rss - self._baseline_rss
+                           if self._last_rss is not None and self._baseline_rss is not None else None),
+            'mean_rss_delta': sum(deltas) / len(deltas) if deltas else None,
+        }
+
+
+_shared_transform_cache = None
+_shared_expression_store = None
+_shared_cache_manager = None
+
+
+def shared_transform_cache() -> TransformCache:
+    """The process-wide TransformCache used by environments that are not given one."""
+    global _shared_transform_cache
+    if _shared_transform_cache is None:
+        _shared_transform_cache = TransformCache()
+    return _shared_transform_cache
+
+
+def shared_expression_store() -> ExpressionStore:
+    """The process-wide ExpressionStore used by environments that are not given one."""
+    global _shared_expression_store
+    if _shared_expression_store is None:
+        _shared_expression_store = ExpressionStore()
+    return _shared_expression_store
+
+
+def shared_cache_manager() -> CacheManager:
+    """
+    The process-wide CacheManager used by environments that are not given
+    one. A worker configures its policy with
+    shared_cache_manager().policy = CachePolicy(...).
+    """
+    global _shared_cache_manager
+    if _shared_cache_manager is None:
+        _shared_cache_manager = CacheManager()
+    return _shared_cache_manager
@@ -0,0 +1,452 @@
+"""
+Compact binary codec for Two-Board environment checkpoints.
+
+Encodes a BoardState, or a whole TwoBoardEnv including its hidden data
+(solve variable, initial equation, solvability, roots), into a byte string
+that can be moved between processes without pickling sympy trees.
+
+Layout (all integers are LEB128 varints, signed ones zigzag-encoded):
+
+    magic b"TBSC" | format version | string table | node table | payload
+
+- string table: every symbol name, function name and Imaginary-board string,
+  stored once and referenced by index
+- node table:   the expression DAG in post-order; each node refers to its
+  children by index, so identical subtrees (across the equation, the roots
+  and the substitution chain) are written once
+- payload:      the state fields, with expressions as node references
+
+Decoding rebuilds Add/Mul/Pow with evaluate=False, so the trees come back
+exactly as they were encoded without re-running sympy's canonicalisation.
+
+Only the node kinds above are encoded; anything else (Dummy symbols, classes
+outside the sympy namespace, ...) raises CodecError rather than falling back
+to pickle, so decoding never runs code from the checkpoint.
+"""
+
+import sympy
+from sympy import Basic, Float, Function, Integer, Rational, S, Symbol
+from sympy.core.function import AppliedUndef
+from sympy.core.operations import AssocOp
+
+from two_board_environment import BoardState, ImaginaryBoard, RootOracle, TwoBoardEnv
+
+MAGIC = b"TBSC"
+FORMAT_VERSION = 2
+_READABLE_VERSIONS = (1, 2)  # version 1 has no COPY sources on the Imaginary board
+
+# Node tags
+_INTEGER = 0
+_RATIONAL = 1
+_SYMBOL = 2
+_SINGLETON = 3  # I, pi, E, oo, zoo, nan, ...
+_FLOAT = 4
+_FUNC = 5  # any sympy class rebuilt from its args (Add, Mul, Pow, sqrt, ...)
+_UNDEF = 6  # undefined function application, e.g. f(x)
+
+_KIND_STATE = 0
+_KIND_ENV = 1
+
+_TRISTATE = {None: 0, True: 1, False: 2}
+_TRISTATE_INV = {v: k for k, v in _TRISTATE.items()}
+
+
+class CodecError(ValueError):
+    """Raised when a byte string is not a checkpoint this codec can read, or a
+    state holds an expression it cannot encode."""
+
+
+# ---------------------------------------------------------------------------
+# Writer
+# ---------------------------------------------------------------------------
+
+class _Writer:
+
+    def __init__(self):
+        self.strings = {}  # {str: index}
+        self.nodes = {}  # {(type, expr): index}
+        self.seen = {}  # {id(expr): (expr, index)}, skips structural hashing for shared objects
+        self.node_buf = bytearray()
+        self.node_count = 0
+        self.payload = bytearray()
+
+    # -- primitives --------------------------------------------------------
+
+    @staticmethod
+    def uvarint(buf, n):
+        while n > 0x7F:
+            buf.append((n & 0x7F) | 0x80)
+            n >>= 7
+        buf.append(n)
+
+    @classmethod
+    def svarint(cls, buf, n):
+        cls.uvarint(buf, (n << 1) if n >= 0 else ((-n << 1) - 1))
+
+    def string(self, s):
+        idx = self.strings.get(s)
+        if idx is None:
+            idx = self.strings[s] = len(self.strings)
+        return idx
+
+    # -- expressions -------------------------------------------------------
+
+    def expr(self, e):
+        """Add e (and its subtrees) to the node table; returns its index."""
+        hit = self.seen.get(id(e))
+        if hit is not None:
+            return hit[1]
+        key = (type(e), e)
+        idx = self.nodes.get(key)
+        if idx is not None:
+            self.seen[id(e)] = (e, idx)
+            return idx
+
+        buf = bytearray()
+        if isinstance(e, Integer):
+            buf.append(_INTEGER)
+            self.svarint(buf, int(e))
+        elif isinstance(e, Rational):
+            buf.append(_RATIONAL)
+            self.svarint(buf, int(e.p))
+            self.uvarint(buf, int(e.q))
+        elif isinstance(e, Symbol) and type(e) is Symbol:
+            assumptions = e.assumptions0
+            buf.append(_SYMBOL)
+            self.uvarint(buf, self.string(e.name))
+            self.uvarint(buf, len(assumptions))
+            for name, value in sorted(assumptions.items()):
+                self.uvarint(buf, self.string(name))
+                buf.append(_TRISTATE[value])
+        elif isinstance(e, Float):
+            sign, man, exp, bc = e._mpf_
+            buf.append(_FLOAT)
+            buf.append(sign)
+            self.uvarint(buf, int(man))
+            self.svarint(buf, int(exp))
+            self.uvarint(buf, int(bc))
+            self.uvarint(buf, e._prec)
+        elif isinstance(e, Basic) and e.is_Atom and getattr(S, type(e).__name__, None) is e:
+            buf.append(_SINGLETON)
+            self.uvarint(buf, self.string(type(e).__name__))
+        elif isinstance(e, AppliedUndef):
+            children = [self.expr(a) for a in e.args]
+            buf.append(_UNDEF)
+            self.uvarint(buf, self.string(e.func.__name__))
+            self.uvarint(buf, len(children))
+            for c in children:
+                self.uvarint(buf, c)
+        elif isinstance(e, Basic) and e.args and getattr(sympy, e.func.__name__, None) is e.func:
+            children = [self.expr(a) for a in e.args]
+            buf.append(_FUNC)
+            self.uvarint(buf, self.string(e.func.__name__))
+            self.uvarint(buf, len(children))
+            for c in children:
+                self.uvarint(buf, c)
+        else:
+            raise CodecError(f"Cannot encode {type(e).__name__} node {e!r}.")
+
+        self.node_buf += buf
+        idx = self.nodes[key] = self.node_count
+        self.seen[id(e)] = (e, idx)
+        self.node_count += 1
+        return idx
+
+    # -- payload helpers ---------------------------------------------------
+
+    def put_uint(self, n):
+        self.uvarint(self.payload, n)
+
+    def put_str(self, s):
+        self.uvarint(self.payload, self.string(s))
+
+    def put_expr(self, e):
+        self.uvarint(self.payload, self.expr(e))
+
+    def put_opt_expr(self, e):
+        self.uvarint(self.payload, 0 if e is None else self.expr(e) + 1)
+
+    def put_opt_uint(self, n):
+        self.uvarint(self.payload, 0 if n is None else n + 1)
+
+    def put_exprs(self, exprs):
+        exprs = list(exprs)
+        self.put_uint(len(exprs))
+        for e in exprs:
+            self.put_expr(e)
+
+    def finish(self):
+        out = bytearray(MAGIC)
+        out.append(FORMAT_VERSION)
+        self.uvarint(out, len(self.strings))
+        for s in self.strings:  # dicts keep insertion order == index order
+            raw = s.encode("utf-8")
+            self.uvarint(out, len(raw))
+            out += raw
+        self.uvarint(out, self.node_count)
+        out += self.node_buf
+        out += self.payload
+        return bytes(out)
+
+
+# ---------------------------------------------------------------------------
+# Reader
+# ---------------------------------------------------------------------------
+
+class _Reader:
+
+    def __init__(self, data):
+        data = bytes(data)
+        if data[:4] != MAGIC:
+            raise CodecError("Not a Two-Board state checkpoint.")
+        if len(data) < 5 or data[4] not in _READABLE_VERSIONS:
+            version = data[4] if len(data) > 4 else None
+            raise CodecError(f"Unsupported checkpoint format version {version} (expected {FORMAT_VERSION}).")
+        self.version = data[4]
+        self.data = data
+        self.pos = 5
+
+        n_strings = self.uint()
+        self.strings = []
+        for _ in range(n_strings):
+            length = self.uint()
+            if self.pos + length > len(data):
+                raise CodecError("Truncated checkpoint.")
+            try:
+                self.strings.append(data[self.pos:self.pos + length].decode("utf-8"))
+            except UnicodeDecodeError:
+                raise CodecError("Malformed string in checkpoint.") from None
+            self.pos += length
+
+        n_nodes = self.uint()
+        self.nodes = []
+        for _ in range(n_nodes):
+            self.nodes.append(self._node())
+
+    def uint(self):
+        data, pos = self.data, self.pos
+        shift = result = 0
+        try:
+            while True:
+                b = data[pos]
+                pos += 1
+                result |= (b & 0x7F) << shift
+                if b < 0x80:
+                    break
+                shift += 7
+        except IndexError:
+            raise CodecError("Truncated checkpoint.") from None
+        self.pos = pos
+        return result
+
+    def sint(self):
+        n = self.uint()
+        return (n >> 1) if not n & 1 else -((n + 1) >> 1)
+
+    def byte(self):
+        if self.pos >= len(self.data):
+            raise CodecError("Truncated checkpoint.")
+        b = self.data[self.pos]
+        self.pos += 1
+        return b
+
+    @staticmethod
+    def _lookup(table, index, what):
+        if index >= len(table):
+            raise CodecError(f"{what} index {index} out of range ({len(table)} entries).")
+        return table[index]
+
+    @staticmethod
+    def tristate(value):
+        if value not in _TRISTATE_INV:
+            raise CodecError(f"Invalid tristate value {value}.")
+        return _TRISTATE_INV[value]
+
+    def _children(self):
+        return [self.get_expr() for _ in range(self.uint())]
+
+    def _node(self):
+        tag = self.byte()
+        if tag == _INTEGER:
+            return Integer(self.sint())
+        if tag == _RATIONAL:
+            p = self.sint()
+            return Rational(p, self.uint())
+        if tag == _SYMBOL:
+            name = self.get_str()
+            assumptions = {}
+            for _ in range(self.uint()):
+                key = self.get_str()
+                assumptions[key] = self.tristate(self.byte())
+            return Symbol(name, **assumptions)
+        if tag == _FLOAT:
+            sign = self.byte()
+            man = self.uint()
+            exp = self.sint()
+            bc = self.uint()
+            return Float._new((sign, man, exp, bc), self.uint())
+        if tag == _SINGLETON:
+            name = self.get_str()
+            try:
+                return getattr(S, name)
+            except AttributeError:
+                raise CodecError(f"Unknown singleton {name!r}.") from None
+        if tag == _UNDEF:
+            name = self.get_str()
+            return Function(name)(*self._children())
+        if tag == _FUNC:
+            name = self.get_str()
+            cls = getattr(sympy, name, None)
+            if not (isinstance(cls, type) and issubclass(cls, Basic)):
+                raise CodecError(f"{name!r} is not a sympy class.")
+            args = self._children()
+            if issubclass(cls, AssocOp):
+                return cls._from_args(args)
+            try:
+                return cls(*args, evaluate=False)
+            except TypeError:
+                return cls(*args)
+        raise CodecError(f"Unknown node tag {tag}.")
+
+    # -- payload helpers ---------------------------------------------------
+
+    def get_str(self):
+        return self._lookup(self.strings, self.uint(), "String")
+
+    def get_expr(self):
+        return self._lookup(self.nodes, self.uint(), "Node")
+
+    def get_opt_expr(self):
+        idx = self.uint()
+        return None if idx == 0 else self._lookup(self.nodes, idx - 1, "Node")
+
+    def get_opt_uint(self):
+        n = self.uint()
+        return None if n == 0 else n - 1
+
+    def get_exprs(self):
+        return [self.get_expr() for _ in range(self.uint())]
+
+
+# ---------------------------------------------------------------------------
+# State / env
+# ---------------------------------------------------------------------------
+
+def _write_state(w, state):
+    w.put_expr(state.real_lhs)
+    w.put_expr(state.real_rhs)
+
+    board = state.imaginary
+    w.put_opt_uint(board.max_entries)
+    w.put_opt_uint(board.max_bytes)
+    w.put_uint(board.evicted)
+    w.put_uint(board.deduplicated)
+    w.put_uint(len(board))
+    for text in board:
+        w.put_str(text)
+        w.put_opt_expr(board.source(text))
+
+    w.put_uint(state.unsolvable_declared | state.complete_declared << 1 | state.solved << 2)
+    w.put_uint(state.steps)
+    w.put_str(state.initial_string)
+    w.put_exprs(state.found_roots)
+    w.put_opt_expr(state.last_substitution)
+    w.put_uint(len(state.substitution_chain))
+    for target, expr in state.substitution_chain.items():
+        w.put_expr(target)
+        w.put_expr(expr)
+
+
+def _read_state(r):
+    real_lhs = r.get_expr()
+    real_rhs = r.get_expr()
+
+    board = ImaginaryBoard(max_entries=r.get_opt_uint(), max_bytes=r.get_opt_uint())
+    evicted = r.uint()
+    deduplicated = r.uint()
+    for _ in range(r.uint()):
+        text = r.get_str()
+        board.append(text, r.get_opt_expr() if r.version >= 2 else None)
+    board.evicted = evicted
+    board.deduplicated = deduplicated
+
+    flags = r.uint()
+    steps = r.uint()
+    initial_string = r.get_str()
+    found_roots = r.get_exprs()
+    last_substitution = r.get_opt_expr()
+    chain = {}
+    for _ in range(r.uint()):
+        target = r.get_expr()
+        chain[target] = r.get_expr()
+
+    return BoardState(
+        real_lhs=real_lhs,
+        real_rhs=real_rhs,
+        imaginary=board,
+        unsolvable_declared=bool(flags & 1),
+        complete_declared=bool(flags & 2),
+        solved=bool(flags & 4),
+        steps=steps,
+        initial_string=initial_string,
+        found_roots=found_roots,
+        last_substitution=last_substitution,
+        substitution_chain=chain,
+    )
+
+
+def encode_state(state: BoardState) -> bytes:
+    """Serialize a BoardState."""
+    w = _Writer()
+    w.put_uint(_KIND_STATE)
+    _write_state(w, state)
+    return w.finish()
+
+
+def decode_state(data) -> BoardState:
+    """Inverse of encode_state."""
+    r = _Reader(data)
+    if r.uint() != _KIND_STATE:
+        raise CodecError("Checkpoint holds an environment, use decode_env().")
+    return _read_state(r)
+
+
+def encode_env(env: TwoBoardEnv) -> bytes:
+    """Serialize a TwoBoardEnv: its BoardState plus the hidden data."""
+    w = _Writer()
+    w.put_uint(_KIND_ENV)
+    w.put_expr(env.var)
+    w.put_expr(env.initial_lhs)
+    w.put_expr(env.initial_rhs)
+    w.put_str(env.initial_string)
+    w.put_uint(_TRISTATE[env._solvable])
+    w.put_exprs(env._all_roots)
+    _write_state(w, env.state)
+    return w.finish()
+
+
+def decode_env(data) -> TwoBoardEnv:
+    """
+    Inverse of encode_env. The environment is rebuilt without calling
+    __init__, so roots and solvability are not recomputed. Process-level
+    configuration (transform cache, expression store, cache manager, parse
+    limits) is not part of the checkpoint; the decoded environment gets the
+    defaults.
+    """
+    r = _Reader(data)
+    if r.uint() != _KIND_ENV:
+        raise CodecError("Checkpoint holds a bare BoardState, use decode_state().")
+    env = TwoBoardEnv.__new__(TwoBoardEnv)
+    env.var = r.get_expr()
+    env.initial_lhs = r.get_expr()
+    env.initial_rhs = r.get_expr()
+    env.initial_string = r.get_str()
+    env._solvable = r.tristate(r.uint())
+    env._root_oracle = RootOracle(r.get_exprs())
+    env._all_roots = env._root_oracle.roots
+    env._num_roots = len(env._all_roots)
+    env.state = _read_state(r)
+    env._episode_open = not (env.state.complete_declared or env.state.unsolvable_declared)
+    env._init_caches()
+    env._intern_expressions()
+    return env
@@ -0,0 +1,43 @@
+from sympy import Symbol
+
+from expression_cache import CacheManager, CachePolicy
+from two_board_environment import Action, ActionType, TwoBoardEnv
+
+x = Symbol('x')
+
+
+def _env(manager):
+    return TwoBoardEnv(x**2 - 4, cache_manager=manager)
+
+
+def test_terminal_action_ends_the_episode_once():
+    manager = CacheManager()
+    env = _env(manager)
+    env.step(Action(ActionType.DECLARE_UNSOLVABLE))
+    assert manager.episodes == 1
+    env.reset()
+    assert manager.episodes == 1
+
+
+def test_reset_ends_an_abandoned_episode():
+    manager = CacheManager(CachePolicy(collect_every=1))
+    env = _env(manager)
+    env.step(Action(ActionType.COPY))
+    env.reset(x**2 - 9)
+    assert manager.episodes == 1
+    assert manager.samples[-1]['store_collected'] is not None
+    env.reset()
+    assert manager.episodes == 2
+
+
+def test_pool_release_ends_the_episode():
+    from env_pool import EnvPool
+    manager = CacheManager()
+    pool = EnvPool(cache_manager=manager)
+    env = pool.acquire(x**2 - 4)
+    env.step(Action(ActionType.COPY))
+    pool.release(env)
+    assert manager.episodes == 1
+    with pool.session(x**2 - 9) as again:
+        assert again is env
+    assert manager.episodes == 2
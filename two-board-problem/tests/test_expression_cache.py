@@ -0,0 +1,75 @@
+import pytest
+from sympy import Symbol, expand, factor, simplify, sin, cos
+
+from expression_cache import TransformCache, expr_size
+from two_board_environment import Action, ActionType, TwoBoardEnv
+
+x, y = Symbol('x'), Symbol('y')
+EXPRS = [(x + 1)**3, (x - y)**2 * (x + 2), sin(x)**2 + cos(x)**2, (x**2 - 1) / (x - 1)]
+
+
+@pytest.mark.parametrize('op, fn', [('simplify', simplify), ('expand', expand), ('factor', factor)])
+def test_hit_equals_fresh_computation(op, fn):
+    cache = TransformCache()
+    first = [cache.get_or_compute(op, fn, e) for e in EXPRS]
+    second = [cache.get_or_compute(op, fn, e) for e in EXPRS]
+    assert second == first == [fn(e) for e in EXPRS]
+    assert cache.stats()['hits'] == len(EXPRS)
+
+
+def test_cached_environment_plays_like_an_uncached_one():
+    def play(cache):
+        env = TwoBoardEnv(x**3 - 6*x**2 + 11*x - 6, transform_cache=cache)
+        states = []
+        for _ in range(2):
+            for action in (ActionType.FACTOR, ActionType.EXPAND, ActionType.SIMPLIFY):
+                env.step(Action(action))
+                states.append((env.state.real_lhs, env.state.real_rhs))
+            env.reset()
+        return states, env.initial_string
+
+    cache = TransformCache()
+    assert play(cache) == play(TransformCache(max_entries=0, op_budgets={})) == play(cache)
+    assert cache.stats()['hits'] > 0
+
+
+def test_eviction_stays_within_the_entry_budget():
+    cache = TransformCache(max_entries=5)
+    for k in range(20):
+        cache.get_or_compute('expand', expand, (x + k)**2)
+        assert cache.stats()['entries'] <= 5
+    assert cache.stats()['evictions'] == 15
+
+
+def test_eviction_stays_within_the_node_budget():
+    cache = TransformCache(max_nodes=60)
+    for k in range(20):
+        cache.get_or_compute('expand', expand, (x + k)**2)
+        assert cache.nodes <= 60
+    kept = [key[1] for key in cache._entries]
+    assert cache.nodes == sum(expr_size(e) + expr_size(expand(e)) for e in kept)
+
+
+def test_memos_have_their_own_budget():
+    cache = TransformCache(max_entries=3, op_budgets={'str': 2})
+    for k in range(3):
+        cache.get_or_compute('expand', expand, (x + k)**2)
+    for k in range(10):
+        cache.get_or_compute('str', str, x + k)
+    stats = cache.stats()
+    assert stats['entries'] == 3 and stats['evictions'] == 0
+    assert stats['partitions']['str']['entries'] == 2
+    assert len(cache) == 5
+    assert ('expand', (x + 2)**2, ()) in cache and ('str', x + 9, ()) in cache
+
+
+def test_save_and_load_keep_the_partitions(tmp_path):
+    path = str(tmp_path / 'cache.pkl')
+    cache = TransformCache(op_budgets={'str': 10})
+    cache.get_or_compute('expand', expand, (x + 1)**2)
+    cache.get_or_compute('str', str, x + 1)
+    cache.save(path)
+    loaded = TransformCache(path=path, op_budgets={'str': 10})
+    assert loaded.stats()['entries'] == 1
+    assert loaded.stats()['partitions']['str']['entries'] == 1
+    assert loaded.get_or_compute('str', str, x + 1) == 'x + 1'
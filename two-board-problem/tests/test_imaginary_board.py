@@ -0,0 +1,32 @@
+import pytest
+
+from two_board_environment import ImaginaryBoard
+
+
+def test_behaves_like_a_deduplicated_list():
+    board = ImaginaryBoard(['a', 'b', 'c'])
+    assert board[0] == 'a' and board[-1] == 'c' and board[1:] == ['b', 'c']
+    board.append('a')
+    assert board == ['b', 'c', 'a']
+    assert board[-1] == 'a'
+    assert board.footprint()['deduplicated'] == 1
+
+
+def test_indexing_follows_eviction():
+    board = ImaginaryBoard(max_entries=2)
+    board.append('x')
+    assert board[0] == 'x'
+    assert board.append('y') == []
+    assert board.append('z') == ['x']
+    assert board == ['y', 'z'] and board[0] == 'y'
+    with pytest.raises(IndexError):
+        board[2]
+
+
+def test_byte_cap():
+    board = ImaginaryBoard(max_bytes=4)
+    board.append('ab')
+    assert board.append('cde') == ['ab']
+    with pytest.raises(ValueError):
+        board.append('fghij')
+    assert board == ['cde'] and board.nbytes == 3
@@ -0,0 +1,66 @@
+import pytest
+from sympy import Symbol, factorial, gamma, parse_expr
+
+from two_board_environment import ParseLimitError, ParseLimits, extract_valid_expressions, safe_parse_expr
+
+
+@pytest.mark.parametrize('s', [
+    'x**2 + 3*x - 1', 'sqrt(2)/3 + f(x)', '2**64', 'factorial(600)', 'factorial(1000)',
+    'factorial(2**9)', 'gamma(999.5)', 'factorial(1e3)', 'factorial(Integer(700))', 'factorial(n)',
+])
+def test_accepts_what_parse_expr_gives(s):
+    assert safe_parse_expr(s) == parse_expr(s)
+
+
+@pytest.mark.parametrize('s', [
+    '9**9**9**9', '2**(10**6)', 'factorial(1001)', 'factorial(2**10)', 'gamma(1000.5)',
+    'factorial(10**100)', 'factorial(factorial(10))', '1' * 1001,
+])
+def test_rejects_beyond_limits(s):
+    with pytest.raises(ParseLimitError):
+        safe_parse_expr(s)
+
+
+@pytest.mark.parametrize('s', [
+    # Functional forms of the operators
+    'Pow(9, Pow(9, 9))', 'pow(9, pow(9, 9))', 'Pow(Mul(Pow(10, 100), Pow(10, 100)), Pow(10, 4))',
+    'Mul(Pow(10, 9000), Pow(10, 9000), Pow(10, 9000), Pow(10, 9000))',
+    # Numeral strings and precision
+    "Rational('1e100000000')", "Integer('1e100000000')", "Float('1e100000000')", "Rational('1/1e100000000')",
+    'N(pi, 10**7)', 'N(pi, n=10**7)', 'Float(1, 10**7)',
+    # Factoring and expansion
+    'factorint(10**200+1)', 'divisors(2**100)', 'expand((x+1)**10000)', 'expand(Pow(x+1, 10000))',
+    'expand(((x+1)**20+y)**20)', 'simplify((a+b+c+d)**40)',
+])
+def test_rejects_functional_forms(s):
+    with pytest.raises(ParseLimitError):
+        safe_parse_expr(s)
+
+
+@pytest.mark.parametrize('s', [
+    'Pow(2, 64)', 'Mul(3, x)', 'Add(1, 2)', "Rational('3/7')", "Float('2.5')", 'N(pi, 50)',
+    'factorint(2**60+1)', 'expand((x+1)**100)', 'expand((x+y+z)**10)', '(x+1)**10000', 'Pow(x, 10**6)',
+])
+def test_accepts_small_functional_forms(s):
+    assert safe_parse_expr(s) == parse_expr(s)
+
+
+def test_limits_are_configurable():
+    assert safe_parse_expr('factorial(20)', ParseLimits(max_factorial_arg=20)) == factorial(20)
+    with pytest.raises(ParseLimitError):
+        safe_parse_expr('factorial(21)', ParseLimits(max_factorial_arg=20))
+    assert safe_parse_expr('gamma(5)', ParseLimits(max_factorial_arg=5)) == gamma(5)
+
+
+def test_depth_and_size():
+    with pytest.raises(ParseLimitError):
+        safe_parse_expr('sin(' * 150 + 'x' + ')' * 150)
+    with pytest.raises(ParseLimitError):
+        safe_parse_expr(' + '.join(f'x{i}' for i in range(1000)))
+
+
+def test_extraction_skips_rejected_strings():
+    found = extract_valid_expressions(['x + 1', 'factorial(10**6)'])
+    assert Symbol('x') + 1 in found
+    assert 10**6 in found
+    assert max(e for e in found if getattr(e, 'is_Integer', False)) == 10**6
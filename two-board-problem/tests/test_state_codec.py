@@ -0,0 +1,67 @@
+import pytest
+from sympy import Dummy, Rational, Symbol, sqrt
+
+from state_codec import CodecError, decode_env, decode_state, encode_env, encode_state
+from two_board_environment import Action, ActionType, BoardState, TwoBoardEnv
+
+x = Symbol('x')
+
+
+def _played_env():
+    env = TwoBoardEnv(x**3 - 6*x**2 + 11*x - 6)
+    env.step(Action(ActionType.COPY))
+    env.step(Action(ActionType.WRITE, expr='sqrt(2)/3 + f(x)'))
+    return env
+
+
+def test_env_round_trip():
+    env = _played_env()
+    decoded = decode_env(encode_env(env))
+    assert decoded.var == env.var
+    assert decoded.initial_lhs == env.initial_lhs
+    assert decoded.initial_rhs == env.initial_rhs
+    assert decoded._all_roots == env._all_roots
+    assert decoded.state.real_lhs == env.state.real_lhs
+    assert decoded.state.imaginary == env.state.imaginary
+    assert decoded.state.steps == env.state.steps
+    assert encode_env(decoded) == encode_env(env)
+
+
+def test_state_round_trip_keeps_unevaluated_trees():
+    state = BoardState(real_lhs=(x + Rational(1, 3))**2 * sqrt(x), real_rhs=Symbol('y') + 0.5,
+                       imaginary=['x', 'x + 1'], found_roots=[Rational(-1, 2)])
+    decoded = decode_state(encode_state(state))
+    assert decoded.real_lhs == state.real_lhs
+    assert decoded.real_rhs == state.real_rhs
+    assert list(decoded.imaginary) == ['x', 'x + 1']
+    assert decoded.found_roots == state.found_roots
+
+
+def test_kind_mismatch():
+    env = _played_env()
+    with pytest.raises(CodecError):
+        decode_state(encode_env(env))
+    with pytest.raises(CodecError):
+        decode_env(encode_state(env.state))
+
+
+def test_unencodable_node_raises():
+    with pytest.raises(CodecError):
+        encode_state(BoardState(real_lhs=Dummy('d') + 1, real_rhs=0))
+
+
+_CHECKPOINT = encode_env(_played_env())
+
+
+@pytest.mark.parametrize('data', [b'', b'TBSC', b'XXXX\x02\x00', b'TBSC\x7f']
+                         + [_CHECKPOINT[:end] for end in range(5, len(_CHECKPOINT))])
+def test_garbage_raises(data):
+    with pytest.raises(CodecError):
+        decode_env(data)
+
+
+def test_function_node_must_name_a_sympy_class():
+    data = encode_state(BoardState(real_lhs=sqrt(x), real_rhs=Rational(0)))
+    assert b'\x03Pow' in data
+    with pytest.raises(CodecError):
+        decode_state(data.replace(b'\x03Pow', b'\x04sqrt'))
@@ -0,0 +1,16 @@
+import json
+
+from trajectory_synth import _synthesize_line, synthesize
+
+
+def test_synthesize_verifies_a_quadratic():
+    trajectory = synthesize('Eq(x**2 - 2, 0)')
+    assert trajectory is not None and trajectory.verified
+    assert [a[0] for a in trajectory.actions] == ['WRITE', 'SUBSTITUTE', 'RESET', 'WRITE', 'SUBSTITUTE',
+                                                  'DECLARE_COMPLETE']
+
+
+def test_failing_equation_does_not_raise():
+    assert _synthesize_line('Eq(x**2 - 2, 0') is None  # unparsable
+    assert _synthesize_line('Eq(3, 0)') is None  # no variable to solve for
+    assert json.loads(_synthesize_line('Eq(x**2 - 2, 0)'))['var'] == 'x'
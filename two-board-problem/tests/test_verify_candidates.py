@@ -0,0 +1,29 @@
+from sympy import Rational, Symbol, cos, pi, sin, sqrt
+
+from two_board_environment import TwoBoardEnv
+
+x = Symbol('x')
+
+
+def _roots(env, candidates, **kwargs):
+    return [check.is_root for check in env.verify_candidates(candidates, **kwargs)]
+
+
+def test_polynomial_roots():
+    env = TwoBoardEnv(x**3 - 6*x**2 + 11*x - 6)
+    checks = env.verify_candidates([1, '2', 3, 4, Rational(3, 2), x])
+    assert [c.is_root for c in checks] == [True, True, True, False, False, False]
+    assert [c.is_new for c in checks] == [True, True, True, False, False, False]
+    assert env.state.steps == 0
+
+
+def test_algebraic_roots_and_near_misses():
+    env = TwoBoardEnv(x**4 - 10*x**2 + 1)
+    near = Rational(3146264369, 10**9)  # sqrt(2) + sqrt(3) to 9 digits
+    assert _roots(env, [sqrt(2) + sqrt(3), sqrt(3) - sqrt(2), near, sqrt(2)]) == [True, True, False, False]
+    assert _roots(env, [near], precision=5) == [False]
+
+
+def test_non_polynomial_equation():
+    env = TwoBoardEnv(sin(x) - cos(x))
+    assert _roots(env, [pi / 4, pi / 2]) == [True, False]
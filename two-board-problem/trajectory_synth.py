@@ -0,0 +1,263 @@
+"""
+Synthesizer of solved Two-Board trajectories for imitation data.
+
+For an equation whose roots are known (the environment's hidden
+RootOracle), a demonstration is built the way demo_quadratic and
+demo_cubic_cardano are written by hand:
+
+    WRITE <root 1 in radicals>, SUBSTITUTE x = root 1, RESET,
+    WRITE <root 2 in radicals>, SUBSTITUTE x = root 2, RESET,
+    ...
+    DECLARE_COMPLETE
+
+and equations that are not solvable by radicals get DECLARE_UNSOLVABLE.
+Every trajectory is replayed in a TwoBoardEnv and kept only if it earns the
+perfect reward, so the output contains verified episodes only.
+
+synthesize_to_file() runs the synthesis across a process pool and streams
+the trajectories to a JSON-lines file as they finish, one per line:
+
+    {"equation": "Eq(x**2 - 2, 0)", "var": "x",
+     "actions": [["WRITE", "sqrt(2)", null], ["SUBSTITUTE", "sqrt(2)", "x"], ...],
+     "rewards": [0.0, 1.0, ...], "return": 11.0}
+
+Usage:
+    python trajectory_synth.py out.jsonl --count 10000 --degree 3 --workers 8
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+from sympy import CRootOf, Eq, Symbol, sympify
+from sympy.parsing.sympy_parser import parse_expr
+
+from env_pool import EnvPool
+from two_board_environment import Action, ActionType
+from workers import worker_context
+
+
+@dataclass
+class Trajectory:
+    equation: str
+    var: str
+    actions: list  # [action type name, expr string or None, target symbol or None]
+    rewards: list = field(default_factory=list)
+    total_reward: float = 0.0
+    verified: bool = False
+
+    def to_json(self) -> str:
+        return json.dumps({
+            'equation': self.equation,
+            'var': self.var,
+            'actions': self.actions,
+            'rewards': self.rewards,
+            'return': self.total_reward,
+        })
+
+    @staticmethod
+    def from_json(line):
+        d = json.loads(line)
+        return Trajectory(d['equation'], d['var'], d['actions'], d['rewards'], d['return'], verified=True)
+
+    def env_actions(self) -> list:
+        """The actions as Action objects, ready for TwoBoardEnv.step()."""
+        actions = []
+        for name, expr, target in self.actions:
+            action_type = ActionType[name]
+            if expr is not None and action_type is not ActionType.WRITE:
+                expr = parse_expr(expr)
+            actions.append(Action(action_type, expr=expr,
+                                  target_symbol=Symbol(target) if target is not None else None))
+        return actions
+
+
+# ---------------------------------------------------------------------------
+# Planning and verification
+# ---------------------------------------------------------------------------
+
+def plan_actions(env, max_chars=400) -> Optional[list]:
+    """
+    Demonstration for the equation loaded in env, built from its hidden
+    roots: one WRITE / SUBSTITUTE / RESET round per root, then
+    DECLARE_COMPLETE (or DECLARE_UNSOLVABLE alone if the equation is not
+    solvable by radicals). Reads the hidden data only; env is not stepped.
+
+    None if a root has no radical form, or one longer than max_chars
+    (general quartic radicals run to thousands of characters, and checking
+    their substitution symbolically takes minutes).
+    """
+    truth = env.ground_truth()
+    if truth.solvable is False:
+        return [[ActionType.DECLARE_UNSOLVABLE.name, None, None]]
+    oracle = truth.oracle
+    var = str(env.var)
+    actions = []
+    for i in range(len(oracle)):
+        root = oracle.radical(i)
+        if isinstance(root, CRootOf):
+            return None
+        text = _stable_rendering(root)
+        if text is None or len(text) > max_chars:
+            return None
+        if i:
+            actions.append([ActionType.RESET.name, None, None])
+        actions.append([ActionType.WRITE.name, text, None])
+        actions.append([ActionType.SUBSTITUTE.name, text, var])
+    actions.append([ActionType.DECLARE_COMPLETE.name, None, None])
+    return actions
+
+
+def _stable_rendering(expr, attempts=3):
+    """
+    A string s with str(parse_expr(s)) == s for (a parse of) expr. Radicals
+    do not always survive str -> parse unchanged; writing the fixed point
+    lets SUBSTITUTE find the parsed expression on the board directly
+    instead of through the full substring extraction.
+    """
+    text = str(expr)
+    for _ in range(attempts):
+        rendered = str(parse_expr(text))
+        if rendered == text:
+            return text
+        text = rendered
+    return None
+
+
+def verify(env, trajectory: Trajectory) -> Trajectory:
+    """
+    Replay the trajectory in env (already reset to its equation) and record
+    the rewards. Verified means every step was legal and the episode earned
+    the perfect reward for its terminal action.
+    """
+    trajectory.rewards = []
+    try:
+        # The environment narrates root detection on stdout
+        with contextlib.redirect_stdout(io.StringIO()):
+            for action in trajectory.env_actions():
+                trajectory.rewards.append(env.step(action))
+    except Exception:
+        return trajectory
+    trajectory.total_reward = sum(trajectory.rewards)
+    terminal = trajectory.rewards[-1]
+    if env.state.complete_declared:
+        trajectory.verified = (terminal == float(env.reward_len())
+                               and len(env.state.found_roots) == len(env.ground_truth().oracle))
+    else:
+        trajectory.verified = terminal > 0
+    return trajectory
+
+
+def synthesize(equation, var=None, pool: Optional[EnvPool] = None) -> Optional[Trajectory]:
+    """A verified demonstration for one equation, or None if none could be built."""
+    pool = pool or EnvPool(max_idle=1)
+    equation = _as_equation(equation)
+    with pool.session(equation, var) as env:
+        actions = plan_actions(env)
+        if actions is None:
+            return None
+        trajectory = Trajectory(env.initial_string, str(env.var), actions)
+        verify(env, trajectory)
+    return trajectory if trajectory.verified else None
+
+
+def _as_equation(equation):
+    if isinstance(equation, str):
+        equation = sympify(equation)
+    return equation
+
+
+# ---------------------------------------------------------------------------
+# Equation curricula
+# ---------------------------------------------------------------------------
+
+def random_equations(count, degree=2, coeff_bound=9, seed=0, var='x'):
+    """
+    Random monic integer polynomials of the given degree (expr = 0), as
+    strings so they can be sent to worker processes cheaply.
+    """
+    rng = random.Random(seed)
+    x = Symbol(var)
+    for _ in range(count):
+        coeffs = [rng.randint(-coeff_bound, coeff_bound) for _ in range(degree)]
+        poly = x ** degree + sum(c * x ** k for k, c in enumerate(reversed(coeffs)))
+        yield str(Eq(poly, 0))
+
+
+# ---------------------------------------------------------------------------
+# Process pool
+# ---------------------------------------------------------------------------
+
+_worker_pool = None
+
+
+def _init_worker():
+    global _worker_pool
+    _worker_pool = EnvPool(max_idle=1)
+
+
+def _synthesize_line(equation) -> Optional[str]:
+    # One equation that breaks sympy (unparsable, no detectable variable,
+    # ...) counts as failed instead of aborting the whole run
+    try:
+        trajectory = synthesize(equation, pool=_worker_pool)
+    except Exception:
+        return None
+    return trajectory.to_json() if trajectory is not None else None
+
+
+def synthesize_to_file(equations, path, workers=None, chunksize=8, context=None) -> dict:
+    """
+    Synthesize and verify trajectories for `equations` (strings or sympy
+    equations) on `workers` processes, appending each verified trajectory to
+    `path` as soon as it is available. Returns counts and throughput.
+
+    Workers are forked from a server with sympy preloaded (workers.py);
+    `context` names another start method instead.
+    """
+    ctx = multiprocessing.get_context(context) if context else worker_context()
+    equations = (str(e) if not isinstance(e, str) else e for e in equations)
+    written = failed = 0
+    start = time.perf_counter()
+    with open(path, 'a') as out, ctx.Pool(workers, initializer=_init_worker) as pool:
+        for line in pool.imap_unordered(_synthesize_line, equations, chunksize=chunksize):
+            if line is None:
+                failed += 1
+                continue
+            out.write(line + '\n')
+            written += 1
+            if written % 100 == 0:
+                out.flush()
+    elapsed = time.perf_counter() - start
+    return {
+        'written': written,
+        'failed': failed,
+        'seconds': elapsed,
+        'episodes_per_hour': written / elapsed * 3600 if elapsed else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Synthesize verified Two-Board trajectories.")
+    parser.add_argument('path', help="output JSON-lines file (appended to)")
+    parser.add_argument('--count', type=int, default=1000)
+    parser.add_argument('--degree', type=int, default=2)
+    parser.add_argument('--coeff-bound', type=int, default=9)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    equations = random_equations(args.count, args.degree, args.coeff_bound, args.seed)
+    stats = synthesize_to_file(equations, args.path, workers=args.workers)
+    print(f"{stats['written']} trajectories written, {stats['failed']} failed, "
+          f"{stats['seconds']:.1f}s ({stats['episodes_per_hour']:.0f} episodes/hour)")
+
+
+if __name__ == "__main__":
+    main()
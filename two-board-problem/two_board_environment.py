@@ -12,17 +12,23 @@ from sympy import (
     Symbol, symbols, Eq, simplify, Poly, Rational,
     sqrt, cbrt, root, I, pi, oo,
     expand, factor, cancel, collect, apart, together,
-    Add, Mul, Pow, Integer, S,
+    Add, Mul, Pow, Integer, S, Basic,
     solveset, solve,
     sympify, parse_expr,
 )
-from sympy.polys.numberfields.galoisgroups import galois_group
 from sympy.polys.polytools import Poly
 from sympy.polys.domains import QQ
+from expression_cache import (
+    CacheManager, ExpressionStore, TransformCache,
+    shared_cache_manager, shared_expression_store, shared_transform_cache,
+)
+from collections import OrderedDict
+from contextlib import contextmanager
 from dataclasses import dataclass, field
 from typing import Optional
 from enum import Enum, auto
 import re
+import sys
 
 
 # ---------------------------------------------------------------------------
@@ -63,6 +69,251 @@ class Action:
     target_symbol: Optional[object] = None  # for SUBSTITUTE / COLLECT
 
 
+class SubstituteStatus(Enum):
+    """Outcome of TwoBoardEnv.try_substitute."""
+    OK = auto()  # substitution applied
+    NOT_EXTRACTABLE = auto()  # expr is not extractable from the Imaginary board
+    TERMINAL = auto()  # environment already in terminal state
+
+
+@dataclass
+class CandidateCheck:
+    """Result of TwoBoardEnv.verify_candidates for one candidate value."""
+    candidate: object
+    is_root: bool  # exact root of the original equation
+    is_new: bool  # root that is not among found_roots yet
+
+
+class NotExtractableError(ValueError):
+    """
+    SUBSTITUTE with an expression the Imaginary board does not provide.
+    The message (which lists every valid extraction) is only formatted when
+    the error is actually printed.
+    """
+
+    def __init__(self, expr, valid):
+        super().__init__(expr)
+        self.expr = expr
+        self.valid = valid
+
+    def __str__(self):
+        return (f"Expression {self.expr} is not extractable from the Imaginary board. "
+                f"Available: {set(self.valid)}")
+
+
+# ---------------------------------------------------------------------------
+# Imaginary board storage
+# ---------------------------------------------------------------------------
+
+class ImaginaryBoard:
+    """
+    Memory-bounded storage for the Imaginary board.
+
+    Behaves like a list of strings (iteration, indexing, len, comparison with
+    lists), but every string is interned and kept only once. Writing a string
+    that is already on the board moves it to the most recent position instead
+    of storing a second copy.
+
+    Optional caps:
+        max_entries: maximum number of distinct strings kept
+        max_bytes:   maximum total UTF-8 size of the kept strings
+
+    When a cap is exceeded, the least recently written strings are evicted
+    first. A single string larger than max_bytes is rejected with ValueError
+    and leaves the board untouched.
+
+    The extractable expressions are a union over the strings, so deduplication
+    does not change them; eviction removes exactly what the evicted strings
+    implied and nothing else.
+
+    Strings written by COPY also keep the expression they render
+    (source(text)), so the environment can find copied subexpressions by
+    structure instead of re-parsing the string.
+    """
+
+    def __init__(self, strings=(), max_entries=None, max_bytes=None):
+        if max_entries is not None and max_entries < 1:
+            raise ValueError("max_entries must be at least 1.")
+        if max_bytes is not None and max_bytes < 1:
+            raise ValueError("max_bytes must be at least 1.")
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # {interned string: utf-8 size}
+        self._sources = {}  # {string: expression it was copied from}
+        self._order = None  # list(self._entries) for indexing, rebuilt after each write
+        self.nbytes = 0
+        self.evicted = 0  # strings dropped to respect the caps
+        self.deduplicated = 0  # writes that hit an existing string
+        for s in strings:
+            self.append(s)
+
+    def append(self, text, source=None):
+        """
+        Write a string; returns the list of strings evicted to make room.
+        `source` is the expression the string renders, if it is a copy.
+        """
+        if not isinstance(text, str):
+            text = str(text)
+        if source is not None:
+            self._sources[text] = source
+        if text in self._entries:
+            self._entries.move_to_end(text)
+            self._order = None
+            self.deduplicated += 1
+            return []
+        size = len(text.encode("utf-8"))
+        if self.max_bytes is not None and size > self.max_bytes:
+            self._sources.pop(text, None)
+            raise ValueError(
+                f"String of {size} bytes exceeds the Imaginary board limit of {self.max_bytes} bytes."
+            )
+        self._entries[sys.intern(text)] = size
+        self._order = None
+        self.nbytes += size
+        return self._evict()
+
+    def _evict(self):
+        evicted = []
+        while self._entries and (
+                (self.max_entries is not None and len(self._entries) > self.max_entries)
+                or (self.max_bytes is not None and self.nbytes > self.max_bytes)):
+            text, size = self._entries.popitem(last=False)
+            self._sources.pop(text, None)
+            self.nbytes -= size
+            evicted.append(text)
+        self.evicted += len(evicted)
+        return evicted
+
+    def source(self, text):
+        """The expression a copied string was rendered from (None for written strings)."""
+        return self._sources.get(text)
+
+    def footprint(self) -> dict:
+        """Memory report: kept entries and bytes, plus eviction/dedupe counters."""
+        return {
+            'entries': len(self._entries),
+            'bytes': self.nbytes,
+            'max_entries': self.max_entries,
+            'max_bytes': self.max_bytes,
+            'evicted': self.evicted,
+            'deduplicated': self.deduplicated,
+        }
+
+    def __iter__(self):
+        return iter(self._entries)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, text):
+        return text in self._entries
+
+    def __getitem__(self, index):
+        if self._order is None:
+            self._order = list(self._entries)
+        return self._order[index]
+
+    def __eq__(self, other):
+        if isinstance(other, (ImaginaryBoard, list, tuple)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self):
+        return repr(list(self._entries))
+
+
+def subexpression_paths(expr) -> dict:
+    """
+    {subexpression: path} for every node of expr. A path is the tuple of
+    .args indices leading from the root to the node; for a subexpression
+    that occurs more than once, the first occurrence in pre-order is kept.
+    """
+    paths = {}
+    stack = [(expr, ())]
+    while stack:
+        e, path = stack.pop()
+        if e in paths:
+            continue
+        paths[e] = path
+        stack.extend((arg, path + (i,)) for i, arg in reversed(list(enumerate(e.args))))
+    return paths
+
+
+def subexpression_at(expr, path):
+    """Inverse of subexpression_paths: follow a path of .args indices."""
+    for i in path:
+        expr = expr.args[i]
+    return expr
+
+
+# ---------------------------------------------------------------------------
+# Substitution chain
+# ---------------------------------------------------------------------------
+
+class SubstitutionGraph:
+    """
+    Substitution chain composed incrementally, one SUBSTITUTE at a time.
+
+    `chain` holds the substitutions as the agent made them ({target: expr}).
+    `resolved` holds the same edges with integer power targets inverted
+    (u**3 -> a becomes u -> a**(1/3)) and every value fully composed: a new
+    value has all earlier substitutions applied to it, and earlier values that
+    mention the new target are rewritten once. The values therefore never
+    refer to another resolved target, so the root candidate for the solve
+    variable is available in one pass instead of a subs() fixed-point loop.
+
+    Multi-variable chains (x -> u + v, u*v -> 1, u**3 -> a, v**3 -> b) compose
+    in whatever order the substitutions arrive. Replacing an existing target
+    rebuilds from `chain`, since values composed from the old edge are stale.
+    """
+
+    def __init__(self, chain=None):
+        self.chain = chain if chain is not None else {}
+        self.resolved = {}
+        self._rebuild()
+
+    @staticmethod
+    def resolve_target(target, expr):
+        """Invert integer power targets: (u**3, a) -> (u, a**(1/3))."""
+        if isinstance(target, Pow) and target.exp.is_Integer:
+            return target.base, Pow(expr, Rational(1, target.exp))
+        return target, expr
+
+    def add(self, target, expr):
+        expr = sympify(expr)
+        if target in self.chain:
+            self.chain[target] = expr
+            self._rebuild()
+        else:
+            self.chain[target] = expr
+            self._insert(*self.resolve_target(target, expr))
+
+    def _rebuild(self):
+        self.resolved = {}
+        for target, expr in self.chain.items():
+            self._insert(*self.resolve_target(target, expr))
+
+    def _insert(self, key, value):
+        value = self.compose(value)
+        for k, v in self.resolved.items():
+            if v.has(key):
+                self.resolved[k] = v.subs(key, value)
+        self.resolved[key] = value
+
+    def compose(self, expr):
+        """Apply every resolved substitution to expr (values are already closed)."""
+        for key, value in self.resolved.items():
+            if expr.has(key):
+                expr = expr.subs(key, value)
+        return expr
+
+    def root_candidate(self, var):
+        """Composed value of the solve variable in terms of the Imaginary-board material."""
+        if var in self.resolved:
+            return self.resolved[var]
+        return self.compose(var)
+
+
 # ---------------------------------------------------------------------------
 # Environment state
 # ---------------------------------------------------------------------------
@@ -71,7 +322,7 @@ class Action:
 class BoardState:
     real_lhs: object  # sympy expression (left-hand side)
     real_rhs: object  # sympy expression (right-hand side)
-    imaginary: list = field(default_factory=list)  # list of arbitrary strings
+    imaginary: ImaginaryBoard = field(default_factory=ImaginaryBoard)  # arbitrary strings
     unsolvable_declared: bool = False
     complete_declared: bool = False  # agent declared all roots found
     solved: bool = False
@@ -80,6 +331,12 @@ class BoardState:
     found_roots: list = field(default_factory=list)  # roots found so far
     last_substitution: object = None  # track last substitution for root detection
     substitution_chain: dict = field(default_factory=dict)  # {target: expr}
+    substitution_graph: SubstitutionGraph = field(init=False, repr=False)  # composed view of the chain
+
+    def __post_init__(self):
+        if not isinstance(self.imaginary, ImaginaryBoard):
+            self.imaginary = ImaginaryBoard(self.imaginary)
+        self.substitution_graph = SubstitutionGraph(self.substitution_chain)
 
     def real_eq(self) -> Eq:
         return Eq(self.real_lhs, self.real_rhs)
@@ -107,11 +364,399 @@ def _has_undefined_functions(expr):
     return False
 
 
-def extract_valid_expressions(strings: list, known_symbols=None) -> set:
+# ---------------------------------------------------------------------------
+# Bounded parsing of Imaginary-board strings
+# ---------------------------------------------------------------------------
+
+@dataclass(frozen=True)
+class ParseLimits:
+    """
+    Limits for safe_parse_expr. Strings whose evaluation would exceed them are
+    rejected before sympy evaluates anything.
+
+    max_int_digits:     digits in any integer literal
+    max_int_bits:       estimated size (bits) of any constant the expression evaluates
+    max_exponent:       magnitude of a power's exponent when the base is constant
+    max_factorial_arg:  argument of factorial-like functions (factorial, binomial, ...)
+    max_factor_bits:    size (bits) of integers given to factoring functions (factorint, divisors, ...)
+    max_precision:      digits requested from N() or Float()
+    max_expand_terms:   estimated terms of an argument to expand, simplify, factor, ...
+    max_depth:          nesting depth of the parsed expression
+    max_nodes:          number of nodes in the parsed expression
+    """
+    max_int_digits: int = 1000
+    max_int_bits: int = 100_000
+    max_exponent: int = 10_000
+    max_factorial_arg: int = 1000
+    max_factor_bits: int = 64
+    max_precision: int = 10_000
+    max_expand_terms: int = 1000
+    max_depth: int = 100
+    max_nodes: int = 2000
+
+
+DEFAULT_PARSE_LIMITS = ParseLimits()
+
+
+class ParseLimitError(ValueError):
+    """The string would evaluate to something beyond the ParseLimits."""
+
+
+# Functions whose value grows faster than exponentially in their argument
+_FACTORIAL_LIKE = frozenset({
+    'factorial', 'factorial2', 'subfactorial', 'gamma', 'binomial', 'rf', 'ff', 'RisingFactorial',
+    'FallingFactorial', 'fibonacci', 'lucas', 'tribonacci', 'bell', 'catalan', 'primorial', 'prime',
+    'bernoulli', 'euler', 'harmonic', 'partition', 'multinomial_coefficients', 'nextprime', 'primepi',
+})
+# Functions that factor their integer arguments (time grows with the size of the factors)
+_INTEGER_FACTORING = frozenset({
+    'factorint', 'factorrat', 'primefactors', 'divisors', 'proper_divisors', 'divisor_count',
+    'proper_divisor_count', 'divisor_sigma', 'udivisors', 'udivisor_count', 'antidivisors',
+    'antidivisor_count', 'totient', 'reduced_totient', 'mobius', 'primenu', 'primeomega', 'core',
+    'perfect_power', 'multiplicity', 'discrete_log', 'n_order', 'primitive_root', 'is_primitive_root',
+    'sqrt_mod', 'nthroot_mod', 'is_nthpow_residue', 'quadratic_residues', 'factor_list',
+})
+# Functions that multiply out their argument; their cost grows with its number of terms
+_EXPANDING = frozenset({
+    'expand', 'expand_mul', 'expand_multinomial', 'expand_power_base', 'expand_power_exp', 'expand_log',
+    'expand_complex', 'expand_trig', 'expand_func', 'simplify', 'factor', 'cancel', 'together', 'apart',
+    'ratsimp', 'radsimp', 'collect', 'Poly', 'poly', 'horner', 'sqf', 'sqf_list', 'roots', 'solve',
+})
+# Precision arguments: (position, keyword names)
+_PRECISION_ARGS = {'N': (1, ('n',)), 'Float': (1, ('dps', 'precision'))}
+# Sympy number constructors emitted by the parser's auto_number transformation
+_NUMBER_CONSTRUCTORS = frozenset({'Integer', 'Float', 'Rational'})
+# A decimal numeral as Integer/Rational/Float accept it, one side of a '/'
+_NUMERAL = re.compile(r'\s*[+-]?(\d*)(?:\.(\d*))?(?:[eE]([+-]?\d+))?\s*')
+# Python builtins parse_expr exposes that are harmless on sympy numbers
+_SAFE_BUILTINS = frozenset({'abs', 'max', 'min', 'pow', 'round'})
+
+_parse_globals = None
+
+
+def _parse_namespace():
+    """The global namespace parse_expr builds on every call, built once."""
+    global _parse_globals
+    if _parse_globals is None:
+        import builtins
+        import types
+        from sympy import Max, Min
+        namespace = {}
+        exec('from sympy import *', namespace)
+        for name, obj in vars(builtins).items():
+            if isinstance(obj, types.BuiltinFunctionType):
+                namespace[name] = obj
+        namespace['max'] = Max
+        namespace['min'] = Min
+        _parse_globals = namespace
+    return _parse_globals
+
+
+class _BoundsChecker:
+    """
+    Walks the Python AST that sympy's parser produces and estimates, for every
+    constant subexpression, an upper bound on its size in bits (None for
+    anything involving symbols, which sympy keeps unevaluated). Function
+    forms (Pow, Mul, Integer('...')) are bounded like the operators and
+    literals they stand for; calls that factor, expand or evaluate to a
+    requested precision are bounded by their arguments.
+    """
+
+    _CONSTANT_NAMES = frozenset({'I', 'pi', 'E', 'oo', 'zoo', 'nan', 'EulerGamma', 'GoldenRatio', 'Catalan'})
+
+    def __init__(self, limits: ParseLimits, namespace):
+        self.limits = limits
+        self.namespace = namespace
+
+    def check(self, tree):
+        import ast
+        if sum(1 for _ in ast.walk(tree)) > self.limits.max_nodes:
+            raise ParseLimitError("too many nodes")
+        self.bits(tree.body, 0)
+
+    def _bound(self, bits):
+        if bits is not None and bits > self.limits.max_int_bits:
+            raise ParseLimitError("constant too large")
+        return bits
+
+    def bits(self, node, depth):
+        import ast
+        import math
+        if depth > self.limits.max_depth:
+            raise ParseLimitError("nesting too deep")
+        depth += 1
+
+        if isinstance(node, ast.Constant):
+            if isinstance(node.value, int):
+                if len(str(abs(node.value))) > self.limits.max_int_digits:
+                    raise ParseLimitError("integer literal too long")
+                return max(node.value.bit_length(), 1)
+            if isinstance(node.value, str):
+                if len(node.value) > self.limits.max_int_digits:
+                    raise ParseLimitError("literal too long")
+                return None
+            if isinstance(node.value, float) and math.isfinite(node.value):
+                return max(int(abs(node.value)).bit_length(), 64)
+            return 64
+        if isinstance(node, ast.Name):
+            if node.id.startswith('_'):
+                raise ParseLimitError("private name")
+            return 2 if node.id in self._CONSTANT_NAMES else None
+        if isinstance(node, ast.UnaryOp):
+            return self.bits(node.operand, depth)
+        if isinstance(node, ast.BinOp):
+            left = self.bits(node.left, depth)
+            right = self.bits(node.right, depth)
+            if isinstance(node.op, ast.Pow):
+                return self._power(left, right)
+            if left is None or right is None:
+                return None
+            if isinstance(node.op, (ast.Add, ast.Sub)):
+                return self._bound(max(left, right) + 1)
+            if isinstance(node.op, (ast.Mult, ast.Div, ast.MatMult)):
+                return self._bound(left + right)
+            if isinstance(node.op, ast.LShift):
+                if right > self.limits.max_exponent.bit_length():
+                    raise ParseLimitError("shift too large")
+                return self._bound(left + 2 ** right)
+            return left
+        if isinstance(node, ast.Call):
+            return self._call(node, depth)
+        if isinstance(node, (ast.Tuple, ast.List)):
+            for elt in node.elts:
+                self.bits(elt, depth)
+            return None
+        if isinstance(node, ast.Compare):
+            self.bits(node.left, depth)
+            for comparator in node.comparators:
+                self.bits(comparator, depth)
+            return None
+        if isinstance(node, ast.Lambda):
+            self.bits(node.body, depth)
+            return None
+        # Attribute access, subscripts, comprehensions, walrus, ...: nothing
+        # on the Imaginary board needs them
+        raise ParseLimitError(f"unsupported syntax: {type(node).__name__}")
+
+    def _power(self, base, exponent):
+        """Bits of base**exponent; symbolic bases stay unevaluated and are not bounded."""
+        if base is None or exponent is None:
+            return None
+        if exponent > self.limits.max_exponent.bit_length():
+            raise ParseLimitError("exponent too large")
+        return self._bound(base * 2 ** exponent)
+
+    def _magnitude(self, node):
+        """
+        Upper bound on the absolute value of a small integer or float constant
+        (literals, signs, +, -, *, small powers and number constructors), None
+        otherwise.
+        """
+        import ast
+        import math
+        if isinstance(node, ast.Constant) and not isinstance(node.value, bool):
+            value = node.value
+            if isinstance(value, str):  # Float('2.5') from the parser's auto_number
+                try:
+                    value = float(value)
+                except ValueError:
+                    return None
+            if isinstance(value, (int, float)) and math.isfinite(value):
+                return math.ceil(abs(value))
+            return None
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.UAdd)):
+            return self._magnitude(node.operand)
+        if isinstance(node, ast.BinOp) and isinstance(node.op, (ast.Add, ast.Sub, ast.Mult)):
+            left, right = self._magnitude(node.left), self._magnitude(node.right)
+            if left is None or right is None:
+                return None
+            return left * right if isinstance(node.op, ast.Mult) else left + right
+        if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Pow):
+            base, exponent = self._magnitude(node.left), self._magnitude(node.right)
+            # base**exponent < 2**(exponent * ceil(log2(base)))
+            if base is None or exponent is None or exponent * max((base - 1).bit_length(), 1) > 64:
+                return None
+            return max(base, 1) ** exponent
+        if (isinstance(node, ast.Call) and isinstance(node.func, ast.Name)
+                and node.func.id in _NUMBER_CONSTRUCTORS and len(node.args) == 1 and not node.keywords):
+            return self._magnitude(node.args[0])
+        return None
+
+    @staticmethod
+    def _numeral_bits(text):
+        """Bits of the number a numeral string like '1e100000000' or '3/7' spells out."""
+        import math
+        bits = 0
+        for part in text.replace('_', '').split('/'):
+            match = _NUMERAL.fullmatch(part)
+            if match is None:
+                return 64  # not a numeral: the constructor rejects it or reads a small special value
+            whole, fraction, exponent = match.groups()
+            digits = len(whole) + len(fraction or '') + abs(int(exponent or 0))
+            bits += math.ceil(digits * math.log2(10)) + 1
+        return bits
+
+    def _terms(self, node):
+        """
+        Upper bound on the number of terms `node` multiplies out to (a sum of n
+        terms to the power e has at most C(n + e - 1, e)), capped just above
+        max_expand_terms.
+        """
+        import ast
+        import math
+        cap = self.limits.max_expand_terms + 1
+        if isinstance(node, ast.UnaryOp):
+            return self._terms(node.operand)
+        if isinstance(node, ast.BinOp):
+            if isinstance(node.op, ast.Pow):
+                return self._power_terms(node.left, node.right)
+            left, right = self._terms(node.left), self._terms(node.right)
+            if isinstance(node.op, (ast.Add, ast.Sub)):
+                return min(left + right, cap)
+            return min(left * right, cap)
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name):
+            name = node.func.id
+            if name in ('Pow', 'pow') and len(node.args) >= 2:
+                return self._power_terms(node.args[0], node.args[1])
+            if name == 'Add':
+                return min(sum(self._terms(a) for a in node.args), cap)
+            if name == 'Mul':
+                return min(math.prod(self._terms(a) for a in node.args), cap)
+        # Atoms and other functions expand as a unit
+        return 1
+
+    def _power_terms(self, base, exponent):
+        import math
+        terms = self._terms(base)
+        e = self._magnitude(exponent)
+        if e is None or terms == 1:
+            return terms  # a symbolic exponent is not multiplied out
+        cap = self.limits.max_expand_terms + 1
+        if e >= cap:
+            return cap
+        return min(math.comb(terms + e - 1, e), cap)
+
+    def _call(self, node, depth):
+        import ast
+        import builtins
+        if node.keywords and any(kw.arg is None for kw in node.keywords):
+            raise ParseLimitError("unsupported syntax: **kwargs")
+        args = [self.bits(a, depth) for a in node.args]
+        kwargs = {kw.arg: (kw.value, self.bits(kw.value, depth)) for kw in node.keywords}
+        if not isinstance(node.func, ast.Name):
+            # e.g. Function('f')(x) from the parser, or a lambda application
+            if not (isinstance(node.func, ast.Call) and isinstance(node.func.func, ast.Name)
+                    and node.func.func.id in ('Function', 'Symbol')):
+                raise ParseLimitError("unsupported call")
+            return None
+        name = node.func.id
+        if name.startswith('_'):
+            raise ParseLimitError("private name")
+        if name in _PRECISION_ARGS:
+            position, keywords = _PRECISION_ARGS[name]
+            requested = [(node.args[position], args[position])] if len(node.args) > position else []
+            requested += [kwargs[k] for k in keywords if k in kwargs]
+            for arg, bits in requested:
+                value = self._magnitude(arg)
+                if value is None and bits is not None:
+                    value = 1 << min(bits, 64)
+                if value is not None and value > self.limits.max_precision:
+                    raise ParseLimitError(f"{name}() precision too high")
+        if name in _NUMBER_CONSTRUCTORS:
+            # Numeral strings ('1e100000000') cost as much as the number they spell out
+            known = [self._numeral_bits(a.value) if isinstance(a, ast.Constant) and isinstance(a.value, str)
+                     else bits for a, bits in zip(node.args[:2], args[:2])]
+            known = [bits for bits in known if bits is not None]
+            return self._bound(sum(known)) if known else 64
+        if name in ('Symbol', 'Function', 'symbols'):
+            return None
+        if name in ('pow', 'Pow'):
+            if len(args) >= 2:
+                return self._power(args[0], args[1])
+            return None
+        if name == 'Mul':
+            if any(a is None for a in args):
+                return None
+            return self._bound(sum(args))
+        if name == 'Add':
+            if any(a is None for a in args):
+                return None
+            return self._bound(max(args, default=1) + max(len(args), 1).bit_length())
+        if name in _INTEGER_FACTORING:
+            for arg, bits in zip(node.args, args):
+                value = self._magnitude(arg)
+                if value is not None:
+                    bits = value.bit_length()
+                if bits is not None and bits > self.limits.max_factor_bits:
+                    raise ParseLimitError(f"{name}() argument too large to factor")
+        if name in _EXPANDING:
+            if any(self._terms(a) > self.limits.max_expand_terms for a in node.args):
+                raise ParseLimitError(f"{name}() argument expands to too many terms")
+        obj = self.namespace.get(name)
+        if obj is not None and obj is getattr(builtins, name, None) and name not in _SAFE_BUILTINS:
+            raise ParseLimitError(f"builtin {name}() not allowed")
+        if name in _FACTORIAL_LIKE:
+            values = []
+            for arg, bits in zip(node.args, args):
+                if bits is None:
+                    continue
+                value = self._magnitude(arg)
+                if value is None:
+                    # Any constant of `bits` bits is below 2**bits
+                    value = (1 << min(bits, 64)) - 1
+                if value > self.limits.max_factorial_arg:
+                    raise ParseLimitError(f"{name}() argument too large")
+                values.append(value)
+            if len(values) != len(args):
+                return None
+            n = max(values, default=1)
+            return self._bound(n * max(n.bit_length(), 1))
+        known = [a for a in args if a is not None]
+        if not known or len(known) != len(args):
+            return None
+        return self._bound(max(known))
+
+
+def safe_parse_expr(s: str, limits: ParseLimits = DEFAULT_PARSE_LIMITS):
+    """
+    parse_expr with bounds: the string goes through sympy's usual
+    transformations, the resulting code is checked against `limits`, and only
+    then evaluated. Raises ParseLimitError for strings like "9**9**9**9" or
+    "factorial(10**6)" instead of pinning a core; otherwise returns exactly
+    what parse_expr(s) would.
+    """
+    import ast
+    from sympy.parsing.sympy_parser import stringify_expr, eval_expr, standard_transformations, null
+
+    namespace = _parse_namespace()
+    local_dict = {}
+    code = stringify_expr(s, local_dict, namespace, standard_transformations)
+    try:
+        tree = ast.parse(code, mode='eval')
+    except (SyntaxError, RecursionError, MemoryError) as e:
+        raise ValueError(f"Cannot parse {s!r}") from e
+    _BoundsChecker(limits, namespace).check(tree)
+    expr = eval_expr(compile(tree, '<string>', 'eval'), local_dict, namespace)
+    local_dict.pop(null, None)
+    return expr
+
+
+def extract_valid_expressions(strings: list, known_symbols=None, limits: Optional[ParseLimits] = DEFAULT_PARSE_LIMITS) -> set:
+    """
+    Every expression that can be read from a substring of the given strings,
+    plus their field atoms. Substrings are parsed with safe_parse_expr under
+    `limits`; limits=None falls back to plain (unbounded) parse_expr.
+    """
     from sympy.parsing.sympy_parser import parse_expr
     from sympy import sin, cos, tan, exp, log, sqrt, Abs
     from sympy.core.function import UndefinedFunction
 
+    if limits is None:
+        parse = parse_expr
+    else:
+        def parse(sub):
+            return safe_parse_expr(sub, limits)
+
     valid = set()
 
     for s in strings:
@@ -123,7 +768,7 @@ def extract_valid_expressions(strings: list, known_symbols=None) -> set:
                 if not sub:
                     continue
                 try:
-                    expr = parse_expr(sub)
+                    expr = parse(sub)
                     if expr is None or isinstance(expr, bool):
                         continue
                     if _has_undefined_functions(expr):
@@ -187,6 +832,9 @@ def check_solvable_by_radicals(poly_expr, var):
         False — not solvable by radicals
         None  — cannot determine
     """
+    # Imported on first use: galoisgroups pulls in most of sympy.polys.numberfields
+    from sympy.polys.numberfields.galoisgroups import galois_group
+
     try:
         p = Poly(poly_expr, var, domain=QQ)
     except Exception:
@@ -216,10 +864,241 @@ def check_solvable_by_radicals(poly_expr, var):
     return True
 
 
+# ---------------------------------------------------------------------------
+# Root oracle
+# ---------------------------------------------------------------------------
+
+def _mpq(q):
+    """mpmath value of a rational from the polys ground types."""
+    import mpmath
+    return mpmath.mpf(int(q.numerator)) / int(q.denominator)
+
+
+class RootOracle:
+    """
+    Exact roots of a polynomial over Q (hidden from agent), computed tier by tier
+    instead of solve() + simplify():
+
+    - factor over Q first, so reducible inputs only pay for their factors
+    - degree 1 and 2 factors: closed forms in QQ(sqrt(d))
+    - degree >= 3 factors: CRootOf, with high-precision numeric values cached
+      on first use; Cardano/Ferrari-style radical forms are only built when
+      radical(i) asks for them
+
+    Matching a candidate value against the roots is numeric (at `precision`
+    digits, tolerance `tol`), with a symbolic fallback for values that do not
+    evaluate to a number.
+    """
+
+    def __init__(self, roots, precision=50, tol=1e-10):
+        self.roots = list(roots)
+        self.precision = precision
+        self.tol = tol
+        self._numeric = {}  # {index: mpmath value}
+        self._radicals = {}  # {index: radical form, or the root itself if none exists}
+
+    @classmethod
+    def compute(cls, expr, var, **kwargs):
+        """Roots of expr = 0 in var (distinct, as solve() returns them)."""
+        from sympy import CRootOf
+        try:
+            p = Poly(expr, var, domain=QQ)
+        except Exception:
+            p = None
+        if p is None or p.is_zero:
+            # Not a polynomial over Q: fall back to the general solver
+            try:
+                return cls([simplify(r) for r in solve(expr, var)], **kwargs)
+            except Exception:
+                return cls([], **kwargs)
+
+        roots = []
+        for fac, _ in p.factor_list()[1]:
+            deg = fac.degree()
+            if deg == 1:
+                a, b = fac.all_coeffs()
+                roots.append(-b / a)
+            elif deg == 2:
+                a, b, c = fac.all_coeffs()
+                d = sqrt(b ** 2 - 4 * a * c)
+                roots.append((-b + d) / (2 * a))
+                roots.append((-b - d) / (2 * a))
+            else:
+                roots.extend(CRootOf(fac, i) for i in range(deg))
+        return cls(roots, **kwargs)
+
+    def __len__(self):
+        return len(self.roots)
+
+    def _evalf(self, value):
+        """High-precision mpmath value of a sympy expression, or None if it is not a number."""
+        bits = int(self.precision * 3.33) + 10
+        try:
+            return sympify(value).evalf(self.precision)._to_mpmath(bits)
+        except Exception:
+            return None
+
+    def numeric(self, i):
+        from sympy import CRootOf
+        if i not in self._numeric:
+            if isinstance(self.roots[i], CRootOf):
+                self._numeric_factor(self.roots[i].poly)
+            if self._numeric.get(i) is None:
+                self._numeric[i] = self._evalf(self.roots[i])
+        return self._numeric[i]
+
+    def _numeric_factor(self, poly):
+        """
+        Numeric values of all CRootOf roots of one factor from a single
+        mpmath.polyroots call; each value is assigned to the root whose
+        isolating interval contains it. CRootOf.evalf refines the intervals
+        exactly and takes seconds per root at this precision.
+        """
+        import mpmath
+        from sympy import CRootOf
+        with mpmath.workdps(self.precision + 10):
+            try:
+                values = mpmath.polyroots([int(c) for c in poly.all_coeffs()],
+                                          maxsteps=200, extraprec=4 * self.precision)
+            except mpmath.NoConvergence:
+                return
+            for j, r in enumerate(self.roots):
+                if not (isinstance(r, CRootOf) and r.poly == poly):
+                    continue
+                box = r._get_interval()
+                if r.is_real:
+                    re_lo, re_hi, im_lo, im_hi = _mpq(box.a), _mpq(box.b), -self.tol, self.tol
+                else:
+                    re_lo, re_hi, im_lo, im_hi = map(_mpq, (box.ax, box.bx, box.ay, box.by))
+                for v in values:
+                    v = mpmath.mpc(v)
+                    if re_lo <= v.real <= re_hi and im_lo <= v.imag <= im_hi:
+                        self._numeric[j] = v.real if r.is_real else v
+                        break
+
+    def radical(self, i):
+        """Radical form of root i, computed on first request (the CRootOf itself if none)."""
+        from sympy import CRootOf, roots as poly_roots
+        if i in self._radicals:
+            return self._radicals[i]
+        r = self.roots[i]
+        if not isinstance(r, CRootOf):
+            self._radicals[i] = r
+            return r
+        candidates = list(poly_roots(r.poly, cubics=True, quartics=True, quintics=True))
+        # Resolve every root of the same factor at once
+        for j, other in enumerate(self.roots):
+            if isinstance(other, CRootOf) and other.poly == r.poly:
+                self._radicals[j] = other
+                for c in candidates:
+                    v = self._evalf(c)
+                    if v is not None and abs(v - self.numeric(j)) < self.tol:
+                        self._radicals[j] = c
+                        break
+        return self._radicals[i]
+
+    def match(self, value):
+        """Index of the root equal to value, or None."""
+        from sympy import CRootOf
+        v = self._evalf(value)
+        if v is not None:
+            for i in range(len(self.roots)):
+                n = self.numeric(i)
+                if n is not None and abs(v - n) < self.tol:
+                    return i
+            return None
+        for i, r in enumerate(self.roots):
+            if not isinstance(r, CRootOf) and simplify(value - r) == 0:
+                return i
+        return None
+
+
+@dataclass
+class EquationAnalysis:
+    """Hidden per-equation data: solvability by radicals and the root oracle."""
+    solvable: Optional[bool]
+    oracle: RootOracle
+
+
+def analyze_equation(expr, var) -> EquationAnalysis:
+    """Solvability and roots of expr = 0; memoized per equation by the environments."""
+    return EquationAnalysis(check_solvable_by_radicals(expr, var), RootOracle.compute(expr, var))
+
+
+class CompiledPolynomial:
+    """
+    A polynomial over Q compiled once for interval evaluation at many points.
+
+    The rational coefficients are turned into mpmath intervals at `precision`
+    digits, and enclose() runs Horner's scheme over a whole batch of candidate
+    values at once. Each candidate enters as a small complex box around its
+    numeric value (evalf is accurate to `precision` digits), so if 0 is not in
+    the resulting enclosure the candidate is certainly not a root.
+    """
+
+    def __init__(self, expr, var, precision=50):
+        self.poly = Poly(expr, var, domain=QQ)
+        self.precision = precision
+        with self._iv_precision() as iv:
+            self.coeffs = [iv.mpf(int(c.p)) / int(c.q) for c in self.poly.all_coeffs()]
+
+    @contextmanager
+    def _iv_precision(self):
+        from mpmath import iv
+        saved, iv.dps = iv.dps, self.precision
+        try:
+            yield iv
+        finally:
+            iv.dps = saved
+
+    def _box(self, iv, value):
+        """Complex interval around the numeric value of a sympy expression, or None."""
+        try:
+            z = sympify(value).evalf(self.precision + 5)
+            re, im = (part._to_mpmath(iv.prec + 20) for part in z.as_real_imag())
+        except Exception:
+            return None
+        err = iv.mpf([-1, 1]) * (abs(float(re)) + abs(float(im)) + 1) * iv.mpf(10) ** -self.precision
+        return iv.mpc(iv.mpf(re) + err, iv.mpf(im) + err)
+
+    def enclose(self, values) -> list:
+        """Interval enclosures of the polynomial at each value (None if not numeric)."""
+        with self._iv_precision() as iv:
+            boxes = [self._box(iv, v) for v in values]
+            acc = [self.coeffs[0] if z is not None else None for z in boxes]
+            for c in self.coeffs[1:]:
+                acc = [a * z + c if z is not None else None for a, z in zip(acc, boxes)]
+        return acc
+
+    def may_vanish(self, values) -> list:
+        """False where the polynomial is provably non-zero at the value."""
+        return [enc is None or 0 in enc for enc in self.enclose(values)]
+
+
 # ---------------------------------------------------------------------------
 # Environment
 # ---------------------------------------------------------------------------
 
+# Per-string memos kept across reset(); trimmed to the most recent entries
+_MEMO_MAX_ENTRIES = 4096
+
+
+def _equation_sides(equation):
+    if isinstance(equation, Eq):
+        return equation.lhs, equation.rhs
+    return equation, S.Zero
+
+
+def _equation_string(lhs, rhs):
+    return str(Eq(lhs, rhs))
+
+
+def _trim(memo, max_entries):
+    """Drop the oldest entries of an insertion-ordered dict beyond max_entries."""
+    for key in list(memo)[:max(0, len(memo) - max_entries)]:
+        del memo[key]
+
+
 class TwoBoardEnv:
     """
     Two-Board Problem environment.
@@ -234,87 +1113,324 @@ class TwoBoardEnv:
     3. Use DECLARE_COMPLETE when they believe all roots are found
     """
 
-    def __init__(self, equation, var=None):
+    def __init__(self, equation, var=None, imaginary_max_entries=None, imaginary_max_bytes=None,
+                 transform_cache: Optional[TransformCache] = None,
+                 expression_store: Optional[ExpressionStore] = None,
+                 cache_manager: Optional[CacheManager] = None,
+                 parse_limits: Optional[ParseLimits] = DEFAULT_PARSE_LIMITS):
         """
         Args:
             equation: sympy Eq, or a sympy expression (interpreted as expr = 0)
             var: the symbol to solve for (default: auto-detect)
+            imaginary_max_entries: cap on distinct strings on the Imaginary board (default: unbounded)
+            imaginary_max_bytes: cap on total UTF-8 bytes on the Imaginary board (default: unbounded)
+            transform_cache: memo for SIMPLIFY/EXPAND/FACTOR/COLLECT results
+                (default: the cache shared by all environments in the process)
+            expression_store: hash-consing table for the equation, roots and
+                board contents (default: the store shared by the process)
+            cache_manager: cache policy and memory telemetry applied on RESET
+                and at the end of each episode (default: the worker's shared manager)
+            parse_limits: bounds for parsing Imaginary-board substrings
+                (None: unbounded parse_expr, as agents' strings are then trusted)
         """
-        if isinstance(equation, Eq):
-            lhs, rhs = equation.lhs, equation.rhs
-        else:
-            lhs, rhs = equation, S.Zero
+        self._init_caches(transform_cache, parse_limits, expression_store, cache_manager)
+        lhs, rhs = _equation_sides(equation)
+        self._start_episode(lhs, rhs, var,
+                            ImaginaryBoard(max_entries=imaginary_max_entries, max_bytes=imaginary_max_bytes))
 
+    def reset(self, equation=None, var=None):
+        """
+        Start a new episode on this instance, for `equation` (default: the
+        current one again). Only the episode state is rebuilt: the process
+        caches, the per-string extraction memo and the Imaginary-board caps
+        are kept, and the solvability / root analysis of an equation that was
+        seen before comes from the transform cache. An episode left without a
+        terminal action is ended first (see end_episode).
+        """
+        self.end_episode()
+        if equation is None:
+            lhs, rhs, var = self.initial_lhs, self.initial_rhs, var or self.var
+        else:
+            lhs, rhs = _equation_sides(equation)
+        if (lhs, rhs, var or self.var) != (self.initial_lhs, self.initial_rhs, self.var):
+            self._compiled_poly = None
+        self._extractable = None
+        self._copied_paths = {}
+        _trim(self._extraction_memo, _MEMO_MAX_ENTRIES)
+        _trim(self._parse_checks, _MEMO_MAX_ENTRIES)
+        board = self.state.imaginary
+        self._start_episode(lhs, rhs, var, ImaginaryBoard(max_entries=board.max_entries, max_bytes=board.max_bytes))
+
+    def _start_episode(self, lhs, rhs, var, imaginary):
         self.var = var or list(lhs.free_symbols)[0]
         self.initial_lhs = lhs  # store original for RESET
         self.initial_rhs = rhs
-        self.initial_string = str(Eq(lhs, rhs))
+        self.initial_string = self.transform_cache.get_or_compute('str', _equation_string, lhs, rhs)
 
         self.state = BoardState(
             real_lhs=lhs,
             real_rhs=rhs,
-            imaginary=[],
+            imaginary=imaginary,
             initial_string=self.initial_string,
 
         )
 
-        # Pre-compute solvability (hidden from agent)
-        self._solvable = check_solvable_by_radicals(lhs - rhs, self.var)
-
-        # Pre-compute all roots (hidden from agent)
-        self._all_roots = self._compute_roots(lhs - rhs, self.var)
+        # Pre-compute solvability and all roots (hidden from agent)
+        analysis = self.transform_cache.get_or_compute('analyze', analyze_equation, lhs - rhs, self.var)
+        self._solvable = analysis.solvable
+        self._root_oracle = analysis.oracle
+        self._all_roots = self._root_oracle.roots
         # Number of roots is hidden from agent
         self._num_roots = len(self._all_roots)
+        self._intern_expressions()
+        self._episode_open = True
 
-    def _compute_roots(self, expr, var):
-        """Compute all roots of the polynomial (hidden from agent)."""
-        try:
-            roots = solve(expr, var)
-            # Simplify each root for comparison
-            return [simplify(r) for r in roots]
-        except Exception:
-            return []
+    def end_episode(self):
+        """
+        Report the end of the current episode to the cache manager, if no
+        terminal action has already done so. For episodes that are
+        abandoned: reset() and EnvPool.release() call it.
+        """
+        if self._episode_open:
+            self._episode_open = False
+            self.cache_manager.end_episode()
+
+    def _init_caches(self, transform_cache=None, parse_limits=DEFAULT_PARSE_LIMITS, expression_store=None,
+                     cache_manager=None):
+        """Process-local configuration and derived caches (not part of the episode state)."""
+        self.cache_manager = cache_manager if cache_manager is not None else shared_cache_manager()
+        self.transform_cache = transform_cache if transform_cache is not None else shared_transform_cache()
+        self.expression_store = expression_store if expression_store is not None else shared_expression_store()
+        self.parse_limits = parse_limits
+        # Extractable expressions: per-string results plus the cached union,
+        # invalidated only by WRITE / COPY
+        self._extraction_memo = {}
+        self._extractable = None
+        # Interval evaluator of the initial polynomial, built by verify_candidates
+        self._compiled_poly = None
+        # Copied strings: {string: {subexpression: path}} for the subexpressions
+        # whose rendering occurs in the string, and whether each rendered expression parses back
+        self._copied_paths = {}
+        self._parse_checks = {}
+
+    def __getstate__(self):
+        # Caches belong to the process, not to the episode: don't pickle them
+        state = self.__dict__.copy()
+        del state['transform_cache']
+        del state['expression_store']
+        del state['cache_manager']
+        state['_compiled_poly'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.transform_cache = shared_transform_cache()
+        self.expression_store = shared_expression_store()
+        self.cache_manager = shared_cache_manager()
+        self._intern_expressions()
+
+    def _intern_expressions(self):
+        """Replace the held expression trees by their canonical instances in the store."""
+        intern = self.expression_store.intern
+        s = self.state
+        self.initial_lhs = intern(self.initial_lhs)
+        self.initial_rhs = intern(self.initial_rhs)
+        self._root_oracle.roots[:] = self.expression_store.intern_all(self._root_oracle.roots)
+        s.real_lhs = intern(s.real_lhs)
+        s.real_rhs = intern(s.real_rhs)
+        s.found_roots[:] = self.expression_store.intern_all(s.found_roots)
+
+    def expressions(self) -> list:
+        """Every expression tree the environment holds, for memory accounting."""
+        s = self.state
+        return [self.initial_lhs, self.initial_rhs, *self._root_oracle.roots,
+                s.real_lhs, s.real_rhs, *s.found_roots,
+                *s.substitution_chain.keys(), *s.substitution_chain.values()]
 
     def _is_known_root(self, value):
         """Check if value matches any of the actual roots."""
-        from sympy import N, Abs
-        value_simplified = simplify(value)
-        for root in self._all_roots:
-            # Try symbolic first
-            if simplify(value_simplified - root) == 0:
-                return True
-            # Fall back to numerical
+        return self._root_oracle.match(value) is not None
 
-            # TODO This is a workaround which needs to be removed, but
-            #   I don't want to fight sympy about symbolic equality of pre-computed roots and roots found for now
+    def _is_already_found(self, value):
+        """Check if this root was already found."""
+        idx = self._root_oracle.match(value)
+        if idx is None:
+            return False
+        return any(self._root_oracle.match(found) == idx for found in self.state.found_roots)
+
+    def reward_len(self) -> int:
+        return len(self.initial_string.replace(" ", ""))
+
+    def ground_truth(self) -> EquationAnalysis:
+        """
+        The hidden solvability and roots of the current equation, for tools
+        that build or grade demonstrations. Not part of the agent's view.
+        """
+        return EquationAnalysis(self._solvable, self._root_oracle)
+
+    # -----------------------------------------------------------------------
+    # Action legality
+    # -----------------------------------------------------------------------
+
+    def extractable_expressions(self) -> frozenset:
+        """
+        Expressions currently extractable from the Imaginary board (what
+        SUBSTITUTE accepts). Cached until the next WRITE / COPY; only strings
+        that were not seen before are parsed when the cache is rebuilt.
+        """
+        if self._extractable is None:
+            memo = self._extraction_memo
+            valid = set()
+            for s in self.state.imaginary:
+                if s not in memo:
+                    memo[s] = frozenset(extract_valid_expressions([s], limits=self.parse_limits))
+                valid |= memo[s]
+            self._extractable = frozenset(valid)
+        return self._extractable
+
+    def _imaginary_write(self, text, source=None):
+        """Append to the Imaginary board and invalidate the extraction cache."""
+        for evicted in self.state.imaginary.append(text, source):
+            self._extraction_memo.pop(evicted, None)
+            self._copied_paths.pop(evicted, None)
+        self._extractable = None
+
+    def locate_copied(self, expr):
+        """
+        Find expr inside the material COPY put on the Imaginary board, without
+        parsing substrings. Returns (string, path) with expr ==
+        subexpression_at(board.source(string), path), or None.
+
+        Only subexpressions whose rendering str(sub) is a substring of the
+        copied string and parses back to sub are reported, so anything found
+        here is also in extractable_expressions().
+        """
+        board = self.state.imaginary
+        for text in board:
+            source = board.source(text)
+            if source is None:
+                continue
+            paths = self._copied_paths.get(text)
+            if paths is None:
+                paths = self._copied_paths[text] = {
+                    sub: path for sub, path in subexpression_paths(source).items() if self._render(sub) in text
+                }
+            path = paths.get(expr)
+            if path is not None and self._parses_back(expr):
+                return text, path
+        return None
+
+    def _render(self, expr):
+        """str(expr), memoized: printing dominates COPY on short episodes."""
+        return self.transform_cache.get_or_compute('str', str, expr)
+
+    def _parses_back(self, expr):
+        ok = self._parse_checks.get(expr)
+        if ok is None:
             try:
-                diff = complex(N(value_simplified - root))
-                if abs(diff) < 1e-10:
-                    return True
+                text = self._render(expr)
+                parsed = parse_expr(text) if self.parse_limits is None else safe_parse_expr(text, self.parse_limits)
+                ok = parsed == expr and not _has_undefined_functions(parsed)
             except Exception:
-                pass
-        return False
+                ok = False
+            self._parse_checks[expr] = ok
+        return ok
 
-    def _is_already_found(self, value):
-        """Check if this root was already found."""
-        from sympy import N, Abs
-        value_simplified = simplify(value)
-        for found in self.state.found_roots:
-            if simplify(value_simplified - found) == 0:
+    def is_extractable(self, expr) -> bool:
+        """
+        Whether SUBSTITUTE accepts expr. Before falling back to the full
+        extraction set, two exact shortcuts are tried: copied material is
+        found by structure, and an expression whose own rendering occurs in
+        a board string (e.g. a WRITE of exactly that expression) is
+        extractable by definition once it parses back to itself.
+        """
+        if self._extractable is not None:
+            return expr in self._extractable
+        if isinstance(expr, Basic):
+            if self.locate_copied(expr) is not None:
+                return True
+            text = self._render(expr)
+            if any(text in s for s in self.state.imaginary) and self._parses_back(expr):
                 return True
+        return expr in self.extractable_expressions()
+
+    def legal_mask(self, candidates) -> bytes:
+        """
+        Legality of SUBSTITUTE for each candidate expression, one byte per
+        candidate (1 = extractable). Usable directly as
+        numpy.frombuffer(mask, dtype=bool).
+        """
+        return bytes(self.is_extractable(expr) for expr in candidates)
+
+    def try_substitute(self, expr, target_symbol=None):
+        """
+        Non-raising SUBSTITUTE. Returns (SubstituteStatus, reward).
+
+        An illegal substitution counts as a step, exactly like a SUBSTITUTE
+        passed to step() that raises, but no error message is built.
+        """
+        s = self.state
+        if s.complete_declared or s.unsolvable_declared:
+            return SubstituteStatus.TERMINAL, 0.0
+        if not self.is_extractable(expr):
+            s.steps += 1
+            return SubstituteStatus.NOT_EXTRACTABLE, 0.0
+        reward = self.step(Action(ActionType.SUBSTITUTE, expr=expr, target_symbol=target_symbol))
+        return SubstituteStatus.OK, reward
+
+    # -----------------------------------------------------------------------
+    # Batched candidate verification
+    # -----------------------------------------------------------------------
+
+    def verify_candidates(self, candidates, precision=50) -> list:
+        """
+        Test many candidate values of the solve variable against the original
+        equation in one call, for search agents. Does not change the state and
+        is not counted as a step.
+
+        The polynomial is compiled once into an interval evaluator; candidates
+        whose enclosure excludes 0 are rejected without any symbolic work, and
+        only the survivors get an exact check (simplify, then the minimal
+        polynomial for algebraic values simplify cannot settle).
+
+        Returns a list of CandidateCheck, one per candidate, in order.
+        """
+        candidates = [sympify(c) for c in candidates]
+        expr = self.initial_lhs - self.initial_rhs
+
+        compiled = self._compiled_poly
+        if compiled is None or compiled.precision != precision:
+            try:
+                compiled = self._compiled_poly = CompiledPolynomial(expr, self.var, precision)
+            except Exception:
+                compiled = None  # not a polynomial over Q: everything goes to the exact check
+        if compiled is not None:
+            survivors = compiled.may_vanish(candidates)
+        else:
+            survivors = [True] * len(candidates)
+
+        found = {self._root_oracle.match(f) for f in self.state.found_roots}
+        checks = []
+        for c, survived in zip(candidates, survivors):
+            is_root = survived and not c.free_symbols and self._is_exact_root(expr, c)
+            is_new = is_root and self._root_oracle.match(c) not in found
+            checks.append(CandidateCheck(candidate=c, is_root=is_root, is_new=is_new))
+        return checks
+
+    def _is_exact_root(self, expr, value):
+        from sympy import minimal_polynomial
+        residual = self.transform_cache.get_or_compute('simplify', simplify, expr.subs(self.var, value))
+        if residual == 0:
+            return True
+        if compiled := self._compiled_poly:
             try:
-                # TODO This is a workaround which needs to be removed, but
-                #   I don't want to fight sympy about symbolic equality of pre-computed roots and roots found for now
-                diff = complex(N(value_simplified - found))
-                if abs(diff) < 1e-10:
-                    return True
+                t = Symbol('t')
+                m = Poly(minimal_polynomial(value, t), t, domain=QQ)
+                return compiled.poly.as_expr().subs(self.var, t).as_poly(t, domain=QQ).rem(m).is_zero
             except Exception:
                 pass
         return False
 
-    def reward_len(self) -> int:
-        return len(self.initial_string.replace(" ", ""))
-
     def step(self, action: Action) -> float:
         """
         Execute one action. Returns reward (0 unless terminal or root found).
@@ -325,6 +1441,7 @@ class TwoBoardEnv:
 
         s.steps += 1
         reward = 0.0
+        memo = self.transform_cache.get_or_compute
 
         match action.action_type:
 
@@ -352,21 +1469,21 @@ class TwoBoardEnv:
                 s.real_rhs = s.real_rhs / action.expr
 
             case ActionType.SIMPLIFY:
-                s.real_lhs = simplify(s.real_lhs)
-                s.real_rhs = simplify(s.real_rhs)
+                s.real_lhs = memo('simplify', simplify, s.real_lhs)
+                s.real_rhs = memo('simplify', simplify, s.real_rhs)
 
             case ActionType.EXPAND:
-                s.real_lhs = expand(s.real_lhs)
-                s.real_rhs = expand(s.real_rhs)
+                s.real_lhs = memo('expand', expand, s.real_lhs)
+                s.real_rhs = memo('expand', expand, s.real_rhs)
 
             case ActionType.FACTOR:
-                s.real_lhs = factor(s.real_lhs)
-                s.real_rhs = factor(s.real_rhs)
+                s.real_lhs = memo('factor', factor, s.real_lhs)
+                s.real_rhs = memo('factor', factor, s.real_rhs)
 
             case ActionType.COLLECT:
                 sym = action.target_symbol or self.var
-                s.real_lhs = collect(s.real_lhs, sym)
-                s.real_rhs = collect(s.real_rhs, sym)
+                s.real_lhs = memo('collect', collect, s.real_lhs, sym)
+                s.real_rhs = memo('collect', collect, s.real_rhs, sym)
 
             case ActionType.POWER:
                 # Raise both sides to a rational power
@@ -379,32 +1496,30 @@ class TwoBoardEnv:
             case ActionType.WRITE:
                 # Write an arbitrary string to the Imaginary board
                 text = action.expr if isinstance(action.expr, str) else str(action.expr)
-                s.imaginary.append(text)
+                self._imaginary_write(text)
 
             case ActionType.COPY:
-                # Copy from the Real board as a string
-                if action.expr is not None:
-                    s.imaginary.append(str(action.expr))
+                # Copy from the Real board as a string, keeping the expression
+                # so that copied subexpressions are found without re-parsing
+                if isinstance(action.expr, str):
+                    self._imaginary_write(action.expr)
+                elif action.expr is not None:
+                    self._imaginary_write(self._render(action.expr), action.expr)
                 else:
-                    s.imaginary.append(str(s.real_lhs))
-                    s.imaginary.append(str(s.real_rhs))
+                    self._imaginary_write(self._render(s.real_lhs), s.real_lhs)
+                    self._imaginary_write(self._render(s.real_rhs), s.real_rhs)
 
             # ---------------------------------------------------------------
             # Cross-board: substitute
             # ---------------------------------------------------------------
             case ActionType.SUBSTITUTE:
                 target = action.target_symbol or self.var
-                known = s.real_lhs.free_symbols | s.real_rhs.free_symbols
-                valid = extract_valid_expressions(s.imaginary, known)
-                if action.expr not in valid:
-                    raise ValueError(
-                        f"Expression {action.expr} is not extractable from the Imaginary board. "
-                        f"Available: {valid}"
-                    )
+                if not self.is_extractable(action.expr):
+                    raise NotExtractableError(action.expr, self.extractable_expressions())
                 s.last_substitution = action.expr  # track for root detection
                 s.real_lhs = s.real_lhs.subs(target, action.expr)
                 s.real_rhs = s.real_rhs.subs(target, action.expr)
-                s.substitution_chain[target] = action.expr
+                s.substitution_graph.add(target, action.expr)
 
             # ---------------------------------------------------------------
             # Multi-root: reset to original equation
@@ -414,6 +1529,7 @@ class TwoBoardEnv:
                 s.real_rhs = self.initial_rhs
                 s.last_substitution = None
                 # Imaginary board is preserved
+                self.cache_manager.on_reset()
 
             # ---------------------------------------------------------------
             # Terminal: declare all roots found
@@ -438,6 +1554,7 @@ class TwoBoardEnv:
                 else:
                     # No roots exist and none found (constant equation)
                     reward = 0.5 * (L ** (1.0 / n))
+                self.end_episode()
                 return reward
 
             # ---------------------------------------------------------------
@@ -454,42 +1571,32 @@ class TwoBoardEnv:
                 else:
                     # Cannot verify — treat as incorrect to be safe
                     reward = -0.5 * (L ** (1.0 / n))
+                self.end_episode()
                 return reward
 
         # ---------------------------------------------------------------
         # Check for root found (0 = 0 after substitution)
         # ---------------------------------------------------------------
-        diff = simplify(s.real_lhs - s.real_rhs)
+        s.real_lhs = self.expression_store.intern(s.real_lhs)
+        s.real_rhs = self.expression_store.intern(s.real_rhs)
+        diff = memo('simplify', simplify, s.real_lhs - s.real_rhs)
         if diff == 0 and len(s.real_lhs.free_symbols) == 0:
-            # Build resolved chain: invert power targets
-            # e.g. u**3 -> val  becomes  u -> val**(1/3)
-            resolved = {}
+            # The chain is composed as substitutions arrive (power targets
+            # inverted, e.g. u**3 -> val  becomes  u -> val**(1/3))
             for target, expr in s.substitution_chain.items():
-                if isinstance(target, Pow) and target.exp.is_Integer:
-                    base_sym = target.base
-                    inv_exp = Rational(1, target.exp)
-                    resolved[base_sym] = Pow(expr, inv_exp)
-                    print(f'{target}: {expr}  =>  {base_sym}: {Pow(expr, inv_exp)}')
-                else:
-                    resolved[target] = expr
+                key, value = SubstitutionGraph.resolve_target(target, expr)
+                if key is target:
                     print(f'{target}: {expr}')
+                else:
+                    print(f'{target}: {expr}  =>  {key}: {value}')
 
             # Compose back to x
-            root_value = self.var
-            changed = True
-            while changed:
-                changed = False
-                for target, expr in resolved.items():
-                    new_val = root_value.subs(target, expr)
-                    if new_val != root_value:
-                        root_value = new_val
-                        changed = True
-            root_value = simplify(root_value)
+            root_value = simplify(s.substitution_graph.root_candidate(self.var))
 
             if self._is_known_root(root_value):
                 print(f'root is known!')
                 if not self._is_already_found(root_value):
-                    s.found_roots.append(root_value)
+                    s.found_roots.append(self.expression_store.intern(root_value))
                     reward = 1.0
             else:
                 print(f'Equality achieved but root is NOT know in canonical form!')
@@ -504,7 +1611,7 @@ class TwoBoardEnv:
         print(f"Initial: {self.initial_string}")
         self.state.display()
         if self.state.imaginary:
-            valid = extract_valid_expressions(self.state.imaginary, self._known_symbols())
+            valid = set(self.extractable_expressions())
             print(f"  Valid extractions: {valid}")
         print()
 